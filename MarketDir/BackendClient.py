@@ -0,0 +1,160 @@
+import os
+import json
+
+import pandas as pd
+import requests
+
+from Resilience import Upstream, CircuitOpenError
+
+# ---- CLIENT FOR THE FLASK API -----
+# Everything the dashboard needs from the backend goes over HTTP through these helpers, so the
+# Streamlit process never imports the Flask app, the LLM SDK or the market-data provider.
+
+# 📌 **Backend API URL**
+FLASK_API_URL = os.getenv("MARKET_API_URL", "http://127.0.0.1:5000")
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+# Seconds to connect to the backend, and to wait for its answer (between two chunks of a stream)
+CONNECT_TIMEOUT = float(os.getenv("MARKET_API_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("MARKET_API_TIMEOUT", "120"))
+RETRY_STATUSES = (502, 503, 504)
+
+# Backend calls are retried on connection errors, timeouts and gateway errors, and fail at once
+# for a while once the backend has stopped answering (see Resilience.py)
+_backend = Upstream("backend", timeout=None, attempts=int(os.getenv("MARKET_API_ATTEMPTS", "3")),
+                    max_delay=4.0, reset_timeout=15.0,
+                    retryable=lambda error: isinstance(error, (requests.ConnectionError, requests.Timeout,
+                                                               requests.HTTPError)))
+
+
+# One backend request with timeouts, through the retries and circuit breaker. `idempotent=False`
+# sends it once. A backend that is down raises requests.ConnectionError like an unreachable one.
+def _request(method, path, idempotent=True, **kwargs):
+    def send():
+        response = requests.request(method, f"{FLASK_API_URL}{path}", timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                                    **kwargs)
+        if response.status_code in RETRY_STATUSES:
+            response.close()
+            raise requests.HTTPError(f"HTTP {response.status_code} from {path}", response=response)
+        return response
+
+    try:
+        return _backend.call(send, attempts=None if idempotent else 1)
+    except CircuitOpenError as e:
+        raise requests.ConnectionError(str(e)) from e
+
+
+def _error_message(response):
+    try:
+        return response.json().get('error', 'Unknown error')
+    except ValueError:
+        return f"HTTP {response.status_code}"
+
+
+# Streaming /market-data: yields one record per ticker as soon as the backend has computed it
+def stream_market_data(tickers):
+    with _request("POST", "/market-data/stream", json={"tickers": tickers}, stream=True) as response:
+        if response.status_code != 200:
+            raise ValueError(_error_message(response))
+        for line in response.iter_lines():
+            if not line:
+                continue
+            record = json.loads(line)
+            if record.get("done"):
+                return
+            yield record
+
+
+# Sentiment insights for all tickers in one batch request -> {ticker: insight or error}
+def fetch_insights(tickers):
+    response = _request("POST", "/sentiment-insights/batch", json={"tickers": tickers})
+    if response.status_code != 200 or not response.text.strip():
+        raise ValueError(_error_message(response))
+    return response.json()
+
+
+# AI forecasts for all tickers, batched by the backend -> {ticker: {"6M": %, "12M": %} or {"error": ...}}
+def fetch_growth_forecasts(tickers):
+    response = _request("POST", "/growth-forecast/batch", json={"tickers": tickers})
+    if response.status_code != 200:
+        raise ValueError(_error_message(response))
+    return response.json()
+
+
+# Local Monte Carlo / GBM forecasts for all tickers -> {ticker: {"6M": {...}, "12M": {...}} or error}
+def fetch_quant_forecasts(tickers, method="bootstrap"):
+    response = _request("POST", "/growth-forecast/quant", json={"tickers": tickers, "method": method})
+    if response.status_code != 200:
+        raise ValueError(_error_message(response))
+    return response.json()
+
+
+# Correlation matrix and portfolio risk for the given weights ({ticker: weight}, None for equal weights)
+def fetch_portfolio(tickers, weights=None):
+    body = {"tickers": tickers}
+    if weights is not None:
+        body["weights"] = weights
+    response = _request("POST", "/portfolio", json=body)
+    if response.status_code != 200:
+        raise ValueError(_error_message(response))
+    return response.json()
+
+
+# Starting a universe screen from a universe file on the server or a list of tickers -> {"job_id", "total"}
+def start_screener(metric, top, universe=None, tickers=None):
+    body = {"metric": metric, "top": top, **({"universe": universe} if universe else {"tickers": tickers})}
+    response = _request("POST", "/screener", idempotent=False, json=body)
+    if response.status_code != 202:
+        raise ValueError(_error_message(response))
+    return response.json()
+
+
+# Progress of a screener job, with its ranked rows once done
+def fetch_screener_job(job_id):
+    response = _request("GET", f"/screener/{job_id}")
+    if response.status_code != 200:
+        raise ValueError(_error_message(response))
+    return response.json()
+
+
+# Universe files available on the server and the metrics the screener can rank by
+def fetch_screener_options():
+    response = _request("GET", "/screener/universes")
+    if response.status_code != 200:
+        raise ValueError(_error_message(response))
+    return response.json()
+
+
+# Watchlists the backend keeps warm, with every ticker's last prefetch times
+def fetch_watchlists():
+    response = _request("GET", "/watchlists")
+    if response.status_code != 200:
+        raise ValueError(_error_message(response))
+    return response.json()
+
+
+# Decoding a /history response body -> (dates x tickers DataFrame, {ticker: metrics}, {ticker: error}).
+# The Arrow table is converted column by column without consolidating it into one block.
+def decode_history(content_type, content, float32=False):
+    if content_type.startswith(ARROW_STREAM):
+        import pyarrow as pa
+
+        table = pa.ipc.open_stream(content).read_all()
+        metadata = table.schema.metadata or {}
+        closes = table.to_pandas(split_blocks=True, self_destruct=True).set_index("Date")
+        return closes, json.loads(metadata.get(b"metrics", b"{}")), json.loads(metadata.get(b"errors", b"{}"))
+
+    data = json.loads(content)
+    closes = pd.DataFrame(data["closes"], index=pd.DatetimeIndex(pd.to_datetime(data["dates"]), name="Date"),
+                          dtype="float32" if float32 else "float64")
+    return closes, data["metrics"], data["errors"]
+
+
+# Aligned daily closes for charting, asking for an Arrow IPC stream and falling back to JSON if
+# the backend answers with that instead
+def fetch_history(tickers, period="1y", float32=False):
+    response = _request("POST", "/history", json={"tickers": tickers, "period": period, "float32": float32},
+                        headers={"Accept": f"{ARROW_STREAM}, application/json;q=0.5"})
+    if response.status_code != 200:
+        raise ValueError(_error_message(response))
+    return decode_history(response.headers.get("Content-Type", ""), response.content, float32)
@@ -0,0 +1,161 @@
+import pandas as pd
+import plotly.graph_objects as go
+
+from RiskEngine import compute_growth
+
+# ---- FIGURES AND TABLES OF THE ANALYSIS -----
+# Built from the backend's results only (no Streamlit), so the dashboard and the headless
+# report builder (ReportBuilder.py) draw exactly the same charts and tables.
+
+# Price history charted by the dashboard and the reports
+PERIOD = '18mo'
+HEADING_COLOR = "#005A9C"
+
+RISK_COLUMNS = {"index": "Company", "current_price": "Current Price ($)", "VaR_95": "Value at Risk (95%)",
+                "volatility": "Annual Volatility", "CVaR_95": "Expected Shortfall (95%)",
+                "max_drawdown": "Max Drawdown", "sharpe": "Sharpe Ratio"}
+RISK_TABLE_FORMAT = {
+    "Current Price ($)": "${:,.2f}",
+    "Value at Risk (95%)": "{:.4f}",
+    "Annual Volatility": "{:.4f}",
+    "Expected Shortfall (95%)": "{:.4f}",
+    "Max Drawdown": "{:.2%}",
+    "Sharpe Ratio": "{:.2f}"
+}
+FORECAST_COLUMNS = ["Company", "6-Month Growth (%)", "12-Month Growth (%)"]
+
+
+# Volatility and VaR of every ticker side by side ({ticker: risk record}; records with an error are skipped)
+def risk_comparison_figure(risk_data):
+    fig = go.Figure()
+    for ticker, data in risk_data.items():
+        if "error" in data:
+            continue
+        fig.add_trace(go.Bar(x=["Annual Volatility", "Value at Risk (95%)"], y=[data['volatility'], data['VaR_95']],
+                             name=ticker))
+    fig.update_layout(title='Comparison', xaxis_title='Metric', yaxis_title='Value', barmode='group',
+                      margin=dict(l=40, r=40, t=50, b=50),  # Proper margins to prevent overflow
+                      width=650,  # Ensures responsiveness
+                      height=410,  # Optional: Adjust height
+                      xaxis=dict(tickangle=-45, automargin=True)
+                      )
+    return fig
+
+
+# Risk records as the table shown to users, one row per company
+def risk_table(risk_data):
+    table = pd.DataFrame.from_dict(risk_data, orient='index').reset_index()
+    return table.rename(columns=RISK_COLUMNS).reindex(columns=list(RISK_COLUMNS.values()))
+
+
+def performance_figure(stock_data):
+    fig = go.Figure([go.Scatter(x=stock_data.index, y=stock_data[ticker], name=ticker, mode="lines")
+                     for ticker in stock_data.columns])
+    fig.update_layout(xaxis_title="Date", yaxis_title="Close ($)", template="plotly_white",
+                      margin=dict(l=40, r=40, t=30, b=50), height=425)
+    return fig
+
+
+def growth_figure(stock_data, period=PERIOD):
+    # Computing growth over the last {period} months
+    growth_data = compute_growth(stock_data).astype(float).round(2)
+
+    # Converting to DataFrame for better visualization
+    growth_df = growth_data.to_frame("Growth (%)")
+    growth_df.reset_index(inplace=True)
+    growth_df.rename(columns={"index": "Company"}, inplace=True)
+
+    # Plotting growth potential as a bar chart
+    fig_growth = go.Figure()
+    fig_growth.add_trace(go.Bar(x=growth_df["Company"], y=growth_df["Growth (%)"],
+                                text=growth_df["Growth (%)"], textposition='auto',
+                                marker=dict(color=HEADING_COLOR)))
+
+    fig_growth.update_layout(title=f'Growth Potential Over Last {period[:2]} Months',
+                             xaxis_title="Company",
+                             yaxis_title="Growth (%)",
+                             barmode='group',
+                             template="plotly_white",
+                             margin=dict(l=40, r=40, t=50, b=50),  # Proper margins to prevent overflow
+                             width=650,  # Ensures responsiveness
+                             height=425,  # Optional: Adjust height
+                             xaxis=dict(tickangle=-45, automargin=True)
+                             )
+    return fig_growth
+
+
+# Correlation heatmap of the backend's /portfolio result
+def correlation_figure(portfolio):
+    fig = go.Figure(go.Heatmap(z=portfolio["correlation"], x=portfolio["tickers"], y=portfolio["tickers"],
+                               zmin=-1, zmax=1, colorscale="RdBu", colorbar=dict(title="Correlation")))
+    fig.update_layout(title="Correlation of Daily Returns", width=650, height=550,
+                      margin=dict(l=40, r=40, t=50, b=50), yaxis=dict(autorange="reversed"))
+    return fig
+
+
+# Parametric and historical portfolio risk of a /portfolio result, and its caption
+def portfolio_summary(portfolio):
+    risk = portfolio["portfolio"]
+    summary = pd.DataFrame({
+        "Metric": ["Annual Volatility", "Value at Risk (95%)", "Expected Shortfall (95%)"],
+        "Parametric": [risk["volatility"], risk["VaR_95_parametric"], risk["CVaR_95_parametric"]],
+        "Historical": [None, risk["VaR_95_historical"], risk["CVaR_95_historical"]],
+    }).set_index("Metric")
+    caption = (f"Weights: {', '.join(f'{t} {w:.1%}' for t, w in portfolio['weights'].items())} · "
+               f"covariance shrinkage {portfolio['shrinkage']:.2f} over {portfolio['observations']} days")
+    return summary, caption
+
+
+# AI forecasts ({ticker: {"6M", "12M"} or {"error"}}) as one row per ticker, empty for a ticker without one
+def ai_forecast_table(tickers, results):
+    rows = []
+    for ticker in tickers:
+        result = results.get(ticker) or {}
+        rows.append({"Company": ticker, "6-Month Growth (%)": result.get("6M"),
+                     "12-Month Growth (%)": result.get("12M")})
+    return pd.DataFrame(rows, columns=FORECAST_COLUMNS)
+
+
+# Monte Carlo forecasts as one row per ticker: median growth and its 5%-95% band per horizon
+def quant_forecast_table(tickers, results):
+    rows = []
+    for ticker in tickers:
+        result = results.get(ticker) or {}
+        row = {"Company": ticker}
+        for label, horizon in (("6-Month", "6M"), ("12-Month", "12M")):
+            bands = result.get(horizon, {})
+            row.update({f"{label} Growth (%)": bands.get("median"), f"{label} Low (%)": bands.get("low"),
+                        f"{label} High (%)": bands.get("high")})
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def ai_forecast_figure(df_forecast):
+    # plotly.express is only imported once a forecast is drawn
+    import plotly.express as px
+    return px.bar(
+        df_forecast,
+        x="Company",
+        y=["6-Month Growth (%)", "12-Month Growth (%)"],
+        barmode="group",
+        title="Stock Growth Forecast (6M vs 12M)",
+        labels={"value": "Growth (%)", "variable": "Forecast Period"},
+        # Proper margins to prevent overflow
+        width=650,  # Ensures responsiveness
+        height=425,  # Optional: Adjust height
+    )
+
+
+# Median growth with the 5%-95% band of the simulated paths as error bars
+def quant_forecast_figure(df_forecast):
+    fig = go.Figure()
+    for label in ["6-Month", "12-Month"]:
+        median = df_forecast[f"{label} Growth (%)"]
+        fig.add_trace(go.Bar(x=df_forecast["Company"], y=median, name=f"{label} Growth (%)",
+                             error_y=dict(type="data", symmetric=False,
+                                          array=df_forecast[f"{label} High (%)"] - median,
+                                          arrayminus=median - df_forecast[f"{label} Low (%)"])))
+    fig.update_layout(title="Stock Growth Forecast (6M vs 12M, median and 5%-95% band)",
+                      xaxis_title="Company", yaxis_title="Growth (%)", barmode="group",
+                      width=650, height=425, legend_title_text="Forecast Period")
+    return fig
@@ -0,0 +1,79 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# ---- CONCURRENCY HELPERS -----
+
+
+# Token bucket: `rate` tokens per second, holding at most `capacity` for bursts
+class TokenBucket:
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    # Blocks until a token is available; raises TimeoutError if that takes longer than `timeout`
+    def acquire(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_time = (1 - self._tokens) / self.rate
+
+            if deadline is not None:
+                if now + wait_time > deadline:
+                    raise TimeoutError("Rate limit: no token available before the deadline")
+            time.sleep(wait_time)
+
+
+# Runs func(item) for every item on at most `concurrency` threads -> ({item: result}, {item: Exception}).
+# Each item gets `timeout` seconds from the moment it starts running (time spent queued behind
+# other items does not count). A timed-out call cannot be interrupted, but its result is
+# discarded and it no longer holds up the batch.
+def fan_out(func, items, concurrency, timeout=None):
+    results, errors, started = {}, {}, {}
+    items = list(dict.fromkeys(items))
+    if not items:
+        return results, errors
+
+    def run(item):
+        started[item] = time.monotonic()
+        return func(item)
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(items))))
+    try:
+        futures = {pool.submit(run, item): item for item in items}
+        pending = set(futures)
+        while pending:
+            deadlines = [started[futures[f]] + timeout for f in pending if futures[f] in started] \
+                if timeout is not None else []
+            wait_time = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            if timeout is not None and len(deadlines) < len(pending):
+                # Some items have not started yet; wake up soon to pick up their start time
+                wait_time = 0.05 if wait_time is None else min(wait_time, 0.05)
+
+            done, pending = wait(pending, timeout=wait_time, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    errors[futures[future]] = e
+
+            now = time.monotonic()
+            for future in list(pending):
+                item = futures[future]
+                if timeout is not None and item in started and now - started[item] > timeout:
+                    errors[item] = TimeoutError(f"Timed out after {timeout}s")
+                    pending.discard(future)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return results, errors
@@ -0,0 +1,107 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# ---- SHARED HISTORY CACHE FOR THE DASHBOARD -----
+# One cache per dashboard process, shared by every browser session, holding the daily closes
+# the charts need. Each ticker's history is kept once, as two flat arrays (trading days as
+# int32 day numbers and closes as float32), about 8 bytes per day instead of a float64 OHLCV
+# DataFrame per session. The cache is an LRU bounded by a memory budget
+# (HISTORY_CACHE_MB); entries are fetched again after HISTORY_CACHE_TTL seconds, tickers that
+# came back without data after HISTORY_CACHE_EMPTY_TTL seconds.
+
+MAX_BYTES = int(float(os.getenv("HISTORY_CACHE_MB", "256")) * 1024 * 1024)
+CACHE_TTL = float(os.getenv("HISTORY_CACHE_TTL", "300"))
+EMPTY_TTL = float(os.getenv("HISTORY_CACHE_EMPTY_TTL", "15"))
+ENTRY_OVERHEAD = 256  # key, tuple and array headers of one entry, roughly
+
+
+class HistoryCache:
+
+    def __init__(self, max_bytes=MAX_BYTES, ttl=CACHE_TTL, empty_ttl=EMPTY_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.empty_ttl = empty_ttl
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # (ticker, period) -> (fetched_at, days, closes), least recently used first
+        self._lock = threading.Lock()
+
+    # (days, closes) arrays for one ticker, or None on a miss (absent or expired). A ticker
+    # without data is cached as empty arrays, for `empty_ttl`, so it is not fetched on every rerun.
+    def get(self, ticker, period):
+        key = (ticker, period)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] <= (self.ttl if len(entry[1]) else self.empty_ttl):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], entry[2]
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+
+    # Storing a ticker's closes (a Series on a DatetimeIndex; None or empty for no data) -> (days, closes)
+    def put(self, ticker, period, closes=None):
+        if closes is None or closes.empty:
+            days, values = np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        else:
+            closes = closes.dropna()
+            days = closes.index.values.astype("datetime64[D]").astype(np.int32)
+            values = closes.to_numpy(dtype=np.float32)
+
+        key = (ticker, period)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.time(), days, values)
+            self.nbytes += days.nbytes + values.nbytes + ENTRY_OVERHEAD
+            while self.nbytes > self.max_bytes and len(self._entries) > 1:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return days, values
+
+    def _drop(self, key):
+        _, days, values = self._entries.pop(key)
+        self.nbytes -= days.nbytes + values.nbytes + ENTRY_OVERHEAD
+
+    # Aligned float32 closes (dates x tickers) of the tickers with data, or None. Tickers not in
+    # the cache are passed to `fetch(tickers) -> closes DataFrame` in one call and stored.
+    def frame(self, tickers, period, fetch):
+        histories = {ticker: self.get(ticker, period) for ticker in tickers}
+        missing = [ticker for ticker, history in histories.items() if history is None]
+        if missing:
+            closes = fetch(missing)
+            for ticker in missing:
+                histories[ticker] = self.put(ticker, period, closes[ticker] if ticker in closes.columns else None)
+
+        histories = {ticker: history for ticker, history in histories.items() if len(history[0])}
+        if not histories:
+            return None
+        days = np.unique(np.concatenate([history_days for history_days, _ in histories.values()]))
+        values = np.full((len(days), len(histories)), np.nan, dtype=np.float32)
+        for column, (history_days, closes) in enumerate(histories.values()):
+            values[np.searchsorted(days, history_days), column] = closes
+        index = pd.DatetimeIndex(days.astype("datetime64[D]").astype("datetime64[ns]"), name="Date")
+        return pd.DataFrame(values, index=index, columns=list(histories))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "ttl_seconds": self.ttl,
+            }
@@ -0,0 +1,206 @@
+import os
+import json
+import time
+import logging
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+from Metrics import timed
+from SingleFlight import SingleFlight
+from Resilience import Upstream, count_stale
+
+# ---- CACHE FOR LLM GENERATIONS -----
+# Generations are keyed on (model, prompt, max_tokens, temperature). Entries live in an
+# in-memory LRU bounded to LLM_CACHE_SIZE and expire after LLM_CACHE_TTL seconds. When
+# LLM_CACHE_PATH is set, entries are also written to a SQLite file so that they survive
+# restarts and are shared by every process pointing at the same file. Expired entries are kept
+# for up to LLM_CACHE_STALE_TTL seconds, to be served when Cohere is unavailable.
+
+CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "21600"))  # 6 hours
+CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+CACHE_PATH = os.getenv("LLM_CACHE_PATH")  # e.g. MarketDir/llm_cache.sqlite
+CACHE_DISK_SIZE = int(os.getenv("LLM_CACHE_DISK_SIZE", "50000"))
+STALE_TTL = float(os.getenv("LLM_CACHE_STALE_TTL", "604800"))  # 7 days
+
+
+def cache_key(model, prompt, max_tokens, temperature):
+    payload = json.dumps([model, prompt, max_tokens, temperature])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+
+    def __init__(self, ttl=CACHE_TTL, max_entries=CACHE_SIZE, path=CACHE_PATH, max_disk_entries=CACHE_DISK_SIZE,
+                 stale_ttl=STALE_TTL):
+        self.ttl = ttl
+        self.stale_ttl = max(ttl, stale_ttl)
+        self.max_entries = max_entries
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (created_at, text), least recently used first
+        self._lock = threading.Lock()
+        if self.path:
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("CREATE TABLE IF NOT EXISTS generations "
+                             "(key TEXT PRIMARY KEY, text TEXT NOT NULL, created_at REAL NOT NULL, "
+                             "last_used REAL NOT NULL)")
+                conn.execute("CREATE INDEX IF NOT EXISTS generations_last_used ON generations (last_used)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _expired(self, created_at, ttl=None):
+        return time.time() - created_at > (self.ttl if ttl is None else ttl)
+
+    def _remember(self, key, created_at, text):
+        self._entries[key] = (created_at, text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_disk(self, key):
+        with self._connect() as conn:
+            row = conn.execute("SELECT created_at, text FROM generations WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE generations SET last_used = ? WHERE key = ?", (time.time(), key))
+        return row
+
+    def _write_disk(self, key, created_at, text):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO generations (key, text, created_at, last_used) VALUES (?, ?, ?, ?)",
+                         (key, text, created_at, created_at))
+            conn.execute("DELETE FROM generations WHERE created_at < ?", (time.time() - self.stale_ttl,))
+            conn.execute("DELETE FROM generations WHERE key IN (SELECT key FROM generations "
+                         "ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_disk_entries,))
+
+    # Cached text for `key`, or None on a miss (absent or expired)
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry[0]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        row = self._read_disk(key) if self.path else None
+        with self._lock:
+            if row is not None and not self._expired(row[0]):
+                self._remember(key, *row)
+                self.hits += 1
+                return row[1]
+            self.misses += 1
+            return None
+
+    # Cached text for `key` even if expired (up to stale_ttl), or None; not counted as a hit or a miss
+    def get_stale(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        if (entry is None or self._expired(entry[0], self.stale_ttl)) and self.path:
+            entry = self._read_disk(key)
+        if entry is None or self._expired(entry[0], self.stale_ttl):
+            return None
+        return entry[1]
+
+    # Whether `key` is cached and unexpired, without counting a hit or a miss
+    def contains(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry[0]):
+                return True
+        row = self._read_disk(key) if self.path else None
+        return row is not None and not self._expired(row[0])
+
+    def put(self, key, text):
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, created_at, text)
+        if self.path:
+            self._write_disk(key, created_at, text)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "stale_ttl_seconds": self.stale_ttl,
+                "disk_path": self.path,
+            }
+
+
+_default_cache = None
+
+
+def get_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = GenerationCache()
+    return _default_cache
+
+
+# Replacing the process-wide cache, e.g. to point every server worker at one SQLite file
+def configure_cache(**options):
+    global _default_cache
+    _default_cache = GenerationCache(**options)
+    return _default_cache
+
+
+# Cohere calls: timeout per generation (adapted down to COHERE_MIN_TIMEOUT once latencies are
+# known), attempts and the circuit breaker (see Resilience.py). Generations are not hedged.
+_cohere = Upstream("cohere", timeout=float(os.getenv("COHERE_TIMEOUT", "60")),
+                   min_timeout=float(os.getenv("COHERE_MIN_TIMEOUT", "20")),
+                   attempts=int(os.getenv("COHERE_ATTEMPTS", "2")),
+                   failure_threshold=int(os.getenv("COHERE_FAILURE_THRESHOLD", "5")),
+                   reset_timeout=float(os.getenv("COHERE_RESET_TIMEOUT", "60")))
+
+# Generations in flight in this process, shared by concurrent requests for the same prompt
+_generation_flight = SingleFlight("cohere")
+
+
+# co.generate() behind the cache. Failed generations are never cached: the expired entry for the
+# key is served instead if there is one, otherwise the error is raised. A `rate_limiter` (see
+# Concurrency.TokenBucket) is only charged for attempts on a cache miss, and concurrent misses
+# for the same key share one generation. `budget`, another TokenBucket (e.g. the prefetch
+# scheduler's), is charged the same way on top of it. `rate_timeout` bounds the whole call,
+# retries included.
+def cached_generate(client, model, prompt, max_tokens, temperature, cache=None, rate_limiter=None,
+                    rate_timeout=None, budget=None):
+    cache = cache or get_cache()
+    key = cache_key(model, prompt, max_tokens, temperature)
+    text = cache.get(key)
+    if text is not None:
+        return text
+
+    deadline = None if rate_timeout is None else time.monotonic() + rate_timeout
+
+    def admit():
+        for bucket in (budget, rate_limiter):
+            if bucket is not None:
+                bucket.acquire(timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    def generate():
+        with timed("cohere_generate"):
+            response = _cohere.call(lambda: client.generate(model=model, prompt=prompt, max_tokens=max_tokens,
+                                                            temperature=temperature), deadline=deadline, admit=admit)
+        generated = response.generations[0].text.strip()
+        cache.put(key, generated)
+        return generated
+
+    try:
+        return _generation_flight.do(key, generate)
+    except Exception as e:
+        text = cache.get_stale(key)
+        if text is None:
+            raise
+        logging.warning(f"Serving an expired generation: {str(e)}")
+        count_stale("cohere")
+        return text
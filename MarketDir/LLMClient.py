@@ -0,0 +1,178 @@
+import os
+import json
+import math
+import threading
+
+from LLMCache import cache_key, cached_generate, get_cache
+from Concurrency import TokenBucket, fan_out
+from Metrics import REGISTRY, timed
+
+# ---- FOR COHERE-API -----
+# Prompts and generation calls for insights and forecasts. Importing this module is cheap:
+# the cohere SDK is only imported, and the client only created, on the first generation.
+
+COHERE_API_KEY = os.getenv("COHERE_API_KEY")  # Ensure API key is stored safely
+MODEL = "command-r-plus"
+DEFAULT_TEMPERATURE = 0.7
+
+# Upstream budget for Cohere calls (cache hits are free), shared by every caller in the process
+LLM_RATE_PER_SECOND = float(os.getenv("LLM_RATE_PER_SECOND", "5"))
+LLM_BURST = int(os.getenv("LLM_BURST", "10"))
+llm_rate_limiter = TokenBucket(LLM_RATE_PER_SECOND, LLM_BURST)
+
+# Batched growth forecasts: tickers per generation, generations in flight, and how many times
+# tickers whose forecast could not be parsed are asked for again
+FORECAST_CHUNK_SIZE = int(os.getenv("LLM_FORECAST_CHUNK_SIZE", "25"))
+FORECAST_CONCURRENCY = int(os.getenv("LLM_FORECAST_CONCURRENCY", "4"))
+FORECAST_MAX_ATTEMPTS = int(os.getenv("LLM_FORECAST_MAX_ATTEMPTS", "3"))
+INSIGHT_MAX_TOKENS = 300
+FORECAST_TOKENS_PER_TICKER = 40  # one {"ticker", "growth_6m", "growth_12m"} object, with margin
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import cohere
+                _client = cohere.Client(COHERE_API_KEY)
+    return _client
+
+
+# `budget`: an extra TokenBucket charged per Cohere call, on top of the process-wide rate limit
+def generate(prompt, max_tokens, temperature=DEFAULT_TEMPERATURE, rate_timeout=None, budget=None):
+    return cached_generate(
+        get_client(),
+        model=MODEL,
+        prompt=prompt,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        rate_limiter=llm_rate_limiter,
+        rate_timeout=rate_timeout,
+        budget=budget
+    )
+
+
+# Implementing the AI Model
+def generate_insight(prompt, rate_timeout=None, budget=None):
+    with timed("insight"):
+        return generate(prompt, max_tokens=INSIGHT_MAX_TOKENS, rate_timeout=rate_timeout, budget=budget)
+
+
+# Whether generate_insight(prompt) would be answered from the cache, without calling Cohere
+def insight_cached(prompt):
+    return get_cache().contains(cache_key(MODEL, prompt, INSIGHT_MAX_TOKENS, DEFAULT_TEMPERATURE))
+
+
+def sentiment_prompt(keyword):
+    return f"Analyze the market sentiment for {keyword}. Provide only 3 key insights based on financial trends. " \
+           f"Do not include any kind of summary."
+
+
+# Generate Future forecasts for chosen stocks
+def generate_growth_forecast(ticker):
+
+    # Constructing AI prompt
+    prompt = f"""
+            Predict the future stock performance of {ticker} based on its historical trends and market conditions.
+            Provide an estimated percentage growth for the next 6 months and 12 months.
+            Format the response as:
+            - 6-Month Growth Estimate: X%
+            - 12-Month Growth Estimate: Y%
+            """
+
+    try:
+        with timed("forecast"):
+            return generate(prompt, max_tokens=100)
+    except Exception as e:
+        return f"❌ AI Forecasting Failed: {str(e)}"
+
+
+def growth_forecast_batch_prompt(tickers):
+    return f"""
+            Predict the future stock performance of each of the following stocks based on its historical trends
+            and market conditions, with an estimated percentage growth for the next 6 months and 12 months.
+            Tickers: {", ".join(tickers)}
+            Reply with JSON only, no other text, in exactly this format, one entry per ticker:
+            {{"forecasts": [{{"ticker": "<TICKER>", "growth_6m": <number>, "growth_12m": <number>}}]}}
+            Growth values are percentages as plain numbers, e.g. 7.5 for 7.5%.
+            """
+
+
+def _growth_value(value):
+    if isinstance(value, str):
+        value = value.strip().rstrip("%")
+    value = float(value)
+    if not math.isfinite(value) or not -100 <= value <= 1000:
+        raise ValueError(f"Growth estimate out of range: {value}")
+    return value
+
+
+# Validated forecasts from a batch reply -> {ticker: {"6M": growth, "12M": growth}} for the
+# requested tickers that came back well-formed, keyed as requested (the reply's tickers are
+# matched case-insensitively); anything else is left out
+def parse_growth_forecasts(text, tickers):
+    start, end = text.find("{"), text.rfind("}")
+    try:
+        data = json.loads(text[start:end + 1]) if 0 <= start < end else None
+    except ValueError:
+        data = None
+    entries = data.get("forecasts") if isinstance(data, dict) else None
+    if not isinstance(entries, list):
+        return {}
+
+    wanted, forecasts = {}, {}
+    for ticker in tickers:
+        wanted.setdefault(ticker.strip().upper(), []).append(ticker)
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        ticker = str(entry.get("ticker", "")).strip().upper()
+        if ticker not in wanted:
+            continue
+        try:
+            forecast = {"6M": _growth_value(entry.get("growth_6m")), "12M": _growth_value(entry.get("growth_12m"))}
+        except (TypeError, ValueError):
+            continue
+        forecasts.update({requested: forecast for requested in wanted[ticker]})
+    return forecasts
+
+
+def _forecast_chunk(chunk, temperature, budget=None):
+    text = generate(growth_forecast_batch_prompt(chunk), max_tokens=100 + FORECAST_TOKENS_PER_TICKER * len(chunk),
+                    temperature=temperature, budget=budget)
+    return parse_growth_forecasts(text, chunk)
+
+
+# Growth forecasts for many tickers with one generation per chunk of FORECAST_CHUNK_SIZE tickers.
+# Only the tickers missing or malformed in a reply (or whose chunk failed) are asked for again,
+# up to `max_attempts` times in all; retries use a lower temperature, which also keeps them from
+# being answered with the cached reply that failed. `budget` is charged per Cohere call, as in generate().
+# -> ({ticker: {"6M": growth %, "12M": growth %}}, {ticker: error message})
+def generate_growth_forecasts(tickers, chunk_size=FORECAST_CHUNK_SIZE, max_attempts=FORECAST_MAX_ATTEMPTS,
+                              budget=None):
+    forecasts, last_errors = {}, {}
+    pending = list(dict.fromkeys(tickers))
+    with timed("forecast_batch", len(pending)):
+        for attempt in range(max_attempts):
+            if not pending:
+                break
+            if attempt:
+                REGISTRY.inc("markettrend_llm_forecast_retries_total", value=len(pending),
+                             help_text="Tickers asked for again after a failed or malformed forecast")
+            temperature = DEFAULT_TEMPERATURE / (attempt + 1)
+            chunks = [tuple(pending[i:i + chunk_size]) for i in range(0, len(pending), chunk_size)]
+            results, errors = fan_out(lambda chunk: _forecast_chunk(chunk, temperature, budget), chunks,
+                                      concurrency=FORECAST_CONCURRENCY)
+            for chunk, parsed in results.items():
+                forecasts.update(parsed)
+                last_errors.update({ticker: "Forecast missing or malformed in the AI response"
+                                    for ticker in chunk if ticker not in parsed})
+            for chunk, error in errors.items():
+                last_errors.update({ticker: f"AI Forecasting Failed: {str(error)}" for ticker in chunk})
+            pending = [ticker for ticker in pending if ticker not in forecasts]
+
+    return forecasts, {ticker: last_errors[ticker] for ticker in pending}
@@ -1,31 +1,77 @@
 import os
-import yfinance as yf
+import json
+import time
+import argparse
 import numpy as np
 import logging
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
-import cohere
+from PriceStore import get_store, period_start, FETCH_WORKERS, FETCH_BATCH_SIZE
+from RiskEngine import TRADING_DAYS, align_closes, compute_risk_metrics
+from OnlineRisk import get_book
+from Portfolio import get_model, normalize_weights, parse_shrinkage
+import Screener
+import Prefetch
+from QuantForecast import forecast as quant_forecast, METHODS, MAX_SIMULATIONS, SIMULATIONS
+import LLMClient
+from LLMCache import get_cache, configure_cache, CACHE_PATH
+from LLMClient import generate_insight, generate_growth_forecast, generate_growth_forecasts, sentiment_prompt
+from Concurrency import fan_out
+from Metrics import REGISTRY, timed
+from Resilience import upstream_stats
 
 app = Flask(__name__)
 CORS(app)
 
-logging.basicConfig(level=logging.DEBUG)
 
-# ---- FOR COHERE-API -----
-COHERE_API_KEY = os.getenv("your_API_key_here")  # Ensure API key is stored safely
-co = cohere.Client(COHERE_API_KEY)
+# Per-request stage timing breakdown, collected when the request asks for it with ?timings=1
+def _request_timings():
+    if request.args.get("timings", "").lower() in ("1", "true", "yes"):
+        g.timings = g.get("timings", {})
+        return g.timings
+    return None
 
 
-# Implementing the AI Model
-def generate_insight(prompt):
-    response = co.generate(
-        model="command-r-plus",
-        prompt=prompt,
-        max_tokens=300,
-        temperature=0.7
-    )
+# The "tickers" of a request body, stripped and without blanks -> list of str; ValueError if they
+# are not a list of strings
+def _ticker_list(body):
+    tickers = body.get("tickers", []) if isinstance(body, dict) else None
+    if not isinstance(tickers, list) or not all(isinstance(ticker, str) for ticker in tickers):
+        raise ValueError("tickers must be a list of strings")
+    return [ticker.strip() for ticker in tickers if ticker.strip()]
 
-    return response.generations[0].text.strip()
+
+# An integer option of a request body clamped to [low, high] -> int; ValueError if it is not a number
+def _int_option(body, name, default, low, high):
+    value = body.get(name, default)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer")
+    return min(max(value, low), high)
+
+
+# One access-log line per request, sized to the request (ticker count) rather than the payload
+@app.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _log_request(response):
+    body = request.get_json(silent=True) if request.is_json else None
+    tickers = body.get("tickers") if isinstance(body, dict) else None
+    tickers = len(tickers) if isinstance(tickers, list) else None
+    elapsed = (time.perf_counter() - g.get("request_started", time.perf_counter())) * 1000
+    REGISTRY.inc("markettrend_http_requests_total", (("path", request.path), ("status", response.status_code)),
+                 help_text="HTTP requests by path and status")
+    logging.info(f"{request.method} {request.path} {response.status_code} "
+                 f"{'' if tickers is None else f'tickers={tickers} '}{elapsed:.1f}ms")
+    return response
+
+# Fan-out bounds for /sentiment-insights/batch
+INSIGHT_CONCURRENCY = int(os.getenv("INSIGHT_CONCURRENCY", "8"))
+INSIGHT_TIMEOUT = float(os.getenv("INSIGHT_TIMEOUT", "60"))
 
 
 # Using "sentiment-insights" for AI prompt generation
@@ -38,84 +84,621 @@ def sentiment_insights():
 
     print(f"🔍 DEBUG: Received request for sentiment insights: {keyword}")
 
-    prompt = f"Analyze the market sentiment for {keyword}. Provide only 3 key insights based on financial trends. " \
-             f"Do not include any kind of summary."
-
     try:
-        insight = generate_insight(prompt)
-        return jsonify({"insight_text": insight, "key_sentence": insight.split(' ')[0]})
+        timings = _request_timings()
+        with timed("insight_request", timings=timings):
+            insight = generate_insight(sentiment_prompt(keyword))
+        return jsonify({"insight_text": insight, "key_sentence": insight.split(' ')[0],
+                        **({"_timings": timings} if timings is not None else {})})
         #return jsonify({"company": keyword, "insights": insight})
     except Exception as e:
         print(f"❌ DEBUG: AI Generation Failed: {str(e)}")
         return jsonify({"error": f"AI generation failed: {str(e)}"}), 500
 
 
-# Generate Future forecasts for chosen stocks
-def generate_growth_forecast(ticker):
+# Sentiment insights for many tickers at once, generated concurrently -> {ticker: insight or error}
+@app.route("/sentiment-insights/batch", methods=["POST"])
+def sentiment_insights_batch():
+    body = request.json or {}
+    try:
+        tickers = _ticker_list(body)
+        concurrency = _int_option(body, "concurrency", INSIGHT_CONCURRENCY, 1, INSIGHT_CONCURRENCY)
+        timeout = float(body.get("timeout", INSIGHT_TIMEOUT))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    if not tickers:
+        return jsonify({"error": "No tickers provided"}), 400
+    logging.info(f"Received batch sentiment request for {len(tickers)} tickers")
+
+    timings = _request_timings()
+    with timed("insight_batch", len(tickers), timings):
+        insights, errors = fan_out(lambda ticker: generate_insight(sentiment_prompt(ticker), rate_timeout=timeout),
+                                   tickers, concurrency=concurrency, timeout=timeout)
+
+    response_data = {}
+    for ticker in tickers:
+        if ticker in insights:
+            response_data[ticker] = {"insight_text": insights[ticker], "key_sentence": insights[ticker].split(' ')[0]}
+        else:
+            response_data[ticker] = {"error": f"AI generation failed: {str(errors[ticker])}"}
+    if errors:
+        logging.debug(f"Batch sentiment: {len(errors)} of {len(tickers)} insights failed "
+                      f"(first: {str(next(iter(errors.values())))[:200]})")
+    if timings is not None:
+        response_data["_timings"] = timings
+    return jsonify(response_data)
+
+
+# Hit/miss counters of the generation cache
+@app.route("/llm-cache/stats", methods=["GET"])
+def llm_cache_stats():
+    return jsonify(get_cache().stats())
+
+
+# Circuit breaker state, adaptive timeouts and recent latencies of the Yahoo Finance and Cohere upstreams
+@app.route("/upstreams", methods=["GET"])
+def upstreams():
+    return jsonify(upstream_stats())
+
 
-    # Constructing AI prompt
-    prompt = f"""
-            Predict the future stock performance of {ticker} based on its historical trends and market conditions.
-            Provide an estimated percentage growth for the next 6 months and 12 months.
-            Format the response as:
-            - 6-Month Growth Estimate: X%
-            - 12-Month Growth Estimate: Y%
-            """
+# Stage latency histograms, error counters, cache counters and upstream breaker states in the
+# Prometheus text format
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    upstream_stats()
+    cache_stats = get_cache().stats()
+    REGISTRY.set_gauge("markettrend_llm_cache_hits", value=cache_stats["hits"],
+                       help_text="Generation cache hits since start")
+    REGISTRY.set_gauge("markettrend_llm_cache_misses", value=cache_stats["misses"],
+                       help_text="Generation cache misses since start")
+    REGISTRY.set_gauge("markettrend_llm_cache_entries", value=cache_stats["entries"],
+                       help_text="Generations held in the in-memory cache")
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
 
+
+# Growth forecast for a single ticker, for clients that only talk to the API over HTTP
+@app.route("/growth-forecast", methods=["GET"])
+def growth_forecast():
+    ticker = request.args.get("ticker", "").strip()
+
+    if not ticker:
+        return jsonify({"error": "No ticker provided!"}), 400
+
+    return jsonify({"ticker": ticker, "forecast_text": generate_growth_forecast(ticker)})
+
+
+# AI growth forecasts for many tickers, a chunk of tickers per generation with a JSON reply.
+# Returns {ticker: {"6M": growth %, "12M": growth %} or {"error": ...}}
+@app.route("/growth-forecast/batch", methods=["POST"])
+def growth_forecast_batch():
     try:
-        response = co.generate(
-            model="command-r-plus",
-            prompt=prompt,
-            max_tokens=100,
-            temperature=0.7
-        )
+        tickers = list(dict.fromkeys(_ticker_list(request.json or {})))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    logging.info(f"Received batch forecast request for {len(tickers)} tickers")
+    if not tickers:
+        return jsonify({"error": "No tickers provided"}), 400
+
+    timings = _request_timings()
+    forecasts = Prefetch.warm_forecasts(tickers)
+    if forecasts:
+        REGISTRY.inc("markettrend_prefetch_warm_total", (("kind", "forecast"),), len(forecasts),
+                     help_text="Tickers answered from the prefetched watchlist state")
+    cold = [ticker for ticker in tickers if ticker not in forecasts]
+    errors = {}
+    if cold:
+        with timed("forecast_request", len(cold), timings):
+            generated, errors = generate_growth_forecasts(cold)
+        forecasts.update(generated)
+    response_data = {ticker: forecasts[ticker] if ticker in forecasts else {"error": errors[ticker]}
+                     for ticker in tickers}
+    if timings is not None:
+        response_data["_timings"] = timings
+    return jsonify(response_data)
 
-        forecast_text = response.generations[0].text.strip()
-        return forecast_text
 
+# Local Monte Carlo / GBM growth forecasts for many tickers at once, from their return history
+# (see QuantForecast.py). Body: {"tickers": [...], "method": "bootstrap" | "gbm", "simulations": N}.
+# Returns {ticker: {"6M": {"median", "low", "high"}, "12M": {...}} or {"error": ...}}, growth in %
+# with a 5%-95% band.
+@app.route("/growth-forecast/quant", methods=["POST"])
+def growth_forecast_quant():
+    try:
+        body = request.json or {}
+        tickers = list(dict.fromkeys(_ticker_list(body)))
+        method = body.get("method", "bootstrap")
+        if method not in METHODS:
+            raise ValueError(f"Unknown method: {method}. Use one of: {', '.join(METHODS)}")
+        simulations = _int_option(body, "simulations", SIMULATIONS, 100, MAX_SIMULATIONS)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    if not tickers:
+        return jsonify({"error": "No tickers provided"}), 400
+
+    try:
+        timings = _request_timings()
+        with timed("fetch", len(tickers), timings):
+            histories, errors = get_store().get_histories(tickers, period="1y")
+        response_data, valid = {}, {}
+        for ticker in tickers:
+            if ticker in errors:
+                response_data[ticker] = {"error": "Error retrieving market data"}
+            elif histories[ticker].empty:
+                response_data[ticker] = {"error": "Invalid ticker or no data available"}
+            else:
+                valid[ticker] = histories[ticker]
+
+        if valid:
+            closes = align_closes(valid)
+            with timed("quant_forecast", len(valid), timings):
+                results = quant_forecast(closes, method, simulations)
+            for i, ticker in enumerate(closes.columns):
+                response_data[ticker] = {label: {name: _rounded(values[i], 2) for name, values in bands.items()}
+                                         for label, bands in results.items()}
+
+        if timings is not None:
+            response_data["_timings"] = timings
+        return jsonify(response_data)
     except Exception as e:
-        return f"❌ AI Forecasting Failed: {str(e)}"
+        logging.error(f"Internal Server Error: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
+# Bounds for the per-request fetch options of /market-data
+MAX_FETCH_WORKERS = int(os.getenv("MARKET_MAX_FETCH_WORKERS", "32"))
+MAX_FETCH_BATCH_SIZE = int(os.getenv("MARKET_MAX_FETCH_BATCH_SIZE", "200"))
+
+
+# Metrics reported per ticker by /market-data (besides current_price)
+RISK_FIELDS = ["volatility", "VaR_95", "CVaR_95", "max_drawdown", "sharpe"]
+
+
+# Rounding for the JSON response; NaN (e.g. a ticker with a single bar) becomes null
+def _rounded(value, digits):
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+# Optional overrides of the store's download concurrency and batch size from a request body
+def _fetch_options(body):
+    concurrency = _int_option(body, "concurrency", FETCH_WORKERS, 1, MAX_FETCH_WORKERS)
+    batch_size = _int_option(body, "batch_size", FETCH_BATCH_SIZE, 1, MAX_FETCH_BATCH_SIZE)
+    return concurrency, batch_size
+
+
+# Per-ticker response records for a set of fetched histories and fetch errors.
+# Metrics for all valid tickers are computed in one vectorized pass; current_price is the
+# latest bar already fetched.
+def _risk_records(tickers, histories, errors, timings=None):
+    records, valid = {}, {}
+    for ticker in tickers:
+        if ticker in errors:
+            logging.error(f"Error fetching data for {ticker}: {str(errors[ticker])}")
+            records[ticker] = {"error": "Error retrieving market data"}
+        elif histories[ticker].empty:
+            logging.warning(f"No data available for ticker: {ticker}")
+            records[ticker] = {"error": "Invalid ticker or no data available"}
+        else:
+            valid[ticker] = histories[ticker]
+
+    with timed("risk_compute", len(valid), timings):
+        metrics = compute_risk_metrics(align_closes(valid))
+    for ticker in valid:
+        records[ticker] = {
+            "current_price": _rounded(metrics.at[ticker, "current_price"], 2),
+            **{name: _rounded(metrics.at[ticker, name], 4) for name in RISK_FIELDS}
+        }
+    return records
+
+
+# Records of watchlist tickers the prefetch scheduler refreshed recently (see Prefetch.py)
+def _warm_market_data(tickers):
+    warm = Prefetch.warm_market_data(tickers)
+    if warm:
+        REGISTRY.inc("markettrend_prefetch_warm_total", (("kind", "market_data"),), len(warm),
+                     help_text="Tickers answered from the prefetched watchlist state")
+    return warm
 
 
 # For Market Trend Analysis
 @app.route("/market-data", methods=["POST"])
 def market_data():
     try:
-        tickers = request.json.get("tickers", [])
-        logging.info(f"Received request for tickers: {tickers}")
-        if not tickers:
-            return jsonify({"error": "No tickers provided"}), 400
+        body = request.json or {}
+        tickers = _ticker_list(body)
+        concurrency, batch_size = _fetch_options(body)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    logging.info(f"Received request for {len(tickers)} tickers")
+    if not tickers:
+        return jsonify({"error": "No tickers provided"}), 400
+
+    try:
+        timings = _request_timings()
+        warm = _warm_market_data(tickers)
+        cold = [ticker for ticker in tickers if ticker not in warm]
+        with timed("fetch", len(cold), timings):
+            histories, errors = get_store().get_histories(cold, period="1y", max_workers=concurrency,
+                                                          batch_size=batch_size)
+        records = _risk_records(cold, histories, errors, timings)
+        response_data = {ticker: warm[ticker] if ticker in warm else records[ticker] for ticker in tickers}
+
+        logging.debug(f"Returning {len(response_data)} records "
+                      f"({sum('error' in record for record in response_data.values())} errors)")
+        if timings is not None:
+            response_data["_timings"] = timings
+        with timed("serialize", len(tickers)):
+            return jsonify(response_data)
+    except Exception as e:
+        logging.error(f"Internal Server Error: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+
+def _encode_history_arrow(closes, metrics, errors, dtype):
+    import pyarrow as pa
+
+    columns = {"Date": pa.array(closes.index.to_numpy(dtype="datetime64[ns]"))}
+    values = closes.to_numpy(dtype=dtype)
+    for i, ticker in enumerate(closes.columns):
+        column = values[:, i]
+        columns[ticker] = pa.array(column, mask=np.isnan(column))
+    table = pa.table(columns).replace_schema_metadata({"metrics": json.dumps(metrics), "errors": json.dumps(errors)})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+# Aligned daily closes (dates x tickers) plus the risk metrics over the same period, for charting.
+# Body: {"tickers": [...], "period": "1y", "float32": false}. Served as an Arrow IPC stream (one
+# column per ticker, metrics and errors in the schema metadata) when the client accepts
+# application/vnd.apache.arrow.stream, otherwise as JSON: {"dates", "closes": {ticker: [...]},
+# "metrics", "errors"}. float32 halves the Arrow payload at ~7 significant digits; JSON always
+# carries the float64 closes, whose shortest repr is already shorter than a widened float32's.
+@app.route("/history", methods=["POST"])
+def history():
+    try:
+        body = request.json or {}
+        tickers = list(dict.fromkeys(_ticker_list(body)))
+        concurrency, batch_size = _fetch_options(body)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    period = body.get("period", "1y")
+    if not tickers:
+        return jsonify({"error": "No tickers provided"}), 400
+    try:
+        period_start(period)
+    except (TypeError, ValueError):
+        return jsonify({"error": f"Invalid period: {period}"}), 400
+    dtype = np.float32 if body.get("float32") else np.float64
 
-        response_data = {}
+    try:
+        timings = _request_timings()
+        with timed("fetch", len(tickers), timings):
+            histories, fetch_errors = get_store().get_histories(tickers, period=period, max_workers=concurrency,
+                                                                batch_size=batch_size)
+        errors = {ticker: "Error retrieving market data" for ticker in fetch_errors}
+        errors.update({ticker: "Invalid ticker or no data available"
+                       for ticker, hist in histories.items() if hist.empty})
+        valid = {ticker: histories[ticker] for ticker in tickers if ticker not in errors}
+
+        with timed("risk_compute", len(valid), timings):
+            closes = align_closes(valid)
+            risk = compute_risk_metrics(closes)
+        metrics = {ticker: {name: None if np.isnan(value) else float(value) for name, value in row.items()}
+                   for ticker, row in risk.to_dict(orient="index").items()}
+
+        use_arrow = request.accept_mimetypes.best_match(["application/json", ARROW_STREAM]) == ARROW_STREAM
+        with timed("serialize", len(valid), timings):
+            if use_arrow:
+                return Response(_encode_history_arrow(closes, metrics, errors, dtype), mimetype=ARROW_STREAM)
+            values = closes.to_numpy(dtype=np.float64)
+            return jsonify({
+                "dates": [date.strftime("%Y-%m-%d") for date in closes.index],
+                "closes": {ticker: [None if np.isnan(v) else float(v) for v in values[:, i]]
+                           for i, ticker in enumerate(closes.columns)},
+                "metrics": metrics,
+                "errors": errors,
+                **({"_timings": timings} if timings is not None else {}),
+            })
+    except Exception as e:
+        logging.error(f"Internal Server Error: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
+# Streaming variant of /market-data: one {"ticker": ..., <metrics or error>} record per ticker,
+# sent as soon as its batch is computed. NDJSON by default, server-sent events when the client
+# sends "Accept: text/event-stream". A final {"done": true} record marks the end of the stream.
+@app.route("/market-data/stream", methods=["POST"])
+def market_data_stream():
+    try:
+        body = request.json or {}
+        tickers = _ticker_list(body)
+        concurrency, batch_size = _fetch_options(body)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    logging.info(f"Received streaming request for {len(tickers)} tickers")
+    if not tickers:
+        return jsonify({"error": "No tickers provided"}), 400
+
+    timings = _request_timings()
+    use_sse = request.accept_mimetypes.best_match(["application/x-ndjson", "text/event-stream"]) == \
+        "text/event-stream"
+
+    def encode(record):
+        line = json.dumps(record)
+        return f"data: {line}\n\n" if use_sse else f"{line}\n"
+
+    def generate():
+        try:
+            warm = _warm_market_data(tickers)
+            for ticker, record in warm.items():
+                yield encode({"ticker": ticker, **record})
+            cold = [ticker for ticker in dict.fromkeys(tickers) if ticker not in warm]
+            with timed("stream", len(cold), timings):
+                chunks = get_store().iter_histories(cold, period="1y", max_workers=concurrency,
+                                                    batch_size=batch_size) if cold else []
+                for histories, errors in chunks:
+                    records = _risk_records(list(histories) + list(errors), histories, errors, timings)
+                    for ticker, record in records.items():
+                        yield encode({"ticker": ticker, **record})
+        except Exception as e:
+            logging.error(f"Internal Server Error: {str(e)}")
+            yield encode({"error": "Internal server error"})
+        yield encode({"done": True, **({"_timings": timings} if timings is not None else {})})
+
+    mimetype = "text/event-stream" if use_sse else "application/x-ndjson"
+    return Response(generate(), mimetype=mimetype, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# Store refresh interval for the live endpoint, so a poll every minute picks up the latest bar
+LIVE_MAX_AGE = int(os.getenv("LIVE_MAX_AGE", "60"))
+LIVE_FIELDS = ["volatility", "VaR_95", "CVaR_95", "sharpe"]
+
+
+# Intraday variant of /market-data for frequent polling: each ticker's risk state is kept
+# between requests and only the bars that arrived since the last poll are applied to it
+# (see OnlineRisk.py for the tolerance against the batch computation). Max drawdown needs
+# the whole window and is left to /market-data.
+@app.route("/market-data/live", methods=["POST"])
+def market_data_live():
+    try:
+        body = request.json or {}
+        tickers = list(dict.fromkeys(_ticker_list(body)))
+        concurrency, batch_size = _fetch_options(body)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    logging.info(f"Received live request for {len(tickers)} tickers")
+    if not tickers:
+        return jsonify({"error": "No tickers provided"}), 400
+
+    try:
+        timings = _request_timings()
+        with timed("fetch", len(tickers), timings):
+            histories, errors = get_store().get_histories(tickers, period="1y", max_workers=concurrency,
+                                                          batch_size=batch_size, max_age=LIVE_MAX_AGE)
+
+        response_data, valid = {}, {}
         for ticker in tickers:
-            try:
-                stock = yf.Ticker(ticker)
-                hist = stock.history(period="1y")
-
-                if hist.empty:
-                    logging.warning(f"No data available for ticker: {ticker}")
-                    response_data[ticker] = {"error": "Invalid ticker or no data available"}
-                    continue
-
-                hist["Returns"] = hist["Close"].pct_change()
-                volatility = np.std(hist["Returns"]) * np.sqrt(252)
-                VaR_95 = np.percentile(hist["Returns"].dropna(), 5)
-
-                response_data[ticker] = {
-                    "current_price": round(stock.history(period="1d")["Close"].iloc[-1], 2),
-                    "volatility": round(volatility, 4),
-                    "VaR_95": round(VaR_95, 4)
-                }
-            except Exception as e:
-                logging.error(f"Error fetching data for {ticker}: {str(e)}")
+            if ticker in errors:
+                logging.error(f"Error fetching data for {ticker}: {str(errors[ticker])}")
                 response_data[ticker] = {"error": "Error retrieving market data"}
+            elif histories[ticker].empty:
+                response_data[ticker] = {"error": "Invalid ticker or no data available"}
+            else:
+                valid[ticker] = histories[ticker]
+
+        with timed("risk_update", len(valid), timings):
+            metrics = get_book().update(valid)
+        for ticker, values in metrics.items():
+            response_data[ticker] = {
+                "current_price": _rounded(values["current_price"], 2),
+                **{name: _rounded(values[name], 4) for name in LIVE_FIELDS}
+            }
 
-        logging.info(f"Returning response: {response_data}")
+        if timings is not None:
+            response_data["_timings"] = timings
         return jsonify(response_data)
     except Exception as e:
         logging.error(f"Internal Server Error: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
 
+# Portfolio view: correlation matrix (optionally Ledoit-Wolf shrunk), portfolio volatility and
+# parametric / historical VaR for the given weights. Body: {"tickers": [...], "weights": {ticker: w}
+# or [w, ...] in ticker order (default equal), "shrinkage": "ledoit_wolf" | "none" | 0..1,
+# "include_covariance": false}. Tickers without data are reported in "errors" and left out.
+@app.route("/portfolio", methods=["POST"])
+def portfolio():
+    try:
+        body = request.json or {}
+        tickers = list(dict.fromkeys(_ticker_list(body)))
+        logging.info(f"Received portfolio request for {len(tickers)} tickers")
+        if len(tickers) < 2:
+            return jsonify({"error": "At least two tickers are needed for a portfolio"}), 400
+
+        weights = body.get("weights")
+        if isinstance(weights, list):
+            if len(weights) != len(tickers):
+                return jsonify({"error": f"Expected {len(tickers)} weights, got {len(weights)}"}), 400
+            weights = dict(zip(tickers, weights))
+        shrinkage = parse_shrinkage(body.get("shrinkage", "ledoit_wolf"))
+
+        concurrency, batch_size = _fetch_options(body)
+        timings = _request_timings()
+        with timed("fetch", len(tickers), timings):
+            histories, errors = get_store().get_histories(tickers, period="1y", max_workers=concurrency,
+                                                          batch_size=batch_size)
+        failed = {ticker: "Error retrieving market data" for ticker in errors}
+        failed.update({ticker: "Invalid ticker or no data available"
+                       for ticker, hist in histories.items() if hist.empty})
+        valid = {ticker: histories[ticker] for ticker in tickers if ticker not in failed}
+        if len(valid) < 2:
+            return jsonify({"error": "Not enough tickers with data", "errors": failed}), 400
+
+        with timed("portfolio_compute", len(valid), timings):
+            model = get_model(align_closes(valid), shrinkage)
+            if weights is not None:
+                weights = {ticker: weight for ticker, weight in weights.items() if ticker not in failed}
+            weight_values = normalize_weights(model.tickers, weights)
+            risk = model.risk(weight_values)
+            correlation = np.round(model.correlation, 4)
+
+        response_data = {
+            "tickers": model.tickers,
+            "weights": {ticker: round(float(w), 6) for ticker, w in zip(model.tickers, weight_values)},
+            "shrinkage": round(model.shrinkage, 4),
+            "observations": int(model.returns.shape[0]),
+            "correlation": np.where(np.isnan(correlation), None, correlation).tolist(),
+            "portfolio": {name: _rounded(value, 4) for name, value in risk.items()},
+            "errors": failed,
+        }
+        if body.get("include_covariance"):
+            response_data["covariance"] = (model.covariance * TRADING_DAYS).round(8).tolist()
+        if timings is not None:
+            response_data["_timings"] = timings
+        with timed("serialize", len(valid)):
+            return jsonify(response_data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logging.error(f"Internal Server Error: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
+# Universe screener as a background job: POST starts it and returns a job id, GET reports its
+# progress and, once done, the ranked rows. Body: {"universe": "<file in universes/>" or
+# "tickers": [...], "metric": "sharpe", "top": 20, "ascending": false}
+MAX_SCREENER_TOP = int(os.getenv("SCREENER_MAX_TOP", "500"))
+
+
+@app.route("/screener", methods=["POST"])
+def start_screener():
+    try:
+        body = request.json or {}
+        tickers = Screener.load_universe(Screener.universe_path(body["universe"])) if body.get("universe") \
+            else list(dict.fromkeys(ticker.upper() for ticker in _ticker_list(body)))
+        metric = body.get("metric", "sharpe")
+        if metric not in Screener.METRICS:
+            raise ValueError(f"Unknown metric: {metric}. Use one of: {', '.join(Screener.METRICS)}")
+        top_k = min(max(int(body.get("top", 20)), 1), MAX_SCREENER_TOP)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    if not tickers:
+        return jsonify({"error": "No tickers provided"}), 400
+
+    options = {"metric": metric, "top_k": top_k, "descending": False if body.get("ascending") else None}
+    job_id = Screener.start_job(tickers, **options)
+    if job_id is None:
+        return jsonify({"error": f"Too many screener jobs running (at most {Screener.MAX_JOBS}), "
+                                 f"try again later"}), 429
+    logging.info(f"Started screener job {job_id} over {len(tickers)} tickers by {metric}")
+    return jsonify({"job_id": job_id, "total": len(tickers)}), 202
+
+
+@app.route("/screener/<job_id>", methods=["GET"])
+def screener_status(job_id):
+    state = Screener.read_job(job_id)
+    if state is None:
+        return jsonify({"error": "Unknown screener job"}), 404
+    return jsonify(state)
+
+
+@app.route("/screener/universes", methods=["GET"])
+def screener_universes():
+    return jsonify({"universes": Screener.list_universes(), "metrics": list(Screener.METRICS)})
+
+
+# Watchlists kept warm by the prefetch scheduler, with the last refresh of every ticker
+# (epoch seconds per task: market_data_at, insight_at, forecast_at; failures and retry times)
+@app.route("/watchlists", methods=["GET"])
+def watchlists():
+    watchlists = Prefetch.load_watchlists()
+    state = Prefetch.read_state()
+    entries = state.get("tickers", {})
+    return jsonify({
+        "watchlists": watchlists,
+        "tickers": {ticker: Prefetch.ticker_status(entries.get(ticker, {}))
+                    for ticker in Prefetch.watchlist_tickers(watchlists)},
+        "scheduler": {**state.get("scheduler", {}), "enabled": Prefetch.ENABLED},
+    })
+
+
+# Creating or replacing a watchlist: {"tickers": [...]}. The scheduler warms it on its next run.
+@app.route("/watchlists/<name>", methods=["PUT"])
+def put_watchlist(name):
+    try:
+        watchlists = Prefetch.save_watchlist(name, (request.json or {}).get("tickers", []))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({name: watchlists[name]})
+
+
+@app.route("/watchlists/<name>", methods=["DELETE"])
+def delete_watchlist(name):
+    try:
+        Prefetch.save_watchlist(name, None)
+    except (KeyError, ValueError):
+        return jsonify({"error": f"Unknown watchlist: {name}"}), 404
+    return jsonify({"deleted": name})
+
+
+# Cache file shared by all workers in production mode when LLM_CACHE_PATH is not set
+SHARED_LLM_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.sqlite")
+
+
+# Production serving: `workers` pre-forked gunicorn processes with `threads` threads each.
+# Price history is already shared on disk; the generation cache is switched to one SQLite
+# file for all workers, and the Cohere rate budget is split between them.
+def run_production_server(host, port, workers, threads, timeout):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise SystemExit("Production mode needs gunicorn: pip install gunicorn")
+
+    configure_cache(path=CACHE_PATH or SHARED_LLM_CACHE_PATH)
+    LLMClient.llm_rate_limiter.rate /= workers
+    LLMClient.llm_rate_limiter.capacity = max(1, LLMClient.llm_rate_limiter.capacity // workers)
+
+    class ProductionServer(BaseApplication):
+
+        def load_config(self):
+            self.cfg.set("bind", f"{host}:{port}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("threads", threads)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("timeout", timeout)
+            self.cfg.set("accesslog", None)  # _log_request already logs every request
+            # Every worker starts a prefetch scheduler; the leader lock lets one of them run
+            self.cfg.set("post_fork", lambda server, worker: Prefetch.start(_risk_records))
+
+        def load(self):
+            return app
+
+    ProductionServer().run()
+
+
 if __name__ == "__main__":
-    app.run(debug=True, port=5000)
+    parser = argparse.ArgumentParser(description="MarketTrend AI backend")
+    parser.add_argument("--mode", choices=["dev", "prod"], default="dev",
+                        help="dev: Flask debug server with reloader; prod: multi-worker gunicorn server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("MARKET_API_WORKERS", "4")),
+                        help="prod mode: worker processes")
+    parser.add_argument("--threads", type=int, default=int(os.getenv("MARKET_API_THREADS", "8")),
+                        help="prod mode: threads per worker")
+    parser.add_argument("--timeout", type=int, default=120, help="prod mode: worker timeout in seconds")
+    args = parser.parse_args()
+
+    if args.mode == "prod":
+        logging.basicConfig(level=logging.INFO)
+        run_production_server(args.host, args.port, args.workers, args.threads, args.timeout)
+    else:
+        logging.basicConfig(level=logging.DEBUG)
+        if os.environ.get("WERKZEUG_RUN_MAIN") == "true":  # the reloader's serving process
+            Prefetch.start(_risk_records)
+        app.run(debug=True, host=args.host, port=args.port)
@@ -1,14 +1,15 @@
+import os
+import time
 import streamlit as st
 import requests
 import pandas as pd
-import plotly.graph_objects as go
-import yfinance as yf
-import numpy as np
-import plotly.express as px
-from MarketAnalysis import generate_growth_forecast
-
-# 📌 **Backend API URL**
-FLASK_API_URL = "http://127.0.0.1:5000"
+from BackendClient import stream_market_data, fetch_insights, fetch_growth_forecasts, fetch_portfolio, \
+    fetch_quant_forecasts, start_screener, fetch_screener_job, fetch_screener_options, fetch_history, \
+    fetch_watchlists
+import Charts
+from Metrics import REGISTRY, timed
+from HistoryCache import HistoryCache
+from Universe import parse_universe
 
 
 # Page styling
@@ -169,34 +170,126 @@ def convert_df_to_csv(df):
 
 
 # Set period for stock-analysis
-period = '18mo'
+period = Charts.PERIOD
 
 
-@st.cache_data
-def fetch_top_companies_stock(tickers):
-    stock_data = {ticker: yf.Ticker(ticker).history(period=period) for ticker in tickers}
-    return stock_data
+# Seconds a ticker's results are reused across reruns before the backend is asked again; an
+# error or a ticker without data is only kept for ERROR_CACHE_TTL, so a transient failure clears soon
+CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "300"))
+ERROR_CACHE_TTL = int(os.getenv("DASHBOARD_ERROR_TTL", "15"))
+FIGURE_CACHE_ENTRIES = 32
+
+
+# Per-ticker results of one dashboard section, kept in the session so that a rerun (every widget
+# interaction) does not fetch them again. Only tickers not fetched yet, or fetched more than
+# CACHE_TTL seconds ago (ERROR_CACHE_TTL for an error record), are passed to
+# `fetch(tickers) -> {ticker: result}`; a ticker it leaves out is remembered as None (no data).
+# Changing one ticker therefore fetches just that one.
+def per_ticker(section, tickers, fetch):
+    cache = st.session_state.setdefault(f"{section}_cache", {})
+    now = time.time()
+    for ticker in [t for t, (fetched_at, result) in cache.items()
+                   if now - fetched_at > (CACHE_TTL if result and "error" not in result else ERROR_CACHE_TTL)]:
+        del cache[ticker]
+    missing = [ticker for ticker in tickers if ticker not in cache]
+    if missing:
+        results = fetch(missing)
+        cache.update((ticker, (now, results.get(ticker))) for ticker in missing)
+    return {ticker: cache[ticker][1] for ticker in tickers}
+
+
+# Daily closes from the backend, as a compact float32 Arrow stream
+def fetch_closes(tickers):
+    with timed("dashboard_history", len(tickers)):
+        closes, _, _ = fetch_history(tickers, period=period, float32=True)
+    return closes
+
 
+# One history cache for the whole dashboard process: every session charting a ticker shares
+# a single compact copy of its closes (see HistoryCache.py)
+@st.cache_resource
+def history_cache():
+    return HistoryCache(ttl=CACHE_TTL, empty_ttl=ERROR_CACHE_TTL)
 
-def calculate_risk_metrics(stock_data):
-    risk_data = {}
-    for ticker, data in stock_data.items():
-        returns = data["Close"].pct_change().dropna()
-        volatility = np.std(returns) * np.sqrt(252)
-        var_95 = np.percentile(returns, 5)
-        risk_data[ticker] = {"Volatility": round(volatility * 100, 2), "VaR": round(var_95 * 100, 2)}
-    return pd.DataFrame(risk_data).T
 
+# Aligned closes (dates x tickers) of the selected tickers that have data, or None
+def stock_history(tickers):
+    return history_cache().frame(tickers, period, fetch_closes)
+
+
+@st.cache_data(ttl=300)
+def screener_options():
+    try:
+        return fetch_screener_options()
+    except Exception:
+        return {"universes": [], "metrics": ["sharpe", "growth", "volatility", "VaR_95", "CVaR_95", "max_drawdown"]}
+
+
+# Puts the given tickers (e.g. the screener's ranked tickers) into the ticker input and runs the analysis on them
+def analyze_tickers(tickers):
+    st.session_state.tickers_input = ",".join(tickers)
+    st.session_state.fetch_triggered = True
+
+
+# -- Universe Screener: rank a whole universe file on the backend and load the top tickers --- #
+if "tickers_input" not in st.session_state:
+    st.session_state.tickers_input = "AAPL,MSFT,GOOGL"
+if "screener_result" not in st.session_state:
+    st.session_state.screener_result = None
+
+with st.expander("🔎 Universe Screener"):
+    options = screener_options()
+    source = st.radio("Universe", ["Upload a file", "Universe on the server"], horizontal=True)
+    if source == "Upload a file":
+        upload = st.file_uploader("Universe file (one ticker per line, or a CSV with a ticker column)",
+                                  type=["txt", "csv"])
+        universe_name, universe_tickers = None, None
+        if upload is not None:
+            universe_tickers = parse_universe(upload.getvalue().decode("utf-8").splitlines(),
+                                              is_csv=upload.name.lower().endswith(".csv"))
+    else:
+        universe_name = st.selectbox("Universe file", options["universes"])
+        universe_tickers = None
+    screen_metric = st.selectbox("Rank by", options["metrics"])
+    screen_top = st.number_input("Top", min_value=1, max_value=500, value=20)
+
+    if st.button("Run Screener", disabled=not (universe_name or universe_tickers)):
+        try:
+            with timed("dashboard_screener"):
+                job = start_screener(screen_metric, int(screen_top), universe=universe_name,
+                                     tickers=universe_tickers)
+                progress_bar = st.progress(0.0, text=f"Screening {job['total']} tickers...")
+                while True:
+                    state = fetch_screener_job(job["job_id"])
+                    progress_bar.progress(state["done"] / max(state["total"], 1),
+                                          text=f"{state['done']}/{state['total']} tickers screened")
+                    if state["status"] != "running":
+                        break
+                    time.sleep(0.5)
+            if state["status"] == "done":
+                st.session_state.screener_result = state["result"]
+            else:
+                st.error(f"❌ Screener failed: {state.get('error', 'Unknown error')}")
+        except requests.exceptions.RequestException as e:
+            st.error(f"Network error running the screener: {e}")
+        except ValueError as e:
+            st.error(f"❌ Screener failed: {e}")
+
+    result = st.session_state.screener_result
+    if result:
+        st.caption(f"Top {len(result['top'])} of {result['scanned']} tickers by {result['metric']} "
+                   f"({result['failed']} without data, {result['seconds']:.1f}s)")
+        st.dataframe(pd.DataFrame(result["top"]).set_index("ticker"), width="stretch")
+        st.button("Analyze these tickers", on_click=analyze_tickers,
+                  args=([row["ticker"] for row in result["top"]],))
 
 st.subheader("Enter Stock Tickers (Comma Separated)")
-user_input = st.text_area("Enter tickers:", "AAPL,MSFT,GOOGL")
+user_input = st.text_area("Enter tickers:", key="tickers_input")
 selected_tickers = [ticker.strip().upper() for ticker in user_input.split(",") if ticker.strip()]
 
 # Session state variables initialisation - Optimized approach to avoid full-page reload
 if "all_risk_data" not in st.session_state:
     st.session_state.all_risk_data = None
-if "stock_data" not in st.session_state:
-    st.session_state.stock_data = None
 if "market_insights" not in st.session_state:
      st.session_state.market_insights = []
 if "fetch_triggered" not in st.session_state:
@@ -212,118 +305,45 @@ def fetch_data():
 st.button("Fetch Data", on_click=fetch_data)
 
 
-if st.session_state.fetch_triggered and selected_tickers:
-    try:
-        response = requests.post("http://127.0.0.1:5000/market-data", json={"tickers": selected_tickers})
-        if response.status_code != 200:
-            st.error(f"Error fetching data: {response.json().get('error', 'Unknown error')}")
-        else:
-            st.session_state.all_risk_data = response.json()
-            st.session_state.stock_data = fetch_top_companies_stock(selected_tickers)
-    except requests.exceptions.RequestException as e:
-        st.error(f"Network error fetching data: {e}")
-    except ValueError:
-        st.error("Invalid response received from server.")
+# Risk comparison chart and risk table for the records received so far. Called once per
+# streamed record with an increasing `update` so each redraw gets fresh element keys.
+def render_risk_metrics(risk_data, update, final=False):
+    st.subheader("Risk Metrics")
 
-    if not st.session_state.all_risk_data:
-        st.warning("No valid data available for selected tickers.")
-    else:
-        # Stock Performance & Risk Metrics Graph
-        st.subheader("Stock Performance")
-        st.line_chart({ticker: data["Close"] for ticker, data in st.session_state.stock_data.items()})
-        # st.table(calculate_risk_metrics(stock_data))
-
-        # 📈Growth Potential Graph for Selected Companies
-        st.subheader("Growth Rate")
-
-        # Computing growth over the last {period} months
-        growth_data = {}
-        for ticker, data in st.session_state.stock_data.items():
-            if not data.empty:
-                start_price = data["Close"].iloc[0]  # First available price
-                end_price = data["Close"].iloc[-1]  # Latest price
-                growth_rate = ((end_price - start_price) / start_price) * 100  # Percentage change
-                growth_data[ticker] = round(growth_rate, 2)
-
-        # Converting to DataFrame for better visualization
-        growth_df = pd.DataFrame.from_dict(growth_data, orient='index', columns=["Growth (%)"])
-        growth_df.reset_index(inplace=True)
-        growth_df.rename(columns={"index": "Company"}, inplace=True)
-
-        # Plotting growth potential as a bar chart
-        fig_growth = go.Figure()
-        heading_color = "#005A9C"
-        fig_growth.add_trace(go.Bar(x=growth_df["Company"], y=growth_df["Growth (%)"], text=growth_df["Growth (%)"],
-                                    textposition='auto', marker=dict(color=heading_color)))
-
-        fig_growth.update_layout(title=f'Growth Potential Over Last {period[:2]} Months',
-                                 xaxis_title="Company",
-                                 yaxis_title="Growth (%)",
-                                 barmode='group',
-                                 template="plotly_white",
-                                 margin=dict(l=40, r=40, t=50, b=50),  # Proper margins to prevent overflow
-                                 width=650,  # Ensures responsiveness
-                                 height=425,  # Optional: Adjust height
-                                 xaxis=dict(tickangle=-45, automargin=True)
-                                 )
-
-        st.plotly_chart(fig_growth)
-        st.markdown('</div>', unsafe_allow_html=True)
-
-        # Display Risk Metrics
-        st.subheader("Risk Metrics")
-
-        fig = go.Figure()
-        for ticker, data in st.session_state.all_risk_data.items():
-            if "error" in data:
-                st.warning(f"{ticker}: {data['error']}")
-                continue
-            fig.add_trace(go.Bar(x=["Annual Volatility", "Value at Risk (95%)"], y=[data['volatility'], data['VaR_95']],
-                                 name=ticker))
-        fig.update_layout(title='Comparison', xaxis_title='Metric', yaxis_title='Value', barmode='group',
-                          margin=dict(l=40, r=40, t=50, b=50),  # Proper margins to prevent overflow
-                          width=650,  # Ensures responsiveness
-                          height=410,  # Optional: Adjust height
-                          xaxis=dict(tickangle=-45, automargin=True)
-                          )
-        st.plotly_chart(fig)
-        risk_table = pd.DataFrame.from_dict(st.session_state.all_risk_data, orient='index').reset_index()
-
-        risk_table = risk_table.rename(
-            columns={"index": "Company", "current_price": "Current Price ($)", "VaR_95": "Value at Risk (95%)",
-                     "volatility": "Annual Volatility"})[
-            ["Company", "Current Price ($)", "Value at Risk (95%)", "Annual Volatility"]]
-
-        # Applying CSS Styling for Centering Headers in DataFrame
-        st.markdown("""
-            <style>
-            div[data-testid="stDataFrame"] table {
-                width: 100%;
-            }
-            th {
-                text-align: center !important;
-                font-weight: bold !important;
-            }
-            td {
-                text-align: left !important;
-            }
-            </style>
-            """, unsafe_allow_html=True)
-
-        st.dataframe(
-            risk_table.set_index("Company").style.format({
-                "Current Price ($)": "${:,.2f}",
-                "Value at Risk (95%)": "{:.4f}",
-                "Annual Volatility": "{:.4f}"
-            }).set_table_styles(
-                [{"selector": "th",
-                  "props": [("font-size", "16px"), ("text-align", "center"), ("background-color", "#005A9C"),
-                            ("color", "white")]}]
-            ),
-            use_container_width=True,
-            height=400
-        )
+    for ticker, data in risk_data.items():
+        if "error" in data:
+            st.warning(f"{ticker}: {data['error']}")
+    st.plotly_chart(Charts.risk_comparison_figure(risk_data), key=f"risk_chart_{update}")
+    risk_table = Charts.risk_table(risk_data)
 
+    # Applying CSS Styling for Centering Headers in DataFrame
+    st.markdown("""
+        <style>
+        div[data-testid="stDataFrame"] table {
+            width: 100%;
+        }
+        th {
+            text-align: center !important;
+            font-weight: bold !important;
+        }
+        td {
+            text-align: left !important;
+        }
+        </style>
+        """, unsafe_allow_html=True)
+
+    st.dataframe(
+        risk_table.set_index("Company").style.format(Charts.RISK_TABLE_FORMAT, na_rep="-").set_table_styles(
+            [{"selector": "th",
+              "props": [("font-size", "16px"), ("text-align", "center"), ("background-color", "#005A9C"),
+                        ("color", "white")]}]
+        ),
+        width="stretch",
+        height=400,
+        key=f"risk_table_{update}"
+    )
+
+    if final:
         # Download Risk Table
         csv = convert_df_to_csv(risk_table)
         st.download_button(
@@ -332,121 +352,301 @@ if st.session_state.fetch_triggered and selected_tickers:
             "Risk_Data.csv",
             "text/csv",
             help="Download the risk data as a CSV file",
+            on_click="ignore",
+        )
+
+
+# Portfolio weights from the optional input -> ({ticker: weight} or None for equal weights, error)
+def parse_weights(text, tickers):
+    if not text.strip():
+        return None, None
+    try:
+        weights = [float(weight) for weight in text.split(",") if weight.strip()]
+    except ValueError:
+        return None, "Weights must be numbers"
+    if len(weights) != len(tickers):
+        return None, f"Expected {len(tickers)} weights, got {len(weights)}"
+    return dict(zip(tickers, weights)), None
+
+
+# Correlation heatmap and portfolio risk figures returned by the backend's /portfolio endpoint
+def render_portfolio(portfolio):
+    st.plotly_chart(Charts.correlation_figure(portfolio))
+
+    summary, caption = Charts.portfolio_summary(portfolio)
+    st.dataframe(summary.style.format("{:.4f}", na_rep="-"), width="stretch")
+    st.caption(caption)
+    for ticker, error in portfolio.get("errors", {}).items():
+        st.warning(f"{ticker}: {error}")
+
+
+AI_FORECAST = "AI (Cohere)"
+QUANT_FORECAST = "Quantitative (Monte Carlo)"
+
+
+# AI forecasts in one batch request for the tickers not forecast yet (the backend asks for many
+# tickers per generation)
+def ai_forecasts(tickers):
+    def fetch(missing):
+        with timed("dashboard_forecast", len(missing)):
+            return fetch_growth_forecasts(missing)
+
+    try:
+        results = per_ticker("ai_forecast", tickers, fetch)
+    except Exception as e:
+        st.error(f"❌ AI Forecasting Failed: {str(e)}")
+        results = {}
+
+    for ticker in tickers:
+        if "error" in (results.get(ticker) or {}):
+            st.warning(f"⚠️ No AI forecast for {ticker}: {results[ticker]['error']}")
+    return Charts.ai_forecast_table(tickers, results)
+
+
+# Local Monte Carlo forecasts in one request for the tickers not forecast yet: median growth and
+# its 5%-95% band
+def quant_forecasts(tickers):
+    def fetch(missing):
+        with timed("dashboard_quant_forecast", len(missing)):
+            return fetch_quant_forecasts(missing)
+
+    try:
+        results = per_ticker("quant_forecast", tickers, fetch)
+    except Exception as e:
+        st.error(f"❌ Quantitative forecast failed: {str(e)}")
+        results = {}
+
+    for ticker in tickers:
+        if "error" in (results.get(ticker) or {}):
+            st.warning(f"⚠️ No forecast for {ticker}: {results[ticker]['error']}")
+    return Charts.quant_forecast_table(tickers, results)
+
+
+# Risk records of the selected tickers (None for a ticker without data). Tickers not fetched yet
+# are streamed from the backend and the risk section in `slot` is redrawn as each one arrives.
+def market_data(tickers, slot):
+    known = st.session_state.get("risk_cache", {})
+
+    def stream(missing):
+        records = {ticker: known[ticker][1] for ticker in tickers if ticker in known and known[ticker][1]}
+        received = {}
+        with timed("dashboard_market_data", len(missing)):
+            for update, record in enumerate(stream_market_data(missing)):
+                if "ticker" not in record:
+                    st.error(f"Error fetching data: {record.get('error', 'Unknown error')}")
+                    continue
+                ticker = record.pop("ticker")
+                received[ticker] = records[ticker] = record
+                with slot.container():
+                    render_risk_metrics(records, update)
+        return received
+
+    return per_ticker("risk", tickers, stream)
+
+
+# The performance and growth figures are built once per data set and reused by later reruns
+# (the most recent FIGURE_CACHE_ENTRIES data sets, since every figure holds a copy of its data).
+# The price chart is a Plotly figure rather than st.line_chart, which rebuilt (and re-melted)
+# the whole chart on every rerun.
+@st.cache_data(show_spinner=False, max_entries=FIGURE_CACHE_ENTRIES)
+def performance_figure(stock_data):
+    return Charts.performance_figure(stock_data)
+
+
+@st.cache_data(show_spinner=False, max_entries=FIGURE_CACHE_ENTRIES)
+def growth_figure(stock_data):
+    return Charts.growth_figure(stock_data, period)
+
+
+# Backend portfolio risk per (tickers, weights), so only a change to either asks for it again
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def portfolio_risk(tickers, weights):
+    with timed("dashboard_portfolio", len(tickers)):
+        return fetch_portfolio(list(tickers), weights)
+
+
+# A fragment: editing the weights reruns only this section
+@st.fragment
+def portfolio_section(tickers):
+    st.subheader("Portfolio Risk")
+    weights_input = st.text_input("Portfolio weights (optional, comma separated, in ticker order):", "")
+    portfolio_weights, weights_error = parse_weights(weights_input, tickers)
+    if weights_error:
+        st.warning(f"⚠️ {weights_error}; using equal weights.")
+    try:
+        render_portfolio(portfolio_risk(tuple(tickers), portfolio_weights))
+    except requests.exceptions.RequestException as e:
+        st.error(f"Network error fetching portfolio risk: {e}")
+    except ValueError as e:
+        st.warning(f"⚠️ Portfolio risk unavailable: {e}")
+
+
+def insights_section(tickers):
+    st.subheader("Market Trend Analysis")
+
+    # One batch request for the tickers without insights yet; the backend generates them concurrently
+    def fetch(missing):
+        with timed("dashboard_insights", len(missing)):
+            return fetch_insights(missing)
+
+    insight_results = {}
+    try:
+        insight_results = {ticker: insight for ticker, insight in per_ticker("insights", tickers, fetch).items()
+                           if insight}
+    except ValueError:
+        st.warning("⚠️ No detailed insights available. API returned no data.")
+    except Exception as e:
+        st.error(f"❌ Error fetching sentiment insights: {str(e)}")
+
+    for ticker in tickers:
+        if ticker not in st.session_state.market_insights:
+            insight_data = insight_results.get(ticker)
+
+            if not insight_data:
+                st.warning(f"⚠️ No detailed insights available for {ticker}. API returned no data.")
+            elif "error" in insight_data:
+                st.warning(f"⚠️ No insights available for {ticker}: {insight_data['error']}")
+            else:
+                insight_text = insight_data.get("insight_text", "No detailed insight provided.")
+                # key_sentence = insight_data.get("key_sentence", "No key sentence extracted.")
+
+                st.markdown(f"<h5>📌 Key-Insights for {ticker}</h5>", unsafe_allow_html=True)
+                st.info(f"{insight_text}")
+                # st.write(f"**Key Sentence:** \"{key_sentence}\"")
+
+    # Part-2
+
+    all_insights = []  # Store insights for all companies
+
+    for ticker in tickers:
+        insight_data = insight_results.get(ticker, {})
+        if "insight_text" in insight_data:
+            all_insights.append({"Company": ticker, "Insights": insight_data["insight_text"]})
+            # {"Company": ticker, "AI Insight": insight_text, "Key Takeaway": key_sentence}
+
+    if all_insights:
+        # df_insights = pd.DataFrame(all_insights)
+        df_insights = pd.DataFrame(all_insights)[["Company", "Insights"]]
+        # st.dataframe(df_insights, use_container_width=True)
+
+        # Download insights
+        csv_insights = convert_df_to_csv(df_insights)
+
+        st.download_button(
+            "📥 Download Insights Data",
+            csv_insights,
+            "Market_Trend_Analysis.csv",
+            "text/csv",
+            help="Download the market trend analysis as a CSV file",
+            on_click="ignore",
         )
 
+
+# ----- FORECAST DISPLAY AND DOWNLOAD ----- #
+# A fragment: switching the forecast mode reruns only this section
+@st.fragment
+def forecast_section(tickers):
+    st.subheader("Growth Forecast")
+    forecast_mode = st.radio("Forecast mode", [AI_FORECAST, QUANT_FORECAST], horizontal=True)
+
+    if forecast_mode == AI_FORECAST:
+        df_forecast = ai_forecasts(tickers)
+        fig = Charts.ai_forecast_figure(df_forecast)
+    else:
+        df_forecast = quant_forecasts(tickers)
+        fig = Charts.quant_forecast_figure(df_forecast)
+    st.plotly_chart(fig)
+
+    csv_forecast = convert_df_to_csv(df_forecast)
+
+    st.download_button(
+        label="📥 Download Growth Forecast data",
+        data=csv_forecast,
+        file_name="Growth_Forecasts.csv",
+        mime="text/csv",
+        help="Download the growth forecast as a CSV file",
+        on_click="ignore",
+    )
+
+
+# Every section works from per-ticker results kept across reruns, so a rerun only fetches what
+# changed; sections with their own widgets are fragments that rerun on their own
+if st.session_state.fetch_triggered and selected_tickers:
+    # Placeholders in page order; the risk section fills in while the backend streams results
+    performance_slot = st.empty()
+    growth_slot = st.empty()
+    risk_slot = st.empty()
+
+    st.session_state.all_risk_data = {}
+    stock_data = None
+    try:
+        st.session_state.all_risk_data = {ticker: record for ticker, record
+                                          in market_data(selected_tickers, risk_slot).items() if record}
+        stock_data = stock_history(selected_tickers)
+    except requests.exceptions.RequestException as e:
+        st.error(f"Network error fetching data: {e}")
+    except ValueError as e:
+        st.error(f"Error fetching data: {e}" if str(e) else "Invalid response received from server.")
+
+    if not st.session_state.all_risk_data or stock_data is None:
+        risk_slot.empty()
+        st.warning("No valid data available for selected tickers.")
+    else:
+        with risk_slot.container(), timed("dashboard_render_risk", len(selected_tickers)):
+            render_risk_metrics(st.session_state.all_risk_data, "final", final=True)
+
+        with performance_slot.container(), timed("dashboard_render_performance", len(selected_tickers)):
+            # Stock Performance & Risk Metrics Graph
+            st.subheader("Stock Performance")
+            st.plotly_chart(performance_figure(stock_data))
+
+        with growth_slot.container(), timed("dashboard_render_growth", len(selected_tickers)):
+            # 📈Growth Potential Graph for Selected Companies
+            st.subheader("Growth Rate")
+            st.plotly_chart(growth_figure(stock_data))
+            st.markdown('</div>', unsafe_allow_html=True)
+
+        # -- Portfolio Section --- #
+        if len(selected_tickers) > 1:
+            portfolio_section(selected_tickers)
+
         # -- Market Trend Analysis Section --- #
-        st.subheader("Market Trend Analysis")
-
-        if selected_tickers:
-            for ticker in selected_tickers:
-                if ticker not in st.session_state.market_insights:
-                    try:
-                        # Fetch insights from Flask API
-                        insight_response = requests.get(f"{FLASK_API_URL}/sentiment-insights?keyword={ticker}")
-
-                        # Debugging: Print API response
-                        print(f"DEBUG: API response for {ticker}:", insight_response.text)
-
-                        # Checking if the response is valid
-                        if insight_response.status_code != 200 or not insight_response.text.strip():
-                            st.warning(f"⚠️ No detailed insights available for {ticker}. API returned no data.")
-                        else:
-                            # Convert response to JSON
-                            insight_data = insight_response.json()
-
-                            if "error" in insight_data:
-                                st.warning(f"⚠️ No insights available for {ticker}: {insight_data['error']}")
-                            else:
-                                insight_text = insight_data.get("insight_text", "No detailed insight provided.")
-                                # key_sentence = insight_data.get("key_sentence", "No key sentence extracted.")
-
-                                st.markdown(f"<h5>📌 Key-Insights for {ticker}</h5>", unsafe_allow_html=True)
-                                st.info(f"{insight_text}")
-                                # st.write(f"**Key Sentence:** \"{key_sentence}\"")
-
-                    except Exception as e:
-                        st.error(f"❌ Error fetching sentiment insights for {ticker}: {str(e)}")
-
-        # Part-2
-
-        if selected_tickers:
-            all_insights = []  # Store insights for all companies
-
-            for ticker in selected_tickers:
-                try:
-                    insight_response = requests.get(f"{FLASK_API_URL}/sentiment-insights?keyword={ticker}").json()
-
-                    if "error" in insight_response:
-                        st.warning(f"⚠️ No AI insights available for {ticker}.")
-                    else:
-                        insight_text = insight_response.get("insight_text", "No detailed insight provided.")
-                        all_insights.append({"Company": ticker, "Insights": insight_text})
-                        # {"Company": ticker, "AI Insight": insight_text, "Key Takeaway": key_sentence}
-
-                except Exception as e:
-                    st.error(f"❌ Error fetching AI insights for {ticker}: {str(e)}")
-
-            if all_insights:
-                # df_insights = pd.DataFrame(all_insights)
-                df_insights = pd.DataFrame(all_insights)[["Company", "Insights"]]
-                # st.dataframe(df_insights, use_container_width=True)
-
-                # Download insights
-                csv_insights = convert_df_to_csv(df_insights)
-
-                st.download_button(
-                    "📥 Download Insights Data",
-                    csv_insights,
-                    "Market_Trend_Analysis.csv",
-                    "text/csv",
-                    help="Download the market trend analysis as a CSV file",
-                )
-
-        # ----- FORECAST DISPLAY AND DOWNLOAD ----- #
-        st.subheader("Growth Forecast")
-
-        if selected_tickers:
-            growth_forecasts = {"Company": [], "6-Month Growth (%)": [], "12-Month Growth (%)": []}
-
-            for ticker in selected_tickers:
-                forecast_text = generate_growth_forecast(ticker)
-
-                # Extract numeric values from AI response
-                try:
-                    six_month_growth = float(forecast_text.split("6-Month Growth Estimate:")[1].split("%")[0].strip())
-                    twelve_month_growth = float(
-                        forecast_text.split("12-Month Growth Estimate:")[1].split("%")[0].strip())
-                except:
-                    six_month_growth, twelve_month_growth = None, None  # Handle AI output issues
-
-                # Store results
-                growth_forecasts["Company"].append(ticker)
-                growth_forecasts["6-Month Growth (%)"].append(six_month_growth)
-                growth_forecasts["12-Month Growth (%)"].append(twelve_month_growth)
-
-            # Convert to DataFrame
-            df_forecast = pd.DataFrame(growth_forecasts)
-
-            # Plotting Graph (Bar Chart)
-            fig = px.bar(
-                df_forecast,
-                x="Company",
-                y=["6-Month Growth (%)", "12-Month Growth (%)"],
-                barmode="group",
-                title="Stock Growth Forecast (6M vs 12M)",
-                labels={"value": "Growth (%)", "variable": "Forecast Period"},
-                # Proper margins to prevent overflow
-                width=650,  # Ensures responsiveness
-                height=425,  # Optional: Adjust height
-            )
-            st.plotly_chart(fig)
-
-            csv_forecast = convert_df_to_csv(df_forecast)
-
-            st.download_button(
-                label="📥 Download Growth Forecast data",
-                data=csv_forecast,
-                file_name="Growth_Forecasts.csv",
-                mime="text/csv",
-                help="Download the growth forecast as a CSV file",
-            )
\ No newline at end of file
+        insights_section(selected_tickers)
+
+        forecast_section(selected_tickers)
+
+
+# Stage latencies measured in this Streamlit process (the backend's are served at /metrics)
+if st.sidebar.checkbox("Show stage timings"):
+    stage_timings = pd.DataFrame(REGISTRY.summary())
+    if stage_timings.empty:
+        st.sidebar.info("No stages timed yet.")
+    else:
+        st.sidebar.dataframe(stage_timings.drop(columns="name"), width="stretch")
+    cache_stats = history_cache().stats()
+    st.sidebar.caption(f"Shared history cache: {cache_stats['entries']} tickers, "
+                       f"{cache_stats['bytes'] / 2 ** 20:.2f} of {cache_stats['max_bytes'] / 2 ** 20:.0f} MB, "
+                       f"hit rate {cache_stats['hit_rate'] or 0:.0%}")
+
+
+# Watchlists the backend keeps warm (analysing one is answered from prefetched data), with the
+# last refresh of every ticker
+if st.sidebar.checkbox("Show watchlists"):
+    try:
+        watchlist_status = fetch_watchlists()
+    except Exception as e:
+        st.sidebar.warning(f"Watchlists unavailable: {e}")
+    else:
+        if not watchlist_status["watchlists"]:
+            st.sidebar.info("No watchlists configured.")
+        for name, tickers in watchlist_status["watchlists"].items():
+            st.sidebar.markdown(f"**{name}**")
+            refreshed = pd.DataFrame([{"Ticker": ticker, **{
+                label: watchlist_status["tickers"].get(ticker, {}).get(field)
+                for label, field in (("Market data", "market_data_at"), ("Insight", "insight_at"),
+                                     ("Forecast", "forecast_at"))}} for ticker in tickers]).set_index("Ticker")
+            st.sidebar.dataframe(refreshed.apply(lambda column: pd.to_datetime(column, unit="s")
+                                                 .dt.strftime("%m-%d %H:%M UTC")).fillna("-"),
+                                 width="stretch")
+            st.sidebar.button(f"Analyze {name}", key=f"analyze_watchlist_{name}", on_click=analyze_tickers,
+                              args=(tickers,))
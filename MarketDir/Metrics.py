@@ -0,0 +1,129 @@
+import time
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+# ---- STAGE METRICS -----
+# A small in-process registry of counters, gauges and latency histograms, rendered in the
+# Prometheus text format. Each process (Flask worker or Streamlit server) has its own
+# registry; stages are labelled by name and by a bucketed batch size so that, e.g., a
+# 500-ticker download is not averaged together with single-ticker ones.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def batch_size_label(size):
+    for upper, label in ((1, "1"), (10, "2-10"), (100, "11-100"), (1000, "101-1000")):
+        if size <= upper:
+            return label
+    return "1000+"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+class Registry:
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._help = {}
+        self._types = {}
+        self._values = defaultdict(float)  # (name, labels) -> counter or gauge value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def _declare(self, name, kind, help_text):
+        self._types.setdefault(name, kind)
+        if help_text:
+            self._help.setdefault(name, help_text)
+
+    def inc(self, name, labels=(), value=1.0, help_text=None):
+        with self._lock:
+            self._declare(name, "counter", help_text)
+            self._values[(name, tuple(labels))] += value
+
+    def set_gauge(self, name, labels=(), value=0.0, help_text=None):
+        with self._lock:
+            self._declare(name, "gauge", help_text)
+            self._values[(name, tuple(labels))] = value
+
+    def observe(self, name, labels=(), value=0.0, help_text=None):
+        with self._lock:
+            self._declare(name, "histogram", help_text)
+            histogram = self._histograms.setdefault((name, tuple(labels)), [0] * (len(self.buckets) + 1) + [0.0])
+            histogram[bisect_left(self.buckets, value)] += 1
+            histogram[-1] += value
+
+    # Per-series summary of the latency histograms -> [{name, labels, count, sum, mean}]
+    def summary(self):
+        with self._lock:
+            rows = []
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                count = sum(histogram[:-1])
+                rows.append({"name": name, **dict(labels), "count": count, "sum": histogram[-1],
+                             "mean": histogram[-1] / count if count else None})
+            return rows
+
+    def value(self, name, labels=()):
+        with self._lock:
+            return self._values.get((name, tuple(labels)), 0.0)
+
+    def render(self):
+        with self._lock:
+            lines = []
+            for name in sorted(self._types):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {self._types[name]}")
+
+                if self._types[name] == "histogram":
+                    for (series, labels), histogram in sorted(self._histograms.items()):
+                        if series != name:
+                            continue
+                        cumulative = 0
+                        for bound, count in zip(self.buckets + (float("inf"),), histogram[:-1]):
+                            cumulative += count
+                            le = "+Inf" if bound == float("inf") else repr(bound)
+                            lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                        lines.append(f"{name}_sum{_format_labels(labels)} {histogram[-1]}")
+                        lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+                else:
+                    for (series, labels), value in sorted(self._values.items()):
+                        if series == name:
+                            lines.append(f"{name}{_format_labels(labels)} {value}")
+            return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = "markettrend_stage_duration_seconds"
+STAGE_ERRORS = "markettrend_stage_errors_total"
+STAGE_CANCELLED = "markettrend_stage_cancelled_total"
+
+
+# Times a block as `stage`: observes its latency, counts it as an error if it raises, and
+# adds the elapsed seconds to `timings[stage]` when a per-request breakdown is collected.
+# A streamed response closed early (client disconnect: GeneratorExit) counts as cancelled instead.
+@contextmanager
+def timed(stage, batch_size=1, timings=None, registry=REGISTRY):
+    labels = (("stage", stage), ("batch_size", batch_size_label(batch_size)))
+    start = time.perf_counter()
+    try:
+        yield
+    except GeneratorExit:
+        registry.inc(STAGE_CANCELLED, labels, help_text="Stage executions cancelled by a client disconnect")
+        raise
+    except BaseException:
+        registry.inc(STAGE_ERRORS, labels, help_text="Stage executions that raised an error")
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        registry.observe(STAGE_SECONDS, labels, elapsed, help_text="Latency of each processing stage in seconds")
+        if timings is not None:
+            timings[stage] = round(timings.get(stage, 0.0) + elapsed, 6)
@@ -0,0 +1,253 @@
+import os
+import math
+import threading
+from collections import deque
+
+import numpy as np
+
+from RiskEngine import TRADING_DAYS
+
+# ---- ONLINE RISK METRICS -----
+# Incremental per-ticker risk state for intraday polling. Each ticker keeps a sliding window
+# of its daily returns; a new bar (or a revised last bar, since today's close moves until the
+# market shuts) updates the state in O(1) instead of recomputing a year of returns:
+#   - volatility and Sharpe from a rolling Welford mean / sum of squared deviations
+#   - VaR and CVaR from a fixed-width histogram of the window's returns
+# The window is the price history the state is synced with: returns starting before its first
+# bar are evicted, so with the same period slice (1y for /market-data/live) it holds the same
+# returns as the batch computation of /market-data, however many bars the slice has.
+#
+# Tolerance against RiskEngine.compute_risk_metrics() on the same bars:
+#   - volatility and Sharpe match to floating point round-off (the exact moments are kept;
+#     they are recomputed from the window every RESYNC_UPDATES updates so round-off cannot
+#     drift)
+#   - VaR is within one bin width (QUANTILE_BIN_WIDTH, default 1e-4, i.e. one basis point of
+#     daily return), the same granularity as the 4-decimal rounding of the API
+#   - CVaR is within one bin width plus the effect of the returns sharing VaR's bin, which
+#     are split pro rata; in practice a few basis points
+# Returns beyond +/-QUANTILE_RANGE are counted in the outermost bins.
+#
+# Memory: the histogram has 2 * QUANTILE_RANGE / QUANTILE_BIN_WIDTH bins (10,000 by default),
+# two 8-byte list slots each, so ~160KB per ticker: ~160MB for a 1,000-ticker live universe.
+# A wider LIVE_RISK_BIN_WIDTH shrinks it proportionally, at a coarser VaR / CVaR.
+
+RESYNC_UPDATES = 252  # updates between exact recomputations of the moments
+QUANTILE_BIN_WIDTH = float(os.getenv("LIVE_RISK_BIN_WIDTH", "0.0001"))
+QUANTILE_RANGE = 0.5  # daily returns covered by the histogram: [-0.5, 0.5)
+
+
+# Counts and sums of the window's returns in fixed-width bins, with running totals per block of
+# BLOCK bins so that finding a quantile only walks the block totals and then one block: add and
+# remove are O(1), a quantile O(sqrt(bins)). Plain lists: with a window of a few hundred
+# returns, per-call NumPy overhead would cost more than the scan.
+class ReturnHistogram:
+
+    BLOCK = 100
+
+    def __init__(self, bin_width=QUANTILE_BIN_WIDTH, value_range=QUANTILE_RANGE):
+        self.bin_width = bin_width
+        self.low = -value_range
+        blocks = int(math.ceil(2 * value_range / bin_width / self.BLOCK))
+        self.bins = blocks * self.BLOCK
+        self.counts = [0] * self.bins
+        self.sums = [0.0] * self.bins
+        self.block_counts = [0] * blocks
+        self.block_sums = [0.0] * blocks
+        self.n = 0
+
+    def _bin(self, value):
+        return min(max(int((value - self.low) // self.bin_width), 0), self.bins - 1)
+
+    def _update(self, value, sign):
+        index = self._bin(value)
+        self.counts[index] += sign
+        self.sums[index] += sign * value
+        self.block_counts[index // self.BLOCK] += sign
+        self.block_sums[index // self.BLOCK] += sign * value
+        self.n += sign
+
+    def add(self, value):
+        self._update(value, 1)
+
+    def remove(self, value):
+        self._update(value, -1)
+
+    # Bin holding the k-th smallest return (0-based) and the number of returns in lower bins
+    def _locate(self, k):
+        before = 0
+        for block, count in enumerate(self.block_counts):
+            if before + count > k:
+                break
+            before += count
+        index = block * self.BLOCK
+        while before + self.counts[index] <= k:
+            before += self.counts[index]
+            index += 1
+        return index, before
+
+    # Estimated value of the k-th smallest return, spreading a bin's values evenly across its width
+    def _order_statistic(self, k):
+        index, before = self._locate(k)
+        return self.low + self.bin_width * (index + (k - before + 0.5) / self.counts[index])
+
+    # Linearly interpolated quantile, like np.percentile / RiskEngine.nan_quantile, and the mean
+    # of the returns at or below it
+    def quantile_and_tail_mean(self, q):
+        if self.n == 0:
+            return math.nan, math.nan
+
+        position = q * (self.n - 1)
+        lower = int(math.floor(position))
+        low_value = self._order_statistic(lower)
+        high_value = self._order_statistic(min(lower + 1, self.n - 1)) if position > lower else low_value
+        quantile = low_value + (high_value - low_value) * (position - lower)
+
+        index = self._bin(quantile)
+        block = index // self.BLOCK
+        first = block * self.BLOCK
+        tail_count = sum(self.block_counts[:block]) + sum(self.counts[first:index])
+        tail_sum = sum(self.block_sums[:block]) + sum(self.sums[first:index])
+        if self.counts[index]:
+            share = min(max((quantile - (self.low + index * self.bin_width)) / self.bin_width, 0.0), 1.0)
+            tail_count += self.counts[index] * share
+            tail_sum += self.sums[index] * share
+        return quantile, (tail_sum / tail_count if tail_count else quantile)
+
+
+class OnlineRiskState:
+
+    def __init__(self, bin_width=QUANTILE_BIN_WIDTH):
+        self.bin_width = bin_width
+        self._reset()
+
+    def _reset(self):
+        self.returns = deque()
+        self.return_times = deque()  # time of the bar each return starts from
+        self.histogram = ReturnHistogram(self.bin_width)
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared deviations from the mean
+        self.last_time = None
+        self.last_price = None
+        self.previous_price = None
+        self._updates = 0
+
+    def _add(self, value, start_time):
+        self.returns.append(value)
+        self.return_times.append(start_time)
+        self.histogram.add(value)
+        n = len(self.returns)
+        delta = value - self.mean
+        self.mean += delta / n
+        self.m2 += delta * (value - self.mean)
+
+    def _remove(self, value):
+        self.histogram.remove(value)
+        n = len(self.returns)  # already popped
+        if n == 0:
+            self.mean, self.m2 = 0.0, 0.0
+            return
+        old_mean = self.mean
+        self.mean = (old_mean * (n + 1) - value) / n
+        self.m2 = max(self.m2 - (value - old_mean) * (value - self.mean), 0.0)
+
+    # Exact moments from the window, every RESYNC_UPDATES updates, so round-off does not accumulate
+    def _maybe_resync(self):
+        self._updates += 1
+        if self._updates >= RESYNC_UPDATES and self.returns:
+            self.mean = math.fsum(self.returns) / len(self.returns)
+            self.m2 = math.fsum((value - self.mean) ** 2 for value in self.returns)
+            self._updates = 0
+
+    # A bar after the last one: one more return
+    def push(self, timestamp, price):
+        if self.last_price is not None:
+            self._add(price / self.last_price - 1.0, self.last_time)
+            self._maybe_resync()
+        self.previous_price, self.last_price, self.last_time = self.last_price, price, timestamp
+
+    # The last bar changed (intraday snapshot of today's close): replace its return
+    def revise(self, price):
+        if self.previous_price is not None:
+            self._remove(self.returns.pop())
+            self._add(price / self.previous_price - 1.0, self.return_times.pop())
+            self._maybe_resync()
+        self.last_price = price
+
+    # Dropping the returns that start before `start` (the first bar of the synced history)
+    def evict(self, start):
+        while self.return_times and self.return_times[0] < start:
+            self.return_times.popleft()
+            self._remove(self.returns.popleft())
+
+    # Bringing the state up to date with a price history (bar times as int64 nanoseconds and the
+    # matching prices, oldest first; NaN prices are skipped), which also sets the window. Only
+    # bars from the last one seen onwards are looked at; a history that no longer contains the
+    # last bar (a rewritten history, or the state is new) starts the window again.
+    def sync(self, times, prices):
+        valid = ~np.isnan(prices)
+        if self.last_time is not None:
+            position = int(np.searchsorted(times, self.last_time))
+            if position < len(times) and times[position] == self.last_time:
+                tail = prices[position:]
+                if tail[0] == tail[0] and tail[0] != self.last_price:
+                    self.revise(float(tail[0]))
+                for offset in range(1, len(tail)):
+                    if tail[offset] == tail[offset]:
+                        self.push(int(times[position + offset]), float(tail[offset]))
+                if valid.any():
+                    self.evict(int(times[valid][0]))
+                return
+
+        self._reset()
+        for timestamp, price in zip(times[valid], prices[valid]):
+            self.push(int(timestamp), float(price))
+
+    def metrics(self, confidence=0.95, risk_free_rate=0.0, trading_days=TRADING_DAYS):
+        label = int(round(confidence * 100))
+        n = len(self.returns)
+        volatility = math.sqrt(self.m2 / n) * math.sqrt(trading_days) if n else math.nan
+        var, cvar = self.histogram.quantile_and_tail_mean(1 - confidence)
+        annual_return = self.mean * trading_days if n else math.nan
+        sharpe = (annual_return - risk_free_rate) / volatility if volatility else math.nan
+        return {
+            "current_price": self.last_price if self.last_price is not None else math.nan,
+            "volatility": volatility,
+            f"VaR_{label}": var,
+            f"CVaR_{label}": cvar,
+            "sharpe": sharpe,
+        }
+
+
+# Process-wide per-ticker states
+class OnlineRiskBook:
+
+    def __init__(self, bin_width=QUANTILE_BIN_WIDTH):
+        self.bin_width = bin_width
+        self._states = {}
+        self._lock = threading.Lock()
+
+    # Syncing each ticker's state with its price history DataFrame -> {ticker: metrics}
+    def update(self, histories, column="Close"):
+        results = {}
+        for ticker, hist in histories.items():
+            prices = hist[column].to_numpy(dtype=float)
+            with self._lock:
+                state = self._states.get(ticker)
+                if state is None:
+                    state = self._states[ticker] = OnlineRiskState(self.bin_width)
+                state.sync(hist.index.asi8, prices)
+                results[ticker] = state.metrics()
+        return results
+
+    def __len__(self):
+        return len(self._states)
+
+
+_default_book = None
+
+
+def get_book():
+    global _default_book
+    if _default_book is None:
+        _default_book = OnlineRiskBook()
+    return _default_book
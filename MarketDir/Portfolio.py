@@ -0,0 +1,160 @@
+import os
+import hashlib
+import threading
+import warnings
+from collections import OrderedDict
+from statistics import NormalDist
+
+import numpy as np
+
+from RiskEngine import TRADING_DAYS, compute_returns, nan_quantile
+
+# ---- PORTFOLIO RISK -----
+# Cross-asset view over the same daily returns RiskEngine uses: covariance and correlation
+# matrices (optionally Ledoit-Wolf shrunk) and parametric / historical VaR of a weighted
+# portfolio. Estimation is a few BLAS matrix products (tens of milliseconds for a 500-ticker
+# universe); estimated models are cached on a hash of the aligned closes, so repeated
+# requests over unchanged data (e.g. only the weights changed) skip it entirely.
+#
+# Missing bars (holidays, recent listings) are handled pairwise: each column is demeaned over
+# its own observations and a missing return contributes nothing, so every covariance entry
+# is averaged over the dates both tickers traded. A pairwise matrix is not guaranteed to be
+# positive semi-definite; shrinkage restores that for large universes.
+
+CACHE_SIZE = int(os.getenv("PORTFOLIO_CACHE_SIZE", "16"))
+
+
+class PortfolioModel:
+
+    def __init__(self, tickers, mean, covariance, returns, shrinkage):
+        self.tickers = tickers
+        self.mean = mean  # daily mean return per ticker
+        self.covariance = covariance  # daily covariance
+        self.returns = returns  # dates x tickers, missing returns as 0
+        self.shrinkage = shrinkage  # Ledoit-Wolf intensity (0 = sample covariance)
+
+    @property
+    def correlation(self):
+        std = np.sqrt(np.diag(self.covariance))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            correlation = self.covariance / np.outer(std, std)
+        np.fill_diagonal(correlation, 1.0)
+        return np.clip(correlation, -1.0, 1.0)
+
+    # Portfolio volatility and VaR / expected shortfall (daily returns, so negative numbers like
+    # the per-ticker VaR_95) for weights aligned with `tickers`
+    def risk(self, weights, confidence=0.95, trading_days=TRADING_DAYS):
+        label = int(round(confidence * 100))
+        mean = float(self.mean @ weights)
+        std = float(np.sqrt(max(weights @ self.covariance @ weights, 0.0)))
+        z = NormalDist().inv_cdf(1 - confidence)
+        portfolio_returns = self.returns @ weights
+        var = float(nan_quantile(portfolio_returns[:, None], 1 - confidence)[0])
+        return {
+            "volatility": float(std * np.sqrt(trading_days)),
+            f"VaR_{label}_parametric": mean + z * std,
+            f"CVaR_{label}_parametric": mean - std * NormalDist().pdf(z) / (1 - confidence),
+            f"VaR_{label}_historical": var,
+            f"CVaR_{label}_historical": float(portfolio_returns[portfolio_returns <= var].mean()),
+        }
+
+
+# Ledoit-Wolf (2004) optimal intensity for shrinking the sample covariance of the demeaned
+# rows `X` towards a scaled identity
+def ledoit_wolf_intensity(X):
+    n = X.shape[0]
+    sample = X.T @ X / n
+    mu = np.trace(sample) / sample.shape[0]
+    delta = np.sum((sample - mu * np.eye(sample.shape[0])) ** 2)
+    row_norms = np.einsum("ij,ij->i", X, X)
+    beta = (np.sum(row_norms ** 2) - n * np.sum(sample ** 2)) / n ** 2
+    return float(min(max(beta, 0.0), delta) / delta) if delta > 0 else 0.0
+
+
+# A request's shrinkage option ("ledoit_wolf", "none"/None or a number in [0, 1]) -> the value
+# estimate() takes; ValueError for anything else
+def parse_shrinkage(value):
+    if value in (None, "none"):
+        return None
+    if value == "ledoit_wolf":
+        return value
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 1:
+        raise ValueError(f'Invalid shrinkage: {value!r}. Use "ledoit_wolf", "none" or a number between 0 and 1')
+    return float(value)
+
+
+# Estimating the model for a dates x tickers closes matrix (RiskEngine.align_closes).
+# `shrinkage` is "ledoit_wolf", None for the plain pairwise covariance, or a fixed intensity in [0, 1].
+def estimate(closes, shrinkage="ledoit_wolf"):
+    shrinkage = parse_shrinkage(shrinkage)
+    returns = compute_returns(closes)
+    observed = ~np.isnan(returns)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)  # tickers without returns
+        mean = np.nan_to_num(np.nanmean(returns, axis=0))
+    X = np.where(observed, returns - mean, 0.0)
+
+    # Population (ddof=0) covariance like RiskEngine's volatility, over the dates both traded
+    pairs = observed.T.astype(float) @ observed.astype(float)
+    covariance = (X.T @ X) / np.maximum(pairs, 1.0)
+
+    if shrinkage == "ledoit_wolf":
+        intensity = ledoit_wolf_intensity(X) if len(X) else 0.0
+    else:
+        intensity = float(shrinkage or 0.0)
+    if intensity:
+        target = np.mean(np.diag(covariance))
+        covariance = (1 - intensity) * covariance
+        covariance[np.diag_indices_from(covariance)] += intensity * target
+
+    return PortfolioModel(list(closes.columns), mean, covariance, np.where(observed, returns, 0.0), intensity)
+
+
+def data_key(closes, shrinkage):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update("\0".join(map(str, closes.columns)).encode("utf-8"))
+    digest.update(closes.index.asi8.tobytes())
+    digest.update(np.ascontiguousarray(closes.to_numpy(dtype=float)).tobytes())
+    digest.update(repr(shrinkage).encode("utf-8"))
+    return digest.hexdigest()
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+# estimate() behind a small LRU keyed on the data, shared by every request in the process
+def get_model(closes, shrinkage="ledoit_wolf"):
+    key = data_key(closes, shrinkage)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    model = estimate(closes, shrinkage)
+    with _cache_lock:
+        _cache[key] = model
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return model
+
+
+# Weights aligned with `tickers` and summing to 1, from a {ticker: weight} dict, a list in
+# ticker order, or None for an equally weighted portfolio. Raises ValueError when they do not fit.
+def normalize_weights(tickers, weights=None):
+    if weights is None:
+        values = np.ones(len(tickers))
+    elif isinstance(weights, dict):
+        unknown = set(weights) - set(tickers)
+        if unknown:
+            raise ValueError(f"Weights given for tickers without data: {', '.join(sorted(unknown))}")
+        values = np.array([float(weights.get(ticker, 0.0)) for ticker in tickers])
+    else:
+        if len(weights) != len(tickers):
+            raise ValueError(f"Expected {len(tickers)} weights, got {len(weights)}")
+        values = np.array([float(weight) for weight in weights])
+
+    total = values.sum()
+    if not np.isfinite(total) or total == 0:
+        raise ValueError("Weights must have a non-zero sum")
+    return values / total
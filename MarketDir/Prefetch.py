@@ -0,0 +1,344 @@
+import os
+import json
+import time
+import fcntl
+import random
+import logging
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from Concurrency import TokenBucket
+from LLMCache import CACHE_TTL as LLM_CACHE_TTL
+import LLMClient
+from LLMClient import generate_insight, generate_growth_forecasts, insight_cached, sentiment_prompt
+from Metrics import REGISTRY, timed
+from PriceStore import get_store
+
+# ---- WATCHLIST PREFETCH -----
+# Keeps named watchlists warm so that the first user of the day does not pay the cold cost
+# (Yahoo downloads plus one Cohere call per ticker). A background scheduler, run by one backend
+# process at a time (elected with a file lock), periodically:
+#   - refreshes the price store for every watchlist ticker and computes its /market-data record
+#     every PREFETCH_INTERVAL seconds and once after the market close on weekdays
+#   - generates the sentiment insights missing from the generation cache, and growth forecasts
+#     older than the cache TTL, within its own budget of PREFETCH_LLM_PER_MINUTE Cohere calls
+# Run times are jittered, and a ticker whose refresh failed is retried with exponential backoff.
+#
+# The warm records, forecasts and refresh times are kept in one JSON file, written atomically,
+# which every server worker reads (again only when it changes). Insights are warm through the
+# generation cache itself, so in production mode they are shared via its SQLite file.
+#
+# Watchlists live in a JSON file, {"name": ["AAPL", "MSFT", ...]}, editable through the
+# /watchlists endpoints.
+
+MARKET_DIR = os.path.dirname(os.path.abspath(__file__))
+WATCHLIST_PATH = os.getenv("PREFETCH_WATCHLISTS", os.path.join(MARKET_DIR, "watchlists.json"))
+STATE_PATH = os.getenv("PREFETCH_STATE_PATH", os.path.join(MARKET_DIR, "prefetch_state.json"))
+ENABLED = os.getenv("PREFETCH_ENABLED", "1").lower() in ("1", "true", "yes")
+
+INTERVAL = float(os.getenv("PREFETCH_INTERVAL", "600"))
+AFTER_CLOSE = os.getenv("PREFETCH_AFTER_CLOSE", "16:15")  # exchange time, weekdays
+EXCHANGE_TZ = "America/New_York"
+MAX_AGE = float(os.getenv("PREFETCH_MAX_AGE", str(2 * INTERVAL)))  # warm market data is served up to this age
+FORECAST_MAX_AGE = LLM_CACHE_TTL  # forecasts are renewed as often as cached generations expire
+LLM_PER_MINUTE = float(os.getenv("PREFETCH_LLM_PER_MINUTE", "10"))
+LLM_BURST = int(os.getenv("PREFETCH_LLM_BURST", "5"))
+
+JITTER = 0.1  # +-10% on every interval
+BACKOFF_BASE = 60.0
+BACKOFF_MAX = 3600.0
+TICK = 30.0  # seconds between scheduler checks (and leader elections)
+PERIOD = "1y"  # the history /market-data computes its metrics over
+
+
+# ---- Watchlists ---- #
+
+def _valid_name(name):
+    return bool(name) and len(name) <= 64 and all(c.isalnum() or c in "-_" for c in name)
+
+
+def _normalize(tickers):
+    if not isinstance(tickers, list) or not all(isinstance(ticker, str) for ticker in tickers):
+        raise ValueError("tickers must be a list of strings")
+    return list(dict.fromkeys(ticker.strip().upper() for ticker in tickers if ticker.strip()))
+
+
+def load_watchlists(path=WATCHLIST_PATH):
+    try:
+        with open(path) as f:
+            watchlists = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return {name: _normalize(tickers) for name, tickers in watchlists.items()}
+
+
+def watchlist_tickers(watchlists):
+    return list(dict.fromkeys(ticker for tickers in watchlists.values() for ticker in tickers))
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def _locked(path):
+    with open(f"{path}.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+# Creating or replacing a watchlist (tickers=None deletes it) -> the watchlists after the change.
+# Raises ValueError for an invalid name or anything but a non-empty list of strings, KeyError when
+# deleting an unknown name.
+def save_watchlist(name, tickers, path=WATCHLIST_PATH):
+    if not _valid_name(name):
+        raise ValueError("Watchlist names use letters, digits, '-' and '_' (at most 64)")
+    with _locked(path):
+        watchlists = load_watchlists(path)
+        if tickers is None:
+            del watchlists[name]
+        else:
+            tickers = _normalize(tickers)
+            if not tickers:
+                raise ValueError("No tickers provided")
+            watchlists[name] = tickers
+        _write_json(path, watchlists)
+    return watchlists
+
+
+# ---- Warm state, read by every worker ---- #
+
+_state_lock = threading.Lock()
+_state_cache = {"stamp": None, "state": {}}
+
+
+# The scheduler's last written state, re-read only when the file has changed
+def read_state(path=STATE_PATH):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return {}
+    stamp = (path, stat.st_mtime_ns, stat.st_size)
+    with _state_lock:
+        if _state_cache["stamp"] != stamp:
+            try:
+                with open(path) as f:
+                    _state_cache["state"] = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Unreadable prefetch state {path}: {str(e)}")
+                return _state_cache["state"]
+            _state_cache["stamp"] = stamp
+        return _state_cache["state"]
+
+
+def _warm(tickers, field, max_age, path):
+    entries = read_state(path).get("tickers", {})
+    now = time.time()
+    warm = {}
+    for ticker in tickers:
+        entry = entries.get(ticker, {})
+        if field in entry and now - entry[f"{field}_at"] <= max_age:
+            warm[ticker] = entry[field]
+    return warm
+
+
+# /market-data records of the tickers refreshed within PREFETCH_MAX_AGE -> {ticker: record}
+def warm_market_data(tickers, path=STATE_PATH):
+    return _warm(tickers, "market_data", MAX_AGE, path)
+
+
+# AI growth forecasts generated within the generation cache TTL -> {ticker: {"6M", "12M"}}
+def warm_forecasts(tickers, path=STATE_PATH):
+    return _warm(tickers, "forecast", FORECAST_MAX_AGE, path)
+
+
+# Refresh times, failure counts and retry times per ticker, without the cached payloads
+def ticker_status(entry):
+    return {key: value for key, value in entry.items() if key not in ("market_data", "forecast")}
+
+
+# ---- Scheduler ---- #
+
+def jittered(seconds, jitter=JITTER):
+    return seconds * (1 + random.uniform(-jitter, jitter))
+
+
+# Epoch time of the next weekday market close (plus AFTER_CLOSE's margin) after `now`
+def next_after_close(now, after_close=AFTER_CLOSE):
+    hour, minute = (int(part) for part in after_close.split(":"))
+    moment = pd.Timestamp(now, unit="s", tz="UTC").tz_convert(EXCHANGE_TZ)
+    candidate = moment.normalize() + pd.Timedelta(hours=hour, minutes=minute)
+    while candidate <= moment or candidate.weekday() >= 5:
+        candidate = (candidate + pd.Timedelta(days=1)).normalize() + pd.Timedelta(hours=hour, minutes=minute)
+    return candidate.timestamp()
+
+
+class PrefetchScheduler:
+
+    # `risk_records(tickers, histories, errors)` turns fetched histories into /market-data records
+    def __init__(self, risk_records, watchlist_path=WATCHLIST_PATH, state_path=STATE_PATH, interval=INTERVAL,
+                 llm_per_minute=LLM_PER_MINUTE, llm_burst=LLM_BURST):
+        self.risk_records = risk_records
+        self.watchlist_path = watchlist_path
+        self.state_path = state_path
+        self.interval = interval
+        self.llm_budget = TokenBucket(llm_per_minute / 60, llm_burst)
+        self.state = {"tickers": {}, "scheduler": {}}
+        self._leader_file = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="prefetch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    # Non-blocking attempt to become (or stay) the one process running the scheduler
+    def _elect(self):
+        if self._leader_file is not None:
+            return True
+        lock_file = open(f"{self.state_path}.leader", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        self._leader_file = lock_file
+        previous = read_state(self.state_path)
+        self.state["tickers"] = previous.get("tickers", {})
+        logging.info(f"Prefetch scheduler running in process {os.getpid()}")
+        return True
+
+    def _run(self):
+        next_run = 0.0
+        while not self._stop.is_set():
+            if self._elect() and time.time() >= next_run:
+                now = time.time()
+                after_close = next_after_close(now)
+                try:
+                    self.run_once(force_market_refresh=True)
+                except Exception as e:
+                    logging.error(f"Prefetch run failed: {str(e)}")
+                next_run = min(time.time() + jittered(self.interval), after_close + random.uniform(0, 300))
+                self.state["scheduler"].update(next_run=next_run)
+                self._write_state()
+            self._stop.wait(TICK)
+
+    def _entry(self, ticker):
+        return self.state["tickers"].setdefault(ticker, {})
+
+    def _due(self, ticker, task, now):
+        return self._entry(ticker).get("retry_at", {}).get(task, 0) <= now
+
+    def _succeeded(self, ticker, task, now):
+        entry = self._entry(ticker)
+        entry[f"{task}_at"] = now
+        for key in ("failures", "retry_at", "errors"):
+            entry.get(key, {}).pop(task, None)
+
+    def _failed(self, ticker, task, error, now):
+        entry = self._entry(ticker)
+        failures = entry.setdefault("failures", {}).get(task, 0) + 1
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (failures - 1)) * random.uniform(0.5, 1.5)
+        entry["failures"][task] = failures
+        entry.setdefault("retry_at", {})[task] = now + delay
+        entry.setdefault("errors", {})[task] = str(error)
+        REGISTRY.inc("markettrend_prefetch_failures_total", (("task", task),),
+                     help_text="Watchlist prefetch failures by task")
+
+    def _write_state(self):
+        self.state["scheduler"].update(pid=os.getpid(), updated_at=time.time())
+        _write_json(self.state_path, self.state)
+
+    # Refreshing the store and the /market-data records; `force` asks Yahoo even for fresh partitions
+    def refresh_market_data(self, tickers, force=False):
+        now = time.time()
+        due = [ticker for ticker in tickers if self._due(ticker, "market_data", now)]
+        if not due:
+            return
+        with timed("prefetch_market_data", len(due)):
+            histories, errors = get_store().get_histories(due, period=PERIOD, max_age=0 if force else None)
+            records = self.risk_records(due, histories, errors)
+        for ticker in due:
+            if ticker in errors:
+                self._failed(ticker, "market_data", errors[ticker], now)
+            else:
+                self._entry(ticker)["market_data"] = records[ticker]
+                self._succeeded(ticker, "market_data", now)
+
+    # Generating the insights missing from the generation cache, one budget token per Cohere call
+    # (retries included)
+    def refresh_insights(self, tickers):
+        for ticker in tickers:
+            now = time.time()
+            if self._stop.is_set() or not self._due(ticker, "insight", now):
+                continue
+            prompt = sentiment_prompt(ticker)
+            if not insight_cached(prompt):
+                try:
+                    generate_insight(prompt, budget=self.llm_budget)
+                except Exception as e:
+                    self._failed(ticker, "insight", e, now)
+                    continue
+                self._succeeded(ticker, "insight", time.time())
+            elif "insight_at" not in self._entry(ticker):
+                self._succeeded(ticker, "insight", now)
+
+    # Renewing forecasts older than FORECAST_MAX_AGE, one chunk of tickers at a time; every Cohere
+    # call for it (retries of malformed replies included) takes a budget token
+    def refresh_forecasts(self, tickers):
+        now = time.time()
+        stale = [ticker for ticker in tickers if self._due(ticker, "forecast", now) and
+                 now - self._entry(ticker).get("forecast_at", 0) > FORECAST_MAX_AGE]
+        chunk_size = LLMClient.FORECAST_CHUNK_SIZE
+        for chunk in (stale[i:i + chunk_size] for i in range(0, len(stale), chunk_size)):
+            if self._stop.is_set():
+                return
+            forecasts, errors = generate_growth_forecasts(chunk, budget=self.llm_budget)
+            done = time.time()
+            for ticker in chunk:
+                if ticker in forecasts:
+                    self._entry(ticker)["forecast"] = forecasts[ticker]
+                    self._succeeded(ticker, "forecast", done)
+                else:
+                    self._failed(ticker, "forecast", errors.get(ticker, "No forecast"), done)
+
+    # One pass over every watchlist ticker. The state file is written after each step, so workers
+    # serve warm market data before the (slower) AI generations are done.
+    def run_once(self, force_market_refresh=False):
+        started = time.time()
+        tickers = watchlist_tickers(load_watchlists(self.watchlist_path))
+        self.state["tickers"] = {ticker: self._entry(ticker) for ticker in tickers}  # drops removed tickers
+        self.state["scheduler"].update(last_run=started, tickers=len(tickers))
+        if not tickers:
+            return
+        self.refresh_market_data(tickers, force=force_market_refresh)
+        self._write_state()
+        self.refresh_insights(tickers)
+        self._write_state()
+        self.refresh_forecasts(tickers)
+        self.state["scheduler"]["last_run_seconds"] = round(time.time() - started, 3)
+        self._write_state()
+        REGISTRY.inc("markettrend_prefetch_runs_total", help_text="Completed watchlist prefetch runs")
+
+
+_scheduler = None
+
+
+# Starting this process's scheduler once; it only works while it holds the leader lock
+def start(risk_records):
+    global _scheduler
+    if ENABLED and _scheduler is None:
+        _scheduler = PrefetchScheduler(risk_records)
+        _scheduler.start()
+    return _scheduler
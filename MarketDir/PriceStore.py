@@ -0,0 +1,331 @@
+import os
+import json
+import time
+import fcntl
+import logging
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from Metrics import timed
+from SingleFlight import SingleFlight
+from Resilience import Upstream, count_stale
+
+# ---- LOCAL PRICE-HISTORY STORE -----
+# One Parquet partition per ticker, refreshed incrementally: only bars newer than the
+# last stored date are requested from Yahoo. Writes go to a temporary file that is
+# atomically renamed into place, so readers never need a lock and always see a complete
+# partition. Downloads run outside the lock; merging into a partition is serialised per
+# ticker on an flock()'d lock file (single writer).
+# Prices are adjusted by Yahoo (auto_adjust) as of the download, so a dividend or split among
+# the new bars makes the stored bars inconsistent with them: the ticker's whole period is then
+# downloaded again and its partition rewritten.
+
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "price_store")
+STORE_DIR = os.getenv("PRICE_STORE_DIR", DEFAULT_STORE_DIR)
+
+# Seconds after a successful refresh during which a partition is served without asking Yahoo
+MAX_AGE = float(os.getenv("PRICE_STORE_MAX_AGE", "900"))
+
+# Download concurrency (threads) and tickers per yf.download() call when refreshing many tickers
+FETCH_WORKERS = int(os.getenv("MARKET_FETCH_WORKERS", "8"))
+FETCH_BATCH_SIZE = int(os.getenv("MARKET_FETCH_BATCH_SIZE", "20"))
+
+# Yahoo Finance calls: timeout per download (adapted down to YAHOO_MIN_TIMEOUT once latencies are
+# known), attempts, optional hedging of slow downloads after YAHOO_HEDGE_AFTER seconds, and the
+# circuit breaker (see Resilience.py)
+_yahoo = Upstream("yahoo", timeout=float(os.getenv("YAHOO_TIMEOUT", "30")),
+                  min_timeout=float(os.getenv("YAHOO_MIN_TIMEOUT", "10")),
+                  attempts=int(os.getenv("YAHOO_ATTEMPTS", "3")),
+                  hedge_after=float(os.environ["YAHOO_HEDGE_AFTER"]) if os.getenv("YAHOO_HEDGE_AFTER") else None,
+                  failure_threshold=int(os.getenv("YAHOO_FAILURE_THRESHOLD", "5")),
+                  reset_timeout=float(os.getenv("YAHOO_RESET_TIMEOUT", "30")))
+
+# Downloads in flight in this process, shared by concurrent requests for the same ticker
+_download_flight = SingleFlight("yahoo")
+
+_METADATA_KEY = b"pricestore"
+_ACTION_COLUMNS = ["Dividends", "Stock Splits"]
+_PERIOD_PATTERN = re.compile(r"^(\d+)(d|wk|mo|y)$")
+
+
+# Converting a yfinance-style period ("1y", "18mo", "5d", "ytd", "max") into a start timestamp
+def period_start(period, tz=None):
+    now = pd.Timestamp.now(tz=tz).normalize()
+    if period == "max":
+        return None
+    if period == "ytd":
+        return now.replace(month=1, day=1)
+
+    match = _PERIOD_PATTERN.match(period)
+    if not match:
+        raise ValueError(f"Unsupported period: {period}")
+
+    amount, unit = int(match.group(1)), match.group(2)
+    offsets = {
+        "d": pd.DateOffset(days=amount),
+        "wk": pd.DateOffset(weeks=amount),
+        "mo": pd.DateOffset(months=amount),
+        "y": pd.DateOffset(years=amount),
+    }
+    return now - offsets[unit]
+
+
+class PriceStore:
+
+    def __init__(self, root=STORE_DIR, max_age=MAX_AGE):
+        self.root = root
+        self.max_age = max_age
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, ticker):
+        return os.path.join(self.root, f"{quote(ticker, safe='')}.parquet")
+
+    @contextmanager
+    def _write_lock(self, ticker):
+        with open(os.path.join(self.root, f"{quote(ticker, safe='')}.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # Reading a stored partition -> (DataFrame, metadata), or (None, {}) when nothing is stored
+    def read(self, ticker):
+        try:
+            with timed("store_read"):
+                table = pq.read_table(self._path(ticker))
+        except FileNotFoundError:
+            return None, {}
+
+        metadata = json.loads((table.schema.metadata or {}).get(_METADATA_KEY, b"{}"))
+        return table.to_pandas(), metadata
+
+    def _write(self, ticker, hist, metadata):
+        table = pa.Table.from_pandas(hist)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                               _METADATA_KEY: json.dumps(metadata).encode()})
+        path = self._path(ticker)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with timed("store_write"):
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, path)
+
+    # Whether the stored partition reaches back to `start` (None meaning the full history)
+    @staticmethod
+    def _covers(metadata, start):
+        covered_from = metadata.get("covered_from")
+        if covered_from == "max":
+            return True
+        if covered_from is None or start is None:
+            return False
+        return pd.Timestamp(covered_from) <= start.tz_localize(None)
+
+    # Whether the stored partition covers the requested period and was refreshed recently enough
+    def _is_fresh(self, hist, metadata, start, max_age=None):
+        max_age = self.max_age if max_age is None else max_age
+        if hist is None or time.time() - metadata.get("checked_at", 0) > max_age:
+            return False
+        return self._covers(metadata, start)
+
+    # Working out what a stale partition needs: the whole period for a new or too-short
+    # partition, otherwise the bars from the last stored date onwards (the last bar is
+    # re-fetched since it may have been an intraday snapshot). None means it is fresh.
+    def _plan(self, ticker, period, max_age=None):
+        hist, metadata = self.read(ticker)
+        start = period_start(period, hist.index.tz if hist is not None else None)
+        if self._is_fresh(hist, metadata, start, max_age):
+            return hist, None
+        if hist is None or not self._covers(metadata, start):
+            return hist, ("period", period)
+        return hist, ("start", hist.index[-1].strftime("%Y-%m-%d"))
+
+    # One yf.download() call for a whole batch of tickers sharing the same plan, with timeouts,
+    # retries and the circuit breaker of the Yahoo upstream
+    @staticmethod
+    def _download(tickers, plan):
+        import yfinance as yf  # Deferred: only needed when something has to be downloaded
+
+        kind, value = plan
+        with timed("yahoo_download", len(tickers)):
+            data = _yahoo.call(lambda: yf.download(tickers, group_by="ticker", actions=True, auto_adjust=True,
+                                                   ignore_tz=False, progress=False, threads=False, **{kind: value}))
+
+        frames = {}
+        for ticker in tickers:
+            if data.empty:
+                frame = pd.DataFrame()
+            elif isinstance(data.columns, pd.MultiIndex):
+                frame = data[ticker] if ticker in data.columns.get_level_values(0) else pd.DataFrame()
+            else:
+                frame = data
+            frames[ticker] = frame.dropna(how="all")
+        return frames
+
+    # Whether incrementally fetched bars carry a dividend or split that the stored bars do not
+    # have yet, i.e. whether the stored prices were adjusted differently
+    def _has_new_actions(self, ticker, fetched):
+        columns = fetched.columns.intersection(_ACTION_COLUMNS)
+        if fetched.empty or columns.empty:
+            return False
+        actions = fetched[columns].fillna(0)
+        actions = actions[(actions != 0).any(axis=1)]
+        if actions.empty:
+            return False
+        hist, _ = self.read(ticker)
+        if hist is None:
+            return True
+        known = hist.reindex(columns=columns).fillna(0)
+        if hist.index.tz is not None and actions.index.tz is not None:
+            actions = actions.tz_convert(hist.index.tz)
+        for date, row in actions.iterrows():
+            if date not in known.index or not (known.loc[date] == row).all():
+                return True
+        return False
+
+    # Merging freshly downloaded bars into the stored partition while holding the writer lock;
+    # `replace` writes the fetched bars of the whole period instead (re-adjusted prices)
+    def _merge_and_write(self, ticker, fetched, plan, period, replace=False):
+        with self._write_lock(ticker):
+            hist, metadata = self.read(ticker)
+            if replace and not fetched.empty:
+                start = period_start(period)
+                merged = fetched
+                if hist is not None and hist.index.tz is not None and fetched.index.tz is None:
+                    merged = fetched.tz_localize(hist.index.tz)
+                self._write(ticker, merged, {"covered_from": "max" if start is None else start.isoformat(),
+                                             "checked_at": time.time()})
+                return merged
+            if fetched.empty:
+                if hist is None:
+                    return pd.DataFrame()
+                merged = hist
+            elif hist is None:
+                merged = fetched
+            else:
+                if hist.index.tz is not None:
+                    fetched = fetched.tz_convert(hist.index.tz) if fetched.index.tz is not None \
+                        else fetched.tz_localize(hist.index.tz)
+                merged = pd.concat([hist, fetched])
+                merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+
+            covered_from = metadata.get("covered_from")
+            start = period_start(period)
+            if plan[0] == "period" and not fetched.empty and not self._covers(metadata, start):
+                covered_from = "max" if start is None else start.isoformat()
+
+            self._write(ticker, merged, {"covered_from": covered_from, "checked_at": time.time()})
+            return merged
+
+    # _refresh_batch() for the tickers no other request is already refreshing (with the same
+    # plan); the others wait for that refresh and share its merged partition.
+    def _refresh_coalesced(self, tickers, plan, period):
+        keys = {(self.root, ticker, plan, period): ticker for ticker in tickers}
+
+        def refresh(claimed):
+            histories, errors = self._refresh_batch([keys[key] for key in claimed], plan, period)
+            return ({key: histories[keys[key]] for key in claimed if keys[key] in histories},
+                    {key: errors[keys[key]] for key in claimed if keys[key] in errors})
+
+        histories, errors = _download_flight.do_many(list(keys), refresh)
+        return {keys[key]: hist for key, hist in histories.items()}, {keys[key]: e for key, e in errors.items()}
+
+    def _refresh_batch(self, tickers, plan, period):
+        histories, errors = {}, {}
+        frames = self._download(tickers, plan)
+        adjusted = [ticker for ticker in tickers if plan[0] == "start" and self._has_new_actions(ticker, frames[ticker])]
+        if adjusted:
+            logging.info(f"Dividends or splits for {len(adjusted)} tickers, downloading their {period} again")
+            frames.update(self._download(adjusted, ("period", period)))
+        for ticker in tickers:
+            try:
+                histories[ticker] = self._merge_and_write(ticker, frames[ticker], plan, period,
+                                                          replace=ticker in adjusted)
+            except Exception as e:
+                errors[ticker] = e
+        return histories, errors
+
+    @staticmethod
+    def _slice(hist, period):
+        if hist.empty:
+            return hist
+        start = period_start(period, hist.index.tz)
+        return hist if start is None else hist[hist.index >= start]
+
+    # Price histories for many tickers, yielded as ({ticker: DataFrame}, {ticker: Exception}) chunks
+    # as soon as they are available: fresh partitions straight from disk first, then one chunk per
+    # completed download batch. Stale tickers are grouped by what they need, split into batches of
+    # `batch_size` and downloaded on a pool of at most `max_workers` threads. A failing batch only
+    # marks its own tickers as errors, except those whose stored partition covers the period:
+    # they are served from it, stale, while Yahoo is failing or its circuit is open.
+    # `max_age` overrides the store's refresh interval.
+    def iter_histories(self, tickers, period="1y", max_workers=FETCH_WORKERS, batch_size=FETCH_BATCH_SIZE,
+                       max_age=None):
+        fresh, stored = {}, {}
+        stale = defaultdict(list)
+        for ticker in dict.fromkeys(tickers):
+            hist, plan = self._plan(ticker, period, max_age)
+            if plan is None:
+                fresh[ticker] = self._slice(hist, period)
+            else:
+                stale[plan].append(ticker)
+                if plan[0] == "start":
+                    stored[ticker] = hist
+        if fresh:
+            yield fresh, {}
+
+        batches = [(plan, group[i:i + batch_size])
+                   for plan, group in stale.items() for i in range(0, len(group), batch_size)]
+        if not batches:
+            return
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as pool:
+            futures = {pool.submit(self._refresh_coalesced, batch, plan, period): batch for plan, batch in batches}
+            for future in as_completed(futures):
+                try:
+                    batch_histories, batch_errors = future.result()
+                except Exception as e:
+                    logging.error(f"Error fetching batch {futures[future]}: {str(e)}")
+                    batch_histories, batch_errors = {}, {ticker: e for ticker in futures[future]}
+                fallback = {ticker: stored[ticker] for ticker in batch_errors if ticker in stored}
+                if fallback:
+                    logging.warning(f"Serving stored prices for {len(fallback)} tickers: "
+                                    f"{str(batch_errors[next(iter(fallback))])}")
+                    count_stale("yahoo", len(fallback))
+                    batch_histories = {**batch_histories, **fallback}
+                    batch_errors = {ticker: e for ticker, e in batch_errors.items() if ticker not in fallback}
+                yield {ticker: self._slice(hist, period) for ticker, hist in batch_histories.items()}, batch_errors
+
+    # Price histories for many tickers at once -> ({ticker: DataFrame}, {ticker: Exception})
+    def get_histories(self, tickers, period="1y", max_workers=FETCH_WORKERS, batch_size=FETCH_BATCH_SIZE,
+                      max_age=None):
+        histories, errors = {}, {}
+        for batch_histories, batch_errors in self.iter_histories(tickers, period, max_workers, batch_size,
+                                                                 max_age):
+            histories.update(batch_histories)
+            errors.update(batch_errors)
+        return {ticker: histories[ticker] for ticker in tickers if ticker in histories}, errors
+
+    # Price history for the given period, served from disk and topped up from Yahoo when stale
+    def get_history(self, ticker, period="1y"):
+        histories, errors = self.get_histories([ticker], period)
+        if ticker in errors:
+            raise errors[ticker]
+        return histories[ticker]
+
+
+_default_store = None
+
+
+# Shared store instance for the processes that read from STORE_DIR
+def get_store():
+    global _default_store
+    if _default_store is None:
+        _default_store = PriceStore()
+    return _default_store
@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+from statistics import NormalDist
+
+from RiskEngine import compute_returns
+
+# ---- LOCAL QUANTITATIVE FORECAST -----
+# Growth forecasts from each ticker's own return history, for all tickers at once and without
+# any network call:
+#   - "bootstrap": Monte Carlo paths built by resampling historical trading days. The same
+#     sampled days are used for every ticker, so cross-asset correlation is preserved. A path
+#     is a row of day counts (how often each historical day was drawn), so the log growth of
+#     every path and ticker is a single (simulations x days) @ (days x tickers) product.
+#   - "gbm": geometric Brownian motion with each ticker's historical drift and volatility;
+#     its growth quantiles are closed-form, so nothing is simulated.
+# Forecasts are percentage growth over 6 and 12 months of trading days: the median as point
+# estimate plus a 5%-95% band. A day a ticker did not trade counts as a flat day for it.
+
+HORIZONS = {"6M": 126, "12M": 252}
+SIMULATIONS = int(os.getenv("QUANT_FORECAST_SIMULATIONS", "2000"))
+MAX_SIMULATIONS = 20000
+BAND = (0.05, 0.95)
+METHODS = ("bootstrap", "gbm")
+
+
+def log_returns(closes):
+    with np.errstate(invalid="ignore"):
+        return np.log1p(compute_returns(closes))
+
+
+# Day counts of each simulated path after every horizon: {label: (simulations x days) matrix}
+def _bootstrap_counts(n_days, simulations, rng):
+    longest = max(HORIZONS.values())
+    draws = rng.integers(0, n_days, size=(simulations, longest))
+    offsets = np.arange(simulations)[:, None] * n_days
+    counts = {}
+    for label, horizon in sorted(HORIZONS.items(), key=lambda item: item[1]):
+        flat = (draws[:, :horizon] + offsets).ravel()
+        counts[label] = np.bincount(flat, minlength=simulations * n_days).reshape(simulations, n_days)
+    return counts
+
+
+# Percentage growth quantiles per horizon for every column of `closes` (dates x tickers, as from
+# RiskEngine.align_closes) -> {label: {"median": array, "low": array, "high": array}}
+def forecast(closes, method="bootstrap", simulations=SIMULATIONS, seed=0):
+    if method not in METHODS:
+        raise ValueError(f"Unknown forecast method: {method}")
+    returns = np.nan_to_num(log_returns(closes))
+    n_days, n_tickers = returns.shape
+    if n_days < 2:
+        nan = np.full(n_tickers, np.nan)
+        return {label: {"median": nan, "low": nan, "high": nan} for label in HORIZONS}
+
+    results = {}
+    if method == "gbm":
+        drift, volatility = returns.mean(axis=0), returns.std(axis=0)
+        for label, horizon in HORIZONS.items():
+            bands = {name: drift * horizon + NormalDist().inv_cdf(q) * volatility * np.sqrt(horizon)
+                     for name, q in (("median", 0.5), ("low", BAND[0]), ("high", BAND[1]))}
+            results[label] = {name: np.expm1(value) * 100 for name, value in bands.items()}
+        return results
+
+    rng = np.random.default_rng(seed)
+    for label, counts in _bootstrap_counts(n_days, simulations, rng).items():
+        growth = np.expm1(counts.astype(float) @ returns) * 100  # simulations x tickers
+        low, median, high = np.quantile(growth, [BAND[0], 0.5, BAND[1]], axis=0)
+        results[label] = {"median": median, "low": low, "high": high}
+    return results
@@ -0,0 +1,359 @@
+import os
+import re
+import sys
+import html
+import json
+import time
+import logging
+import argparse
+import multiprocessing
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from BackendClient import stream_market_data, fetch_history, fetch_insights, fetch_growth_forecasts, \
+    fetch_quant_forecasts, fetch_portfolio, fetch_watchlists
+import Charts
+from Universe import load_universe
+
+# ---- HEADLESS SECTOR REPORTS -----
+# Renders one static HTML report per sector watchlist (price and growth charts, risk chart and
+# table, portfolio risk, insights and forecasts) with the dashboard's own figures and tables
+# (Charts.py), from the same backend endpoints. No browser is needed; the reports carry the
+# print stylesheet, so "Print to PDF" gives one section per page.
+#
+#   python ReportBuilder.py [watchlists.json | universe files ...] [--only Tech Finance]
+#       [--output reports/2026-10-30] [--workers 4] [--no-ai]
+#
+# Without sources, the backend's watchlists (GET /watchlists) are reported. Every ticker's data
+# is fetched once for all sectors (a ticker in several sectors is not fetched again), with the
+# kinds of data fetched concurrently and the Cohere-bound insights and AI forecasts in chunks;
+# each report is rendered (across a process pool) as soon as its sector's data is in.
+# The output directory gets one <sector>_Report.html per sector, an index.html and a single
+# copy of plotly.js shared by the reports.
+
+MARKET_DIR = os.path.dirname(os.path.abspath(__file__))
+REPORT_DIR = os.getenv("REPORT_DIR", os.path.join(MARKET_DIR, "reports"))
+WORKERS = int(os.getenv("REPORT_WORKERS", str(os.cpu_count() or 2)))
+FETCH_WORKERS = int(os.getenv("REPORT_FETCH_WORKERS", "8"))
+AI_CHUNK_SIZE = int(os.getenv("REPORT_AI_CHUNK_SIZE", "40"))  # tickers per insights / AI forecast request
+AI_CONCURRENCY = int(os.getenv("REPORT_AI_CONCURRENCY", "2"))
+START_METHOD = os.getenv("REPORT_START_METHOD", "spawn")
+PLOTLY_JS = "plotly.min.js"
+AI_KINDS = {"insights": fetch_insights, "ai_forecast": fetch_growth_forecasts}
+
+REPORT_CSS = """
+    body { font-family: Arial, Helvetica, sans-serif; margin: 20px auto; max-width: 1000px; }
+    .header-container {
+        background-color: #005A9C; color: white; text-align: center; padding: 15px;
+        border-radius: 10px; font-size: 32px; font-weight: bold; margin-bottom: 20px;
+    }
+    h2, h3 { color: #005A9C; text-align: center; font-weight: bold; }
+    .caption { color: #666; font-size: 13px; }
+    .warning { background-color: #FFF8E1; border-radius: 5px; padding: 6px 10px; margin: 4px 0; }
+    .insight { background-color: #E8F1FA; border-radius: 5px; padding: 10px; }
+    table { width: 100%; border-collapse: collapse; margin: 10px 0; }
+    th { text-align: center; background-color: #005A9C; color: white; font-size: 14px; padding: 10px; }
+    td { text-align: left; padding: 8px; border-bottom: 1px solid #ddd; }
+
+    @media print {
+        h2 { page-break-before: always; margin-top: 35px; margin-bottom: 5px; }
+        .plotly-graph-div, table { page-break-inside: avoid; max-width: 100%; }
+        h1 { font-size: 24px; } h2 { font-size: 22px; } h3 { font-size: 20px; } h5 { font-size: 16px; }
+    }
+"""
+
+
+# {sector: [tickers]} from a watchlists JSON file ({"name": [...]}, as watchlists.json) or a universe
+# file (one ticker per line or a CSV, see Universe.py), which becomes a sector named after the file
+def load_sources(paths):
+    watchlists = {}
+    for path in paths:
+        if path.lower().endswith(".json"):
+            with open(path) as f:
+                watchlists.update(json.load(f))
+        else:
+            watchlists[os.path.splitext(os.path.basename(path))[0]] = load_universe(path)
+    return watchlists
+
+
+def _normalize(tickers):
+    return list(dict.fromkeys(ticker.strip().upper() for ticker in tickers if ticker.strip()))
+
+
+# Risk records of /market-data/stream -> {ticker: record}
+def fetch_risk_records(tickers):
+    return {record.pop("ticker"): record for record in stream_market_data(tickers) if "ticker" in record}
+
+
+# The fetches behind the reports -> ({job: fetch()}, {sector: [the jobs it needs]}). Market data
+# is fetched once for the union of the sectors' tickers; portfolio risk depends on the whole
+# sector, so it is fetched per sector. Insights and AI forecasts are asked for in chunks of at most
+# AI_CHUNK_SIZE tickers, in sector order, a ticker in several sectors only in the first one's.
+def fetch_jobs(watchlists, ai=True):
+    tickers = list(dict.fromkeys(ticker for sector in watchlists.values() for ticker in sector))
+    jobs = {
+        "risk": lambda: fetch_risk_records(tickers),
+        "history": lambda: fetch_history(tickers, period=Charts.PERIOD)[0],
+        "quant_forecast": lambda: fetch_quant_forecasts(tickers),
+    }
+    needs = {name: list(jobs) for name in watchlists}
+    chunk_of = {}
+    for name, sector in watchlists.items():
+        if len(sector) > 1:
+            jobs[("portfolio", name)] = lambda sector=sector: fetch_portfolio(sector)
+            needs[name].append(("portfolio", name))
+        if not ai:
+            continue
+        new = [ticker for ticker in sector if ticker not in chunk_of]
+        for start in range(0, len(new), AI_CHUNK_SIZE):
+            chunk = new[start:start + AI_CHUNK_SIZE]
+            for kind, fetch in AI_KINDS.items():
+                jobs[(kind, name, start)] = lambda fetch=fetch, chunk=chunk: fetch(chunk)
+            chunk_of.update(dict.fromkeys(chunk, (name, start)))
+        needs[name] += [(kind, *chunk) for chunk in dict.fromkeys(chunk_of[ticker] for ticker in sector)
+                        for kind in AI_KINDS]
+    return jobs, needs
+
+
+def _kind(job):
+    return job if isinstance(job, str) else job[0]
+
+
+def job_name(job):
+    return job if isinstance(job, str) else f"{job[0]} for {job[1]}"
+
+
+# Runs fetch_jobs(): market data and portfolios on FETCH_WORKERS threads, the AI chunks (bound by
+# the Cohere rate limit) AI_CONCURRENCY at a time in sector order, so that sectors complete one
+# after another. `on_ready(name, sector_data)` is called as soon as a sector has all it needs.
+# The chunks of a kind are merged. -> ({kind: result}, {job: error}); a failed job leaves its
+# section out of the reports that need it.
+def fetch_shared(watchlists, ai=True, on_ready=None):
+    jobs, needs = fetch_jobs(watchlists, ai)
+    data, errors = {}, {}
+    waiting = {name: set(sector_jobs) for name, sector_jobs in needs.items()}
+    with ThreadPoolExecutor(max_workers=max(1, min(FETCH_WORKERS, len(jobs)))) as pool, \
+            ThreadPoolExecutor(max_workers=max(1, AI_CONCURRENCY)) as ai_pool:
+        futures = {(ai_pool if _kind(job) in AI_KINDS else pool).submit(fetch): job for job, fetch in jobs.items()}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                result = future.result()
+                if _kind(job) in AI_KINDS:
+                    data.setdefault(_kind(job), {}).update(result)
+                else:
+                    data[job] = result
+            except Exception as e:
+                logging.error(f"Error fetching {job_name(job)} for the reports: {str(e)}")
+                errors[job] = str(e)
+            for name in [name for name, pending in waiting.items() if job in pending]:
+                waiting[name].discard(job)
+                if not waiting[name]:
+                    del waiting[name]
+                    if on_ready is not None:
+                        on_ready(name, sector_data(name, watchlists[name], data, errors, needs[name]))
+    return data, errors
+
+
+# One sector's share of the fetched data (what its render worker is sent), with the errors of
+# the jobs it needed by kind
+def sector_data(name, tickers, data, errors, sector_jobs):
+    per_ticker = {kind: {ticker: data[kind][ticker] for ticker in tickers if ticker in data[kind]}
+                  for kind in ("risk", "insights", "ai_forecast", "quant_forecast") if kind in data}
+    history = data.get("history")
+    if history is not None:
+        history = history[[ticker for ticker in tickers if ticker in history.columns]]
+    return {**per_ticker, "history": history, "portfolio": data.get(("portfolio", name)),
+            "errors": {_kind(job): errors[job] for job in sector_jobs if job in errors}}
+
+
+def report_filename(name):
+    return f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', name)}_Report.html"
+
+
+def _figure(fig):
+    return fig.to_html(full_html=False, include_plotlyjs=False)
+
+
+def _warnings(messages):
+    return "".join(f'<div class="warning">⚠️ {html.escape(message)}</div>' for message in messages)
+
+
+def _section(title, body, errors, kind):
+    if kind in errors:
+        body = _warnings([f"{title} unavailable: {errors[kind]}"])
+    return f"<h2>{html.escape(title)}</h2>\n{body}\n"
+
+
+# Writes the report of one sector to `output_dir` -> (path, seconds). Runs in a worker process.
+def render_report(name, tickers, sector, output_dir, generated_at):
+    started = time.perf_counter()
+    errors = sector["errors"]
+    risk_data = sector.get("risk", {})
+    history = sector["history"]
+    sections = []
+
+    if history is not None and not history.empty:
+        sections.append(_section("Stock Performance", _figure(Charts.performance_figure(history)), errors, "history"))
+        sections.append(_section("Growth Rate", _figure(Charts.growth_figure(history)), errors, "history"))
+    else:
+        sections.append(_section("Stock Performance", _warnings(["No price history available."]), errors,
+                                 "history"))
+
+    valid = {ticker: record for ticker, record in risk_data.items() if "error" not in record}
+    body = _warnings([f"{ticker}: {record['error']}" for ticker, record in risk_data.items() if "error" in record]
+                     + [f"{ticker}: no data" for ticker in tickers if ticker not in risk_data])
+    if valid:
+        body += _figure(Charts.risk_comparison_figure(valid))
+        body += Charts.risk_table(valid).set_index("Company").style.format(
+            Charts.RISK_TABLE_FORMAT, na_rep="-").to_html()
+    sections.append(_section("Risk Metrics", body, errors, "risk"))
+
+    portfolio = sector["portfolio"]
+    if portfolio is not None:
+        summary, caption = Charts.portfolio_summary(portfolio)
+        body = (_figure(Charts.correlation_figure(portfolio)) + summary.style.format("{:.4f}", na_rep="-").to_html()
+                + f'<p class="caption">{html.escape(caption)}</p>'
+                + _warnings([f"{ticker}: {error}" for ticker, error in portfolio.get("errors", {}).items()]))
+        sections.append(_section("Portfolio Risk", body, errors, "portfolio"))
+    elif "portfolio" in errors:
+        sections.append(_section("Portfolio Risk", "", errors, "portfolio"))
+
+    if "insights" in sector or "insights" in errors:
+        body = ""
+        for ticker in tickers:
+            insight = sector.get("insights", {}).get(ticker) or {}
+            if "insight_text" in insight:
+                body += (f"<h5>📌 Key-Insights for {html.escape(ticker)}</h5>"
+                         f'<p class="insight">{html.escape(insight["insight_text"])}</p>')
+            else:
+                body += _warnings([f"No insights available for {ticker}: {insight.get('error', 'no data')}"])
+        sections.append(_section("Market Trend Analysis", body, errors, "insights"))
+
+    body = ""
+    for kind, table, figure in (("ai_forecast", Charts.ai_forecast_table, Charts.ai_forecast_figure),
+                                ("quant_forecast", Charts.quant_forecast_table, Charts.quant_forecast_figure)):
+        if kind in errors:
+            body += _warnings([f"Forecast unavailable: {errors[kind]}"])
+        elif kind in sector:
+            results = sector[kind]
+            df_forecast = table(tickers, results)
+            body += (_warnings([f"No forecast for {ticker}: {result['error']}" for ticker, result in results.items()
+                                if "error" in result])
+                     + _figure(figure(df_forecast))
+                     + df_forecast.set_index("Company").style.format("{:.2f}", na_rep="-").to_html())
+    sections.append(_section("Growth Forecast", body, errors, None))
+
+    page = (f'<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n'
+            f"<title>{html.escape(name)} Report - MarketTrend AI</title>\n"
+            f'<script src="{PLOTLY_JS}"></script>\n<style>{REPORT_CSS}</style>\n</head>\n<body>\n'
+            f'<div class="header-container">MarketTrend AI: {html.escape(name)} Report</div>\n'
+            f'<p class="caption">{len(tickers)} tickers · generated {generated_at}</p>\n'
+            + "".join(sections) + "</body>\n</html>\n")
+    path = os.path.join(output_dir, report_filename(name))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(page)
+    return path, time.perf_counter() - started
+
+
+def _write_index(output_dir, watchlists, reports, failed, generated_at):
+    rows = "".join(
+        f"<tr><td>{html.escape(name)}</td><td>{len(tickers)}</td><td>"
+        + (f'<a href="{os.path.basename(reports[name])}">report</a>' if name in reports
+           else f"failed: {html.escape(failed.get(name, ''))}") + "</td></tr>"
+        for name, tickers in watchlists.items())
+    with open(os.path.join(output_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write(f'<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<title>MarketTrend AI reports</title>\n'
+                f"<style>{REPORT_CSS}</style>\n</head>\n<body>\n"
+                f'<div class="header-container">MarketTrend AI: Sector Reports</div>\n'
+                f'<p class="caption">Generated {generated_at}</p>\n'
+                f"<table><tr><th>Sector</th><th>Tickers</th><th>Report</th></tr>{rows}</table>\n</body>\n</html>\n")
+
+
+# One report per sector ({name: [tickers]}) into `output_dir`. Each sector is rendered as soon as
+# its data is in, while the others are still being fetched: with `workers` > 1 in a process pool,
+# otherwise in this process. "render_seconds" is the rendering left once everything was fetched.
+# -> {"reports": {name: path}, "failed": {name: error}, "fetch_errors": {job: error}, "fetch_seconds",
+#     "render_seconds", "seconds"}
+def build_reports(watchlists, output_dir, workers=WORKERS, ai=True):
+    started = time.perf_counter()
+    watchlists = {name: _normalize(tickers) for name, tickers in watchlists.items()}
+    watchlists = {name: tickers for name, tickers in watchlists.items() if tickers}
+    generated_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+    os.makedirs(output_dir, exist_ok=True)
+
+    import plotly.offline
+    with open(os.path.join(output_dir, PLOTLY_JS), "w", encoding="utf-8") as f:
+        f.write(plotly.offline.get_plotlyjs())
+
+    reports, failed, rendering = {}, {}, {}
+    pool = None
+    if workers > 1 and len(watchlists) > 1:
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(watchlists)),
+                                   mp_context=multiprocessing.get_context(START_METHOD))
+
+    def render(name, sector):
+        job = (name, watchlists[name], sector, output_dir, generated_at)
+        if pool is not None:
+            rendering[pool.submit(render_report, *job)] = name
+            return
+        try:
+            reports[name], _ = render_report(*job)
+        except Exception as e:
+            logging.error(f"Error rendering the {name} report: {str(e)}")
+            failed[name] = str(e)
+
+    try:
+        _, fetch_errors = fetch_shared(watchlists, ai, on_ready=render)
+        fetched = time.perf_counter()
+        for future in as_completed(rendering):
+            name = rendering[future]
+            try:
+                reports[name], _ = future.result()
+            except Exception as e:
+                logging.error(f"Error rendering the {name} report: {str(e)}")
+                failed[name] = str(e)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    _write_index(output_dir, watchlists, reports, failed, generated_at)
+    finished = time.perf_counter()
+    return {"reports": reports, "failed": failed,
+            "fetch_errors": {job_name(job): error for job, error in fetch_errors.items()},
+            "fetch_seconds": round(fetched - started, 3), "render_seconds": round(finished - fetched, 3),
+            "seconds": round(finished - started, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render static HTML reports for sector watchlists")
+    parser.add_argument("sources", nargs="*",
+                        help="Watchlists JSON files and/or universe files (default: the backend's watchlists)")
+    parser.add_argument("--only", nargs="+", metavar="SECTOR", help="Only report these sectors")
+    parser.add_argument("--output", help="Output directory (default: reports/<today>)")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--no-ai", action="store_true", help="Leave out the Cohere insights and AI forecasts")
+    args = parser.parse_args()
+
+    watchlists = load_sources(args.sources) if args.sources else fetch_watchlists()["watchlists"]
+    if args.only:
+        unknown = set(args.only) - set(watchlists)
+        if unknown:
+            parser.error(f"Unknown sectors: {', '.join(sorted(unknown))}")
+        watchlists = {name: watchlists[name] for name in args.only}
+    if not watchlists:
+        parser.error("No watchlists to report")
+    output_dir = args.output or os.path.join(REPORT_DIR, datetime.now().strftime("%Y-%m-%d"))
+
+    result = build_reports(watchlists, output_dir, args.workers, ai=not args.no_ai)
+    for kind, error in result["fetch_errors"].items():
+        print(f"Fetching {kind} failed: {error}", file=sys.stderr)
+    for name, error in result["failed"].items():
+        print(f"{name}: report failed: {error}", file=sys.stderr)
+    print(f"{len(result['reports'])} reports in {output_dir} ({result['seconds']:.1f}s: "
+          f"fetch {result['fetch_seconds']:.1f}s, render {result['render_seconds']:.1f}s)")
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+import os
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from Metrics import REGISTRY
+
+# ---- RESILIENCE FOR UPSTREAM CALLS -----
+# Every call to an upstream service (Yahoo Finance and Cohere from the backend, the backend from
+# the dashboard) goes through an Upstream, which gives it:
+# - a timeout per attempt, adapted to the latencies seen so far: `timeout_factor` x the p99 of
+#   the last successful attempts, kept between `min_timeout` and `timeout`. With a `deadline`
+#   (time.monotonic() value) for the whole call, no attempt or retry runs past it.
+# - retries with exponential backoff and full jitter, for the exceptions `retryable()` accepts
+# - optionally, a hedged attempt: when an attempt has not answered after `hedge_after` seconds
+#   (or the p90 of recent attempts, if larger, so that at most ~10% of the attempts are hedged),
+#   a second copy is started and the first answer wins. Only for idempotent, cheap calls;
+#   hedged copies are not passed through `admit`.
+# - a circuit breaker: after `failure_threshold` consecutive failed calls the upstream is
+#   considered down and calls fail at once with CircuitOpenError for `reset_timeout` seconds;
+#   then a single probe call is let through, which closes the circuit again if it succeeds.
+#   Callers fall back to stale data where they have some (see PriceStore and LLMCache).
+#
+# Attempts run on the upstream's own thread pool, and an attempt's timeout and hedge delay count
+# from when a pool thread picks it up, so waiting behind other callers for a thread is not taken
+# for a slow upstream (the call's `deadline` still counts from the start). An attempt that times
+# out cannot be interrupted: it finishes in the background and its result is discarded; copies
+# still queued when the attempt ends are cancelled. Breaker states, retries, hedges and call
+# outcomes are exported in the metrics registry (markettrend_upstream_*).
+
+LATENCY_WINDOW = 200  # successful attempts kept for the adaptive timeout and hedge delay
+MIN_SAMPLES = 20
+UPSTREAM_THREADS = int(os.getenv("UPSTREAM_THREADS", "32"))
+QUEUE_POLL = 0.05  # seconds between checks on an attempt still waiting for a pool thread
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, registry=REGISTRY):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.registry = registry
+        self.failures = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self._publish()
+
+    def _publish(self):
+        self.registry.set_gauge("markettrend_upstream_circuit_state", (("upstream", self.name),),
+                                _STATE_VALUES[self.state],
+                                help_text="Circuit breaker state per upstream (0 closed, 1 half-open, 2 open)")
+
+    def _set_state(self, state):
+        if state != self._state:
+            self._state = state
+            self.registry.inc("markettrend_upstream_circuit_transitions_total",
+                              (("upstream", self.name), ("state", state)),
+                              help_text="Circuit breaker state changes per upstream")
+
+    @property
+    def state(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return self._state
+
+    # Raises CircuitOpenError unless a call may go ahead; in the half-open state only one probe
+    # call is let through at a time
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and not self._probing:
+                self._set_state(HALF_OPEN)
+                self._probing = True
+                return
+        self._publish()
+        raise CircuitOpenError(f"{self.name} is unavailable (circuit open), retrying in at most "
+                               f"{self.reset_timeout:.0f}s")
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            self._set_state(CLOSED)
+        self._publish()
+
+    # Giving back a half-open probe that was not made
+    def release(self):
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state(OPEN)
+            self._probing = False
+        self._publish()
+
+
+class Upstream:
+
+    def __init__(self, name, timeout=30.0, min_timeout=None, timeout_factor=3.0, attempts=3, base_delay=0.5,
+                 max_delay=8.0, hedge_after=None, failure_threshold=5, reset_timeout=30.0,
+                 retryable=lambda error: True, registry=REGISTRY):
+        self.name = name
+        self.timeout = timeout
+        self.min_timeout = timeout if min_timeout is None else min_timeout
+        self.timeout_factor = timeout_factor
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_after = hedge_after
+        self.retryable = retryable
+        self.registry = registry
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout, registry)
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self._pool = None
+        _upstreams[name] = self
+
+    def _count(self, name, help_text, value=1, **labels):
+        self.registry.inc(f"markettrend_upstream_{name}_total", (("upstream", self.name), *labels.items()), value,
+                          help_text=help_text)
+
+    def _quantile(self, q):
+        with self._lock:
+            if len(self._latencies) < MIN_SAMPLES:
+                return None
+            latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def attempt_timeout(self):
+        if self.timeout is None:
+            return None
+        p99 = self._quantile(0.99)
+        if p99 is None:
+            return self.timeout
+        return min(self.timeout, max(self.min_timeout, self.timeout_factor * p99))
+
+    def hedge_delay(self):
+        if self.hedge_after is None:
+            return None
+        p90 = self._quantile(0.9)
+        return self.hedge_after if p90 is None else max(self.hedge_after, p90)
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=UPSTREAM_THREADS, thread_name_prefix=f"upstream-{self.name}")
+            return self._pool
+
+    def _timed(self, func):
+        started = time.monotonic()
+        result = func()
+        with self._lock:
+            self._latencies.append(time.monotonic() - started)
+        return result
+
+    # _timed(func) on a pool thread, first noting in `started` when the thread picked it up
+    def _run(self, func, started):
+        started.append(time.monotonic())
+        return self._timed(func)
+
+    # One attempt within `timeout` seconds of starting to run and by `deadline` (None: no limit,
+    # run in the calling thread), hedged once after hedge_delay() if enabled
+    def _attempt(self, func, timeout, deadline=None):
+        hedge_delay = self.hedge_delay()
+        if timeout is None and hedge_delay is None and deadline is None:
+            return self._timed(func)
+
+        pool = self._executor()
+        started = []
+        pending = {pool.submit(self._run, func, started)}
+        first_error = None
+        try:
+            while pending:
+                now = time.monotonic()
+                wake_ups = [] if deadline is None else [deadline - now]
+                if started:
+                    wake_ups += [limit - (now - started[0]) for limit in (timeout, hedge_delay) if limit is not None]
+                else:
+                    wake_ups.append(QUEUE_POLL)
+                done, pending = wait(pending, timeout=max(0.0, min(wake_ups)) if wake_ups else None,
+                                     return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        return future.result()
+                    except Exception as e:
+                        first_error = first_error or e
+                if not pending:
+                    break
+                now = time.monotonic()
+                running = now - started[0] if started else 0.0
+                if hedge_delay is not None and started and running >= hedge_delay:
+                    self._count("hedges", "Hedged copies started for slow upstream attempts")
+                    pending.add(pool.submit(self._run, func, started))
+                    hedge_delay = None
+                if timeout is not None and started and running >= timeout:
+                    raise TimeoutError(f"{self.name} did not answer within {timeout:.1f}s")
+                if deadline is not None and now >= deadline:
+                    raise TimeoutError(f"{self.name}: deadline exceeded")
+            raise first_error
+        finally:
+            for future in pending:
+                future.cancel()
+
+    # func() through the circuit breaker, with timeouts, retries and hedging. `admit()`, when
+    # given, runs before every attempt (e.g. taking a rate-limit token). `deadline` bounds the
+    # whole call, retries included; `attempts` overrides the upstream's (1 for a call that must not
+    # be repeated). Raises CircuitOpenError without calling func when the upstream is down,
+    # otherwise the last attempt's error once retries are exhausted.
+    def call(self, func, deadline=None, admit=None, attempts=None):
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self._count("calls", "Upstream calls by outcome", outcome="rejected")
+            raise
+
+        attempts = self.attempts if attempts is None else max(1, attempts)
+        for attempt in range(attempts):
+            try:
+                # Waiting for admission or running out of time before an attempt is not a
+                # failure of the upstream, so it does not count against the breaker
+                if admit is not None:
+                    admit()
+                timeout = self.attempt_timeout()
+                if deadline is not None and deadline <= time.monotonic():
+                    raise TimeoutError(f"{self.name}: deadline exceeded before the call")
+            except BaseException:
+                self.breaker.release()
+                raise
+            try:
+                result = self._attempt(func, timeout, deadline)
+            except Exception as e:
+                delay = self.backoff(attempt)
+                last_attempt = attempt + 1 >= attempts or not self.retryable(e) or (
+                    deadline is not None and time.monotonic() + delay >= deadline)
+                if last_attempt:
+                    self.breaker.record_failure()
+                    self._count("calls", "Upstream calls by outcome",
+                                outcome="timeout" if isinstance(e, TimeoutError) else "error")
+                    raise
+                self._count("retries", "Upstream attempts retried after an error or timeout")
+                time.sleep(delay)
+            except BaseException:
+                self.breaker.release()
+                raise
+            else:
+                self.breaker.record_success()
+                self._count("calls", "Upstream calls by outcome", outcome="success")
+                return result
+
+    def stats(self):
+        p50, p99 = self._quantile(0.5), self._quantile(0.99)
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "attempt_timeout_seconds": self.attempt_timeout(),
+            "hedge_after_seconds": self.hedge_delay(),
+            "latency_p50_seconds": p50,
+            "latency_p99_seconds": p99,
+        }
+
+
+_upstreams = {}  # name -> Upstream, for monitoring
+
+
+# Refreshing the breaker gauges (an open circuit turns half-open with time, not on a call) -> {name: stats}
+def upstream_stats():
+    for upstream in list(_upstreams.values()):
+        upstream.breaker._publish()
+    return {name: upstream.stats() for name, upstream in list(_upstreams.items())}
+
+
+# Stale data served because an upstream was unavailable, per upstream
+def count_stale(name, value=1):
+    REGISTRY.inc("markettrend_upstream_stale_served_total", (("upstream", name),), value,
+                 help_text="Stale cached data served because the upstream call failed")
@@ -0,0 +1,97 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# ---- RISK ENGINE -----
+# All tickers are aligned into a single dates x tickers matrix and every metric is one
+# NaN-aware NumPy reduction over the date axis, so a ticker that did not trade on a given
+# date (holiday, listing date, suspension) simply contributes no observation there.
+
+TRADING_DAYS = 252
+
+
+# Aligning the price column of many histories into one dates x tickers DataFrame.
+# Exchange timezones are dropped so that daily bars from different markets share dates.
+def align_closes(histories, column="Close"):
+    series = {}
+    for ticker, hist in histories.items():
+        if hist is None or hist.empty:
+            continue
+        prices = hist[column]
+        index = prices.index.tz_localize(None) if prices.index.tz is not None else prices.index
+        series[ticker] = prices.set_axis(index.normalize())
+
+    if not series:
+        return pd.DataFrame()
+    return pd.concat(series, axis=1).sort_index()
+
+
+# Simple returns of each ticker against its own previous traded price
+def compute_returns(closes):
+    prices = closes.to_numpy(dtype=float)
+    previous = pd.DataFrame(prices).ffill().shift(1).to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = prices / previous - 1.0
+    return returns[1:]
+
+
+# Percentage change from the first to the last traded price of every column
+def compute_growth(closes):
+    if closes.empty:
+        return pd.Series(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (closes.ffill().iloc[-1] / closes.bfill().iloc[0] - 1.0) * 100
+
+
+# Column-wise linearly interpolated quantile ignoring NaN, equivalent to
+# np.nanpercentile(values, q * 100, axis=0) but a single sort instead of a per-column loop
+def nan_quantile(values, q):
+    if values.shape[0] == 0:  # no returns at all, e.g. every ticker has a single bar
+        return np.full(values.shape[1], np.nan)
+    ordered = np.sort(values, axis=0)  # NaN sorts last
+    counts = np.sum(~np.isnan(values), axis=0)
+    position = q * np.maximum(counts - 1, 0)
+    lower = np.floor(position).astype(int)
+    upper = np.minimum(lower + 1, np.maximum(counts - 1, 0))
+    low_values = np.take_along_axis(ordered, lower[None, :], axis=0)[0]
+    high_values = np.take_along_axis(ordered, upper[None, :], axis=0)[0]
+    result = low_values + (high_values - low_values) * (position - lower)
+    return np.where(counts > 0, result, np.nan)
+
+
+# Volatility, historical VaR, CVaR (expected shortfall), max drawdown and Sharpe for every
+# column of `closes` in one vectorized pass. Volatility uses the population std (ddof=0) and
+# VaR the linearly interpolated percentile, matching the per-ticker np.std/np.percentile
+# code this replaces.
+def compute_risk_metrics(closes, confidence=0.95, risk_free_rate=0.0, trading_days=TRADING_DAYS):
+    label = int(round(confidence * 100))
+    columns = ["current_price", "volatility", f"VaR_{label}", f"CVaR_{label}", "max_drawdown", "sharpe"]
+    if closes.empty:
+        return pd.DataFrame(columns=columns, dtype=float)
+
+    prices = closes.ffill().to_numpy(dtype=float)
+    returns = compute_returns(closes)
+
+    with warnings.catch_warnings(), np.errstate(divide="ignore", invalid="ignore"):
+        # All-NaN columns (e.g. a single bar) legitimately reduce to NaN
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+
+        volatility = np.nanstd(returns, axis=0) * np.sqrt(trading_days)
+        var = nan_quantile(returns, 1 - confidence)
+        cvar = np.nanmean(np.where(returns <= var, returns, np.nan), axis=0)
+
+        running_peak = np.fmax.accumulate(prices, axis=0)
+        max_drawdown = np.nanmin(prices / running_peak - 1.0, axis=0)
+
+        annual_return = np.nanmean(returns, axis=0) * trading_days
+        sharpe = (annual_return - risk_free_rate) / volatility
+
+    return pd.DataFrame({
+        "current_price": prices[-1],
+        "volatility": volatility,
+        f"VaR_{label}": var,
+        f"CVaR_{label}": cvar,
+        "max_drawdown": max_drawdown,
+        "sharpe": sharpe,
+    }, index=closes.columns)
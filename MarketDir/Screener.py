@@ -0,0 +1,276 @@
+import os
+import csv
+import sys
+import json
+import time
+import heapq
+import uuid
+import logging
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+from PriceStore import PriceStore, STORE_DIR, FETCH_BATCH_SIZE
+from RiskEngine import align_closes, compute_growth, compute_risk_metrics
+from Universe import load_universe
+
+# ---- UNIVERSE SCREENER -----
+# Ranks a universe of thousands of tickers by one metric. The universe is split into chunks
+# that worker processes fetch (through the shared price store) and score with the same
+# RiskEngine calculations as /market-data; each chunk sends back only its own top-k rows and
+# the parent merges them into a bounded heap, so memory stays flat however large the
+# universe is. At most two chunks per worker are in flight at a time.
+#
+#   python Screener.py universes/dow30.txt --metric sharpe --top 20 [--workers 4]
+#       [--chunk-size 100] [--period 1y] [--output ranked.csv]
+#
+# The backend runs the same screen as a background job (POST /screener, GET /screener/<id>),
+# whose progress is kept in a small JSON file per job so every server worker can report it.
+# Each server process runs at most SCREENER_MAX_JOBS jobs at a time (each with its own pool of
+# worker processes); job files are removed SCREENER_JOB_TTL seconds after their last update.
+
+UNIVERSE_DIR = os.getenv("SCREENER_UNIVERSE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                "universes"))
+JOB_DIR = os.getenv("SCREENER_JOB_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                      "screener_jobs"))
+WORKERS = int(os.getenv("SCREENER_WORKERS", str(os.cpu_count() or 2)))
+CHUNK_SIZE = int(os.getenv("SCREENER_CHUNK_SIZE", "100"))
+START_METHOD = os.getenv("SCREENER_START_METHOD", "spawn")  # forking a threaded server is unsafe
+MAX_JOBS = int(os.getenv("SCREENER_MAX_JOBS", "2"))
+JOB_TTL = float(os.getenv("SCREENER_JOB_TTL", "86400"))
+
+# Rankable metrics and whether larger is better
+METRICS = {
+    "growth": True,
+    "sharpe": True,
+    "volatility": False,
+    "VaR_95": True,  # VaR is a (negative) return: closer to zero is less risky
+    "CVaR_95": True,
+    "max_drawdown": True,
+}
+FIELDS = ["current_price", "growth", "volatility", "VaR_95", "CVaR_95", "max_drawdown", "sharpe"]
+
+
+# A universe by name from UNIVERSE_DIR (the backend does not open arbitrary paths)
+def universe_path(name):
+    path = os.path.realpath(os.path.join(UNIVERSE_DIR, name))
+    if os.path.dirname(path) != os.path.realpath(UNIVERSE_DIR) or not os.path.isfile(path):
+        raise ValueError(f"Unknown universe: {name}")
+    return path
+
+
+def list_universes():
+    if not os.path.isdir(UNIVERSE_DIR):
+        return []
+    return sorted(name for name in os.listdir(UNIVERSE_DIR) if name.lower().endswith((".txt", ".csv")))
+
+
+def _ranking_key(metric, descending):
+    return lambda row: row[metric] if descending else -row[metric]
+
+
+# NaN (e.g. a Sharpe ratio without volatility) becomes None so results stay valid JSON
+def _finite(value):
+    return float(value) if np.isfinite(value) else None
+
+
+# Worker process: fetch and score one chunk -> (its top-k rows, number of tickers without data)
+def screen_chunk(tickers, metric, top_k, descending, period, store_root):
+    store = PriceStore(store_root)
+    histories, errors = store.get_histories(tickers, period=period, max_workers=1, batch_size=FETCH_BATCH_SIZE)
+    valid = {ticker: hist for ticker, hist in histories.items() if not hist.empty}
+    if not valid:
+        return [], len(tickers)
+
+    closes = align_closes(valid)
+    metrics = compute_risk_metrics(closes)
+    metrics["growth"] = compute_growth(closes)
+    rows = [{"ticker": ticker, **{field: _finite(metrics.at[ticker, field]) for field in FIELDS}}
+            for ticker in closes.columns if np.isfinite(metrics.at[ticker, metric])]
+    return heapq.nlargest(top_k, rows, key=_ranking_key(metric, descending)), len(tickers) - len(rows)
+
+
+# Top `top_k` tickers of `tickers` by `metric`. `progress(done, total, failed)` is called after
+# every chunk. -> {"metric", "descending", "top": [rows, best first], "scanned", "failed", "seconds"}
+def run_screen(tickers, metric="sharpe", top_k=20, descending=None, workers=WORKERS, chunk_size=CHUNK_SIZE,
+               period="1y", store_root=STORE_DIR, progress=None):
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric: {metric}. Use one of: {', '.join(METRICS)}")
+    descending = METRICS[metric] if descending is None else descending
+    key = _ranking_key(metric, descending)
+    tickers = list(dict.fromkeys(tickers))
+    chunks = [tickers[i:i + chunk_size] for i in range(0, len(tickers), chunk_size)]
+
+    started = time.perf_counter()
+    heap, counter, done, failed = [], 0, 0, 0  # heap of (key, insertion order, row); worst on top
+    if progress:
+        progress(0, len(tickers), 0)
+
+    context = multiprocessing.get_context(START_METHOD)
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(chunks) or 1)), mp_context=context) as pool:
+        queued = iter(chunks)
+        in_flight = {}
+        while True:
+            while len(in_flight) < 2 * workers:
+                chunk = next(queued, None)
+                if chunk is None:
+                    break
+                future = pool.submit(screen_chunk, chunk, metric, top_k, descending, period, store_root)
+                in_flight[future] = chunk
+            if not in_flight:
+                break
+
+            completed, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in completed:
+                chunk = in_flight.pop(future)
+                try:
+                    rows, chunk_failed = future.result()
+                except Exception as e:
+                    logging.error(f"Screener chunk starting at {chunk[0]} failed: {str(e)}")
+                    rows, chunk_failed = [], len(chunk)
+                for row in rows:
+                    counter += 1
+                    entry = (key(row), counter, row)
+                    if len(heap) < top_k:
+                        heapq.heappush(heap, entry)
+                    elif entry > heap[0]:
+                        heapq.heapreplace(heap, entry)
+                done += len(chunk)
+                failed += chunk_failed
+                if progress:
+                    progress(done, len(tickers), failed)
+
+    return {
+        "metric": metric,
+        "descending": descending,
+        "top": [row for _, _, row in sorted(heap, reverse=True)],
+        "scanned": len(tickers),
+        "failed": failed,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+# ---- Background jobs for the backend ---- #
+
+def _job_path(job_id):
+    return os.path.join(JOB_DIR, f"{job_id}.json")
+
+
+def _write_job(job_id, state):
+    os.makedirs(JOB_DIR, exist_ok=True)
+    tmp_path = f"{_job_path(job_id)}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, _job_path(job_id))
+
+
+def read_job(job_id):
+    if not job_id.isalnum():
+        return None
+    try:
+        with open(_job_path(job_id)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def new_job_id():
+    return uuid.uuid4().hex
+
+
+# Removing the job files (and leftover temporary files) not updated for `ttl` seconds
+def expire_jobs(ttl=JOB_TTL):
+    if not os.path.isdir(JOB_DIR):
+        return
+    cutoff = time.time() - ttl
+    for name in os.listdir(JOB_DIR):
+        path = os.path.join(JOB_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+_job_slots = threading.BoundedSemaphore(MAX_JOBS)
+
+
+# Runs a screen and records its progress and result under `job_id` (call it in a thread)
+def run_job(job_id, tickers, **options):
+    state = {"job_id": job_id, "status": "running", "done": 0, "total": len(tickers), "failed": 0,
+             "created_at": time.time()}
+    _write_job(job_id, state)
+
+    def progress(done, total, failed):
+        state.update(done=done, total=total, failed=failed)
+        _write_job(job_id, state)
+
+    try:
+        state["result"] = run_screen(tickers, progress=progress, **options)
+        state["status"] = "done"
+    except Exception as e:
+        logging.error(f"Screener job {job_id} failed: {str(e)}")
+        state.update(status="failed", error=str(e))
+    state["finished_at"] = time.time()
+    _write_job(job_id, state)
+
+
+# Starting run_job() in a background thread if fewer than MAX_JOBS jobs are running in this
+# process -> the job id, or None when all slots are taken. Expired job files are cleaned up first.
+def start_job(tickers, **options):
+    if not _job_slots.acquire(blocking=False):
+        return None
+    try:
+        expire_jobs()
+    except OSError as e:
+        logging.warning(f"Could not expire screener jobs: {str(e)}")
+    job_id = new_job_id()
+
+    def run():
+        try:
+            run_job(job_id, tickers, **options)
+        finally:
+            _job_slots.release()
+
+    threading.Thread(target=run, name=f"screener-{job_id}", daemon=True).start()
+    return job_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank a universe of tickers by a risk or growth metric")
+    parser.add_argument("universe", help="Text file with one ticker per line, or a CSV with a ticker column")
+    parser.add_argument("--metric", default="sharpe", choices=list(METRICS))
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--ascending", action="store_true", help="Rank the smallest values first")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--period", default="1y")
+    parser.add_argument("--output", help="Write the ranked rows to this CSV file")
+    args = parser.parse_args()
+
+    tickers = load_universe(args.universe)
+
+    def progress(done, total, failed):
+        print(f"\r{done}/{total} tickers screened ({failed} without data)", end="", file=sys.stderr, flush=True)
+
+    result = run_screen(tickers, args.metric, args.top, False if args.ascending else None, args.workers,
+                        args.chunk_size, args.period, progress=progress)
+    print(f"\nDone in {result['seconds']:.1f}s", file=sys.stderr)
+
+    print(f"{'rank':>4}  {'ticker':<8}" + "".join(f"{field:>14}" for field in FIELDS))
+    for rank, row in enumerate(result["top"], 1):
+        print(f"{rank:>4}  {row['ticker']:<8}" + "".join(f"{row[field]:>14.4f}" if row[field] is not None
+                                                          else f"{'-':>14}" for field in FIELDS))
+
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["ticker"] + FIELDS)
+            writer.writeheader()
+            writer.writerows(result["top"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import threading
+
+from Metrics import REGISTRY
+
+# ---- SINGLE-FLIGHT REQUEST COALESCING -----
+# Concurrent callers asking for the same key share one in-flight upstream call and its result,
+# so sessions opening the same tickers at the same time cost one Yahoo download and one Cohere
+# generation per ticker / prompt instead of one per session. Nothing is kept once the call
+# completes (caching is the price store's and the generation cache's job).
+#
+# - An exception raised by the upstream call is raised in every caller sharing it; the next
+#   call for the key starts a new flight.
+# - A caller that gives up waiting (`timeout`) only cancels its own wait.
+# - When the leading caller is interrupted (a BaseException such as a closed generator or
+#   SystemExit rather than an upstream error), the callers waiting on it start a new flight
+#   instead of inheriting the interruption.
+# Leaders and coalesced callers are counted in markettrend_singleflight_calls_total.
+
+
+class _Call:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.interrupted = False
+
+    def finish(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.interrupted = error is not None and not isinstance(error, Exception)
+        self.done.set()
+
+
+class SingleFlight:
+
+    def __init__(self, name, registry=REGISTRY):
+        self.name = name
+        self.registry = registry
+        self._calls = {}  # key -> _Call in flight
+        self._lock = threading.Lock()
+
+    def _count(self, role, n=1):
+        if n:
+            self.registry.inc("markettrend_singleflight_calls_total", (("flight", self.name), ("role", role)), n,
+                              help_text="Upstream calls made (leader) or shared with a call in flight (coalesced)")
+
+    @staticmethod
+    def _wait(call, timeout):
+        if not call.done.wait(timeout):
+            raise TimeoutError("Timed out waiting for an upstream call in flight")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    # func() for `key`, or the result of the identical call already in flight. `admit()`, when
+    # given, runs before this caller starts a call of its own (e.g. taking a rate-limit token,
+    # whose failure then only affects this caller).
+    def do(self, key, func, admit=None, timeout=None):
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+            if call is None and admit is not None:
+                admit()
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+
+            if not leader:
+                self._count("coalesced")
+                call.done.wait(timeout)
+                if call.done.is_set() and call.interrupted:
+                    continue
+                return self._wait(call, 0)
+
+            self._count("leader")
+            try:
+                result = func()
+            except BaseException as e:
+                self._release(key, call, error=e)
+                raise
+            self._release(key, call, result=result)
+            return result
+
+    def _release(self, key, call, result=None, error=None):
+        with self._lock:
+            del self._calls[key]
+        call.finish(result, error)
+
+    # do() for a batch of keys in one upstream call: keys already in flight are waited for, the
+    # others are claimed and passed together to func(keys) -> ({key: result}, {key: Exception}).
+    # Returns ({key: result}, {key: Exception}); an exception raised by func fails the keys it claimed.
+    def do_many(self, keys, func, timeout=None):
+        claimed, joined = {}, {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                if key in self._calls:
+                    joined[key] = self._calls[key]
+                else:
+                    claimed[key] = self._calls[key] = _Call()
+        self._count("leader", len(claimed))
+        self._count("coalesced", len(joined))
+
+        results, errors = {}, {}
+        if claimed:
+            try:
+                results, errors = func(list(claimed))
+            except Exception as e:
+                results, errors = {}, {key: e for key in claimed}
+            except BaseException as e:
+                for key, call in claimed.items():
+                    self._release(key, call, error=e)
+                raise
+            results = {key: results[key] for key in claimed if key in results}
+            errors = {key: errors.get(key, KeyError(key)) for key in claimed if key not in results}
+            for key, call in claimed.items():
+                self._release(key, call, results.get(key), errors.get(key))
+
+        retry = []
+        for key, call in joined.items():
+            call.done.wait(timeout)
+            if call.done.is_set() and call.interrupted:
+                retry.append(key)
+                continue
+            try:
+                results[key] = self._wait(call, 0)
+            except Exception as e:
+                errors[key] = e
+        if retry:
+            retried, retry_errors = self.do_many(retry, func, timeout)
+            results.update(retried)
+            errors.update(retry_errors)
+        return results, errors
@@ -0,0 +1,23 @@
+import csv
+
+# ---- UNIVERSE FILES -----
+# Reading ticker universes for the screener and the reports. Kept free of the price store and
+# pandas so the dashboard can parse an uploaded universe without importing them.
+
+
+# Tickers from the lines of a universe file: one per line (text, "#" comments allowed) or a CSV
+# with a "ticker" / "symbol" column (otherwise the first column). Duplicates are dropped.
+def parse_universe(lines, is_csv=False):
+    if is_csv:
+        rows = list(csv.reader(lines))
+        header = [cell.strip().lower() for cell in rows[0]] if rows else []
+        column = next((header.index(name) for name in ("ticker", "symbol") if name in header), None)
+        tickers = [row[column or 0] for row in rows[0 if column is None else 1:] if row]
+    else:
+        tickers = [line.split("#", 1)[0] for line in lines]
+    return list(dict.fromkeys(ticker.strip().upper() for ticker in tickers if ticker.strip()))
+
+
+def load_universe(path):
+    with open(path, newline="") as f:
+        return parse_universe(f, is_csv=path.lower().endswith(".csv"))
@@ -0,0 +1,102 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+
+MARKET_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MARKET_DIR)
+
+os.environ.setdefault("PRICE_STORE_DIR", tempfile.mkdtemp(prefix="bench_store_"))
+
+from fakes import install_fakes  # noqa: E402
+
+# ---- DASHBOARD RERUN BENCHMARK -----
+# Every widget interaction reruns the Streamlit script. This drives MarketTrend_AI.py with
+# Streamlit's AppTest against an in-process backend (fake Yahoo Finance and Cohere from
+# fakes.py, with network-like latencies) and times one rerun per interaction, counting the
+# backend requests each one made:
+#   - the first "Fetch Data" click
+#   - an unrelated rerun (toggling the sidebar timings)
+#   - switching the forecast mode, and back
+#   - entering portfolio weights
+#   - replacing one of the tickers
+#
+#   python benchmarks/dashboard_rerun_bench.py [--tickers 10] [--script MarketTrend_AI.py]
+
+FORECAST_MODES = ["Quantitative (Monte Carlo)", "AI (Cohere)"]
+WEIGHTS_LABEL = "Portfolio weights (optional, comma separated, in ticker order):"
+
+
+class RequestCounter:
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.count = 0
+
+    def __call__(self, environ, start_response):
+        self.count += 1
+        return self.wsgi_app(environ, start_response)
+
+
+def start_backend(yf_latency, llm_latency):
+    install_fakes(yf_latency, llm_latency)
+    from werkzeug.serving import make_server
+    import MarketAnalysis
+
+    counter = RequestCounter(MarketAnalysis.app.wsgi_app)
+    MarketAnalysis.app.wsgi_app = counter
+    server = make_server("127.0.0.1", 0, MarketAnalysis.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["MARKET_API_URL"] = f"http://127.0.0.1:{server.server_port}"
+    return server, counter
+
+
+def widget(widgets, label):
+    return next(w for w in widgets if w.label == label)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time dashboard reruns per widget interaction")
+    parser.add_argument("--tickers", type=int, default=10)
+    parser.add_argument("--script", default=os.path.join(MARKET_DIR, "MarketTrend_AI.py"))
+    parser.add_argument("--yf-latency", type=float, default=0.05)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    server, counter = start_backend(args.yf_latency, args.llm_latency)
+    from streamlit.testing.v1 import AppTest
+
+    tickers = [f"SYM{i:05d}" for i in range(args.tickers)]
+    app = AppTest.from_file(os.path.abspath(args.script), default_timeout=300)
+    app.session_state["tickers_input"] = ",".join(tickers)
+    app.run()
+
+    steps = [
+        ("fetch data", lambda: widget(app.button, "Fetch Data").click()),
+        ("unrelated rerun", lambda: app.sidebar.checkbox[0].check()),
+        ("forecast mode", lambda: widget(app.radio, "Forecast mode").set_value(FORECAST_MODES[0])),
+        ("forecast mode back", lambda: widget(app.radio, "Forecast mode").set_value(FORECAST_MODES[1])),
+        ("portfolio weights", lambda: widget(app.text_input, WEIGHTS_LABEL).set_value(
+            ",".join(str(i + 1) for i in range(len(tickers))))),
+        ("one ticker changed", lambda: app.text_area(key="tickers_input").set_value(
+            ",".join(tickers[:-1] + ["NEW00001"]))),
+    ]
+
+    print(f"{os.path.basename(args.script)}, {len(tickers)} tickers")
+    print(f"{'interaction':<20} {'rerun (s)':>10} {'backend requests':>17}")
+    for name, interact in steps:
+        interact()
+        requests_before = counter.count
+        start = time.perf_counter()
+        app.run()
+        elapsed = time.perf_counter() - start
+        if app.exception:
+            raise RuntimeError(f"{name}: {app.exception[0].value}")
+        print(f"{name:<20} {elapsed:>10.2f} {counter.count - requests_before:>17}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import sys
+import json
+import time
+import types
+import zlib
+import functools
+import random
+import threading
+
+import numpy as np
+import pandas as pd
+
+# ---- LOCAL STAND-INS FOR YAHOO FINANCE AND COHERE -----
+# Deterministic fakes for offline benchmarking. install_fakes() puts the fake yfinance module
+# in sys.modules (PriceStore imports yfinance lazily, so it picks it up) and hands LLMClient
+# the fake Cohere client instead of creating a real one. Setting `outage = True` on either fake
+# makes every call fail, like a provider that is down.
+
+HISTORY_DAYS = 800  # a little over three years of business days
+
+
+def _seed(text):
+    return zlib.crc32(text.encode("utf-8"))
+
+
+@functools.lru_cache(maxsize=4)
+def _business_days(end):
+    return pd.bdate_range(end=end, periods=HISTORY_DAYS, tz="America/New_York", name="Date")
+
+
+# Synthetic daily OHLCV for one ticker: a geometric random walk seeded by the symbol.
+# Symbols starting with "INVALID" have no data, like an unknown ticker on Yahoo.
+def synthetic_history(ticker, end=None):
+    index = _business_days((end or pd.Timestamp.now(tz="America/New_York")).normalize())
+    if ticker.startswith("INVALID"):
+        return pd.DataFrame(columns=["Open", "High", "Low", "Close", "Volume", "Dividends", "Stock Splits"],
+                            index=index[:0], dtype=float)
+
+    rng = np.random.default_rng(_seed(ticker))
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.018, len(index))))
+    spread = np.abs(rng.normal(0, 0.006, len(index)))
+    return pd.DataFrame({
+        "Open": close * (1 + rng.normal(0, 0.003, len(index))),
+        "High": close * (1 + spread),
+        "Low": close * (1 - spread),
+        "Close": close,
+        "Volume": rng.integers(1_000_000, 50_000_000, len(index)).astype(float),
+        "Dividends": 0.0,
+        "Stock Splits": 0.0,
+    }, index=index)
+
+
+class FakeYFinance(types.ModuleType):
+
+    # `slow_rate` of the calls take `slow_latency` seconds instead of `latency` (tail latency)
+    def __init__(self, latency=0.0, slow_rate=0.0, slow_latency=0.0, seed=0):
+        super().__init__("yfinance")
+        self.latency = latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.outage = False
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _call(self):
+        with self._lock:
+            self.calls += 1
+            slow = self._random.random() < self.slow_rate
+        time.sleep(self.slow_latency if slow else self.latency)
+        if self.outage:
+            raise ConnectionError("Simulated Yahoo Finance outage")
+
+    def _window(self, ticker, period=None, start=None):
+        from PriceStore import period_start
+
+        hist = synthetic_history(ticker)
+        if start is not None:
+            return hist[hist.index >= pd.Timestamp(start, tz=hist.index.tz)]
+        if period is not None:
+            first = period_start(period, hist.index.tz)
+            return hist if first is None else hist[hist.index >= first]
+        return hist
+
+    # Same shape as yf.download(..., group_by="ticker"): (ticker, field) columns, one round-trip
+    def download(self, tickers, period=None, start=None, **kwargs):
+        self._call()
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        return pd.concat({ticker: self._window(ticker, period, start) for ticker in tickers}, axis=1)
+
+    def Ticker(self, ticker):
+        fake = self
+
+        class _Ticker:
+            def history(self, period=None, start=None, **kwargs):
+                fake._call()
+                return fake._window(ticker, period, start)
+
+        return _Ticker()
+
+
+class FakeCohereClient:
+
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.outage = False
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    # Canned replies in the formats the prompts ask for
+    def generate(self, model, prompt, max_tokens, temperature, **kwargs):
+        with self._lock:
+            self.calls += 1
+            failed = self._random.random() < self.failure_rate
+        time.sleep(self.latency)
+        if self.outage:
+            raise ConnectionError("Simulated Cohere outage")
+        if failed:
+            raise RuntimeError("Simulated Cohere failure")
+
+        rng = random.Random(_seed(prompt))
+        if '"forecasts"' in prompt:
+            tickers = prompt.split("Tickers:", 1)[1].split("\n", 1)[0].split(",")
+            text = json.dumps({"forecasts": [
+                {"ticker": ticker.strip(), "growth_6m": round(rng.uniform(-10, 20), 1),
+                 "growth_12m": round(rng.uniform(-15, 35), 1)} for ticker in tickers]})
+        elif "6-Month Growth Estimate" in prompt:
+            text = f"- 6-Month Growth Estimate: {rng.uniform(-10, 20):.1f}%\n" \
+                   f"- 12-Month Growth Estimate: {rng.uniform(-15, 35):.1f}%"
+        else:
+            text = "\n".join(f"{i}. Synthetic insight {rng.randint(0, 9999)} on recent financial trends."
+                             for i in range(1, 4))
+        return types.SimpleNamespace(generations=[types.SimpleNamespace(text=text)])
+
+
+# Routing yfinance and the Cohere client of this process to the fakes
+def install_fakes(yf_latency=0.0, llm_latency=0.0, llm_failure_rate=0.0, seed=0, yf_slow_rate=0.0,
+                  yf_slow_latency=0.0):
+    import LLMClient
+
+    fake_yf = FakeYFinance(latency=yf_latency, slow_rate=yf_slow_rate, slow_latency=yf_slow_latency, seed=seed)
+    sys.modules["yfinance"] = fake_yf
+    fake_co = FakeCohereClient(latency=llm_latency, failure_rate=llm_failure_rate, seed=seed)
+    LLMClient._client = fake_co
+    return fake_yf, fake_co
@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OnlineRisk import OnlineRiskBook  # noqa: E402
+from RiskEngine import align_closes, compute_risk_metrics  # noqa: E402
+
+# ---- ONLINE RISK BENCHMARK -----
+# Simulates intraday polling: every poll revises today's close (an intraday snapshot) and
+# every few polls a new daily bar arrives. Times the incremental update of OnlineRiskBook
+# against recomputing the batch metrics over the same window, and reports the largest
+# deviation from the batch metrics after the last poll.
+#
+#   python benchmarks/online_risk_bench.py [--polls N]
+
+UNIVERSE_SIZES = [10, 100, 1000]
+WINDOW = 252  # returns per polled history, about the 1y slice /market-data/live syncs with
+POLLS_PER_BAR = 5
+FIELDS = ["current_price", "volatility", "VaR_95", "CVaR_95", "sharpe"]
+
+
+def synthetic_histories(n_tickers, n_days, seed=0):
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, size=(n_days, n_tickers)), axis=0))
+    dates = pd.bdate_range(end="2024-12-31", periods=n_days, tz="America/New_York")
+    return {f"T{i:04d}": pd.DataFrame({"Close": closes[:, i]}, index=dates) for i in range(n_tickers)}
+
+
+def main():
+    polls = int(sys.argv[sys.argv.index("--polls") + 1]) if "--polls" in sys.argv else 50
+    n_days = WINDOW + 1 + polls // POLLS_PER_BAR + 1
+    rng = np.random.default_rng(1)
+
+    print(f"{'tickers':>8} {'online (ms/poll)':>17} {'batch (ms/poll)':>16} {'speed-up':>9}   max |online - batch|")
+    for n_tickers in UNIVERSE_SIZES:
+        full = synthetic_histories(n_tickers, n_days)
+        book = OnlineRiskBook()
+        bars = WINDOW + 1
+        book.update({ticker: hist.iloc[:bars] for ticker, hist in full.items()})
+
+        online_time = batch_time = 0.0
+        for poll in range(polls):
+            if poll % POLLS_PER_BAR == 0:
+                bars += 1
+            histories = {}
+            for ticker, hist in full.items():
+                snapshot = hist.iloc[bars - WINDOW - 1:bars].copy()
+                if poll % POLLS_PER_BAR != POLLS_PER_BAR - 1:  # today's bar is still moving
+                    snapshot.iloc[-1, 0] *= 1 + rng.normal(0, 0.005)
+                histories[ticker] = snapshot
+
+            start = time.perf_counter()
+            online = book.update(histories)
+            online_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            batch = compute_risk_metrics(align_closes(histories))
+            batch_time += time.perf_counter() - start
+
+        online = pd.DataFrame.from_dict(online, orient="index")
+        deviation = (online[FIELDS] - batch[FIELDS]).abs().max()
+        print(f"{n_tickers:>8} {online_time / polls * 1000:>17.2f} {batch_time / polls * 1000:>16.2f} "
+              f"{batch_time / online_time:>8.1f}x   " + "  ".join(f"{f}={deviation[f]:.1e}" for f in FIELDS))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Portfolio  # noqa: E402
+from risk_engine_bench import synthetic_closes, best_of  # noqa: E402
+
+# ---- PORTFOLIO MICRO-BENCHMARK -----
+# Times covariance estimation (pairwise, with Ledoit-Wolf shrinkage), a cached lookup of the
+# same data and the portfolio VaR for one set of weights, on one year of synthetic closes.
+#
+#   python benchmarks/portfolio_bench.py [--repeat N]
+
+UNIVERSE_SIZES = [10, 100, 500, 1000]
+
+
+def main():
+    repeat = int(sys.argv[sys.argv.index("--repeat") + 1]) if "--repeat" in sys.argv else 3
+
+    print(f"{'tickers':>8} {'estimate (ms)':>14} {'cached (ms)':>12} {'VaR (ms)':>9} {'shrinkage':>10}")
+    for n_tickers in UNIVERSE_SIZES:
+        closes = synthetic_closes(n_tickers)
+        estimate = best_of(Portfolio.estimate, closes, repeat)
+        Portfolio.get_model(closes)
+        cached = best_of(Portfolio.get_model, closes, repeat)
+
+        model = Portfolio.get_model(closes)
+        weights = Portfolio.normalize_weights(model.tickers)
+        start = time.perf_counter()
+        model.risk(weights)
+        var = time.perf_counter() - start
+        print(f"{n_tickers:>8} {estimate * 1000:>14.2f} {cached * 1000:>12.2f} {var * 1000:>9.2f} "
+              f"{np.round(model.shrinkage, 3):>10}")
+
+
+if __name__ == "__main__":
+    main()
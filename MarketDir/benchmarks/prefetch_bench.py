@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+MARKET_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MARKET_DIR)
+
+WORK_DIR = tempfile.mkdtemp(prefix="bench_prefetch_")
+os.environ["PRICE_STORE_DIR"] = os.path.join(WORK_DIR, "store")
+os.environ["PREFETCH_WATCHLISTS"] = os.path.join(WORK_DIR, "watchlists.json")
+os.environ["PREFETCH_STATE_PATH"] = os.path.join(WORK_DIR, "prefetch_state.json")
+
+from fakes import install_fakes  # noqa: E402
+
+# ---- WATCHLIST PREFETCH BENCHMARK -----
+# The first requests of the day for a watchlist, against the fake Yahoo Finance and Cohere
+# (fakes.py, with network-like latencies): once cold, as without the scheduler, and once after
+# one prefetch run. Reports the latency of each endpoint and the upstream calls it made.
+#
+#   python benchmarks/prefetch_bench.py [--tickers 30] [--yf-latency 0.2] [--llm-latency 0.3]
+
+ENDPOINTS = ["/market-data", "/sentiment-insights/batch", "/growth-forecast/batch"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold vs prefetched watchlist requests")
+    parser.add_argument("--tickers", type=int, default=30)
+    parser.add_argument("--yf-latency", type=float, default=0.2)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    fake_yf, fake_co = install_fakes(args.yf_latency, args.llm_latency)
+    import MarketAnalysis
+    import Prefetch
+
+    client = MarketAnalysis.app.test_client()
+    watchlist = [f"SYM{i:05d}" for i in range(args.tickers)]
+    cold = [f"COLD{i:05d}" for i in range(args.tickers)]
+    Prefetch.save_watchlist("bench", watchlist)
+
+    scheduler = Prefetch.PrefetchScheduler(MarketAnalysis._risk_records, llm_per_minute=60000, llm_burst=1000)
+    scheduler._elect()
+    start = time.perf_counter()
+    scheduler.run_once(force_market_refresh=True)
+    print(f"prefetch run for {len(watchlist)} tickers: {time.perf_counter() - start:.2f}s, "
+          f"{fake_yf.calls} Yahoo and {fake_co.calls} Cohere calls\n")
+
+    print(f"{'endpoint':<28} {'cold (ms)':>10} {'warm (ms)':>10} {'cold upstream':>14} {'warm upstream':>14}")
+    for endpoint in ENDPOINTS:
+        row = []
+        for tickers in (cold, watchlist):
+            calls = fake_yf.calls + fake_co.calls
+            start = time.perf_counter()
+            response = client.post(endpoint, json={"tickers": tickers})
+            row.append(((time.perf_counter() - start) * 1000, fake_yf.calls + fake_co.calls - calls))
+            assert response.status_code == 200, response.data
+        print(f"{endpoint:<28} {row[0][0]:>10.1f} {row[1][0]:>10.1f} {row[0][1]:>14} {row[1][1]:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+import threading
+import subprocess
+
+MARKET_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MARKET_DIR)
+
+# ---- BATCH REPORT BENCHMARK -----
+# A month-end run of sector reports against an in-process backend (fake Yahoo Finance and Cohere
+# from fakes.py, with network-like latencies). The sectors overlap: each shares half of its
+# tickers with the next one. Two runs, each in a fresh process with an empty price store and
+# generation cache:
+#   - one sector at a time, each fetching its own data (as with the dashboard, sector by sector)
+#   - ReportBuilder.build_reports(): shared fetches, reports rendered across a process pool
+# Reports the wall time, the backend requests and the upstream calls of each run, without and
+# with the Cohere insights and AI forecasts. With them, both runs are bound by the Cohere rate
+# limit (LLM_RATE_PER_SECOND): the generations are the same, so only the market data, the
+# requests and the rendering (overlapped with the generations) can be saved. For watchlists kept
+# warm by the prefetch scheduler (Prefetch.py) the generations are cached, and the run is close
+# to the one without AI.
+#
+#   python benchmarks/report_bench.py [--sectors 12] [--tickers 20] [--workers <CPUs>] [--no-ai]
+
+
+class RequestCounter:
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.count = 0
+
+    def __call__(self, environ, start_response):
+        self.count += 1
+        return self.wsgi_app(environ, start_response)
+
+
+def sectors(n_sectors, n_tickers):
+    step = max(1, n_tickers // 2)
+    return {f"Sector{i:02d}": [f"SYM{j:05d}" for j in range(i * step, i * step + n_tickers)] for i in range(n_sectors)}
+
+
+def run(mode, args):
+    work_dir = tempfile.mkdtemp(prefix="bench_reports_")
+    os.environ["PRICE_STORE_DIR"] = os.path.join(work_dir, "store")
+    from fakes import install_fakes
+    fake_yf, fake_co = install_fakes(args.yf_latency, args.llm_latency)
+    from werkzeug.serving import make_server
+    import MarketAnalysis
+
+    counter = RequestCounter(MarketAnalysis.app.wsgi_app)
+    MarketAnalysis.app.wsgi_app = counter
+    server = make_server("127.0.0.1", 0, MarketAnalysis.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["MARKET_API_URL"] = f"http://127.0.0.1:{server.server_port}"
+    import BackendClient
+    BackendClient.FLASK_API_URL = os.environ["MARKET_API_URL"]
+    import ReportBuilder
+
+    watchlists = sectors(args.sectors, args.tickers)
+    output_dir = os.path.join(work_dir, "reports")
+    if mode == "sequential":
+        seconds, failed = 0.0, 0
+        for name, tickers in watchlists.items():
+            result = ReportBuilder.build_reports({name: tickers}, output_dir, workers=1, ai=not args.no_ai)
+            seconds += result["seconds"]
+            failed += len(result["failed"])
+    else:
+        result = ReportBuilder.build_reports(watchlists, output_dir, workers=args.workers, ai=not args.no_ai)
+        seconds, failed = result["seconds"], len(result["failed"])
+    server.shutdown()
+    print(json.dumps({"seconds": seconds, "failed": failed, "requests": counter.count,
+                      "yahoo_calls": fake_yf.calls, "cohere_calls": fake_co.calls}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sector reports one at a time vs batched")
+    parser.add_argument("--sectors", type=int, default=12)
+    parser.add_argument("--tickers", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--yf-latency", type=float, default=0.2)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--no-ai", action="store_true", help="Only the runs without insights and AI forecasts")
+    parser.add_argument("--mode", choices=["sequential", "batch"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        return run(args.mode, args)
+
+    from LLMClient import LLM_RATE_PER_SECOND, LLM_BURST
+    print(f"{args.sectors} sectors x {args.tickers} tickers, {args.workers} render workers")
+    for label, extra in (("market data only", ["--no-ai"]), ("with AI", [])):
+        if args.no_ai and not extra:
+            continue
+        print(f"\n{label}")
+        print(f"{'run':<12} {'wall (s)':>9} {'requests':>9} {'Yahoo calls':>12} {'Cohere calls':>13} {'failed':>7}")
+        for mode in ("sequential", "batch"):
+            output = subprocess.run([sys.executable, __file__, "--mode", mode] + sys.argv[1:] + extra,
+                                    capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{mode:<12} {result['seconds']:>9.2f} {result['requests']:>9} {result['yahoo_calls']:>12} "
+                  f"{result['cohere_calls']:>13} {result['failed']:>7}")
+        if not extra:
+            print(f"(at LLM_RATE_PER_SECOND={LLM_RATE_PER_SECOND:g}, {result['cohere_calls']} Cohere calls take at "
+                  f"least {max(0, result['cohere_calls'] - LLM_BURST) / LLM_RATE_PER_SECOND:.1f}s in either run)")
+
+
+if __name__ == "__main__":
+    main()
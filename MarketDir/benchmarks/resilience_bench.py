@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+MARKET_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MARKET_DIR)
+
+os.environ.setdefault("PRICE_STORE_DIR", tempfile.mkdtemp(prefix="bench_store_"))
+
+from fakes import install_fakes  # noqa: E402
+
+# ---- UPSTREAM RESILIENCE BENCHMARK -----
+# Against the fake Yahoo Finance and Cohere (fakes.py):
+#   - tail latency: /market-data for a few new tickers per request while `--slow-rate` of the
+#     Yahoo downloads take `--slow-latency` seconds, without and with hedged downloads
+#   - outage: Yahoo Finance and Cohere down while their data is stale; the first requests wait
+#     for the retries, then the circuits open and the stored prices and expired generations are
+#     served at once
+#
+#   python benchmarks/resilience_bench.py [--requests 100] [--slow-rate 0.05] [--hedge-after 0.3]
+
+
+def percentiles(latencies):
+    return "  ".join(f"p{q} {np.percentile(latencies, q) * 1000:7.0f}ms" for q in (50, 95, 99))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tail latency with hedging, and behaviour during an outage")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--tickers", type=int, default=3)
+    parser.add_argument("--yf-latency", type=float, default=0.1)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-latency", type=float, default=3.0)
+    parser.add_argument("--hedge-after", type=float, default=0.3)
+    parser.add_argument("--outage-requests", type=int, default=7)
+    args = parser.parse_args()
+
+    fake_yf, fake_co = install_fakes(args.yf_latency, 0.05, yf_slow_rate=args.slow_rate,
+                                     yf_slow_latency=args.slow_latency)
+    import LLMCache
+    import PriceStore
+    from MarketAnalysis import app
+
+    client = app.test_client()
+    batch = 0
+    print(f"/market-data, {args.requests} requests of {args.tickers} new tickers, "
+          f"{args.slow_rate:.0%} of downloads take {args.slow_latency}s")
+    for label, hedge_after in (("no hedging", None), (f"hedged after {args.hedge_after}s", args.hedge_after)):
+        PriceStore._yahoo.hedge_after = hedge_after
+        latencies = []
+        for _ in range(args.requests):
+            tickers = [f"T{batch:04d}{i:02d}" for i in range(args.tickers)]
+            batch += 1
+            start = time.perf_counter()
+            assert client.post("/market-data", json={"tickers": tickers}).status_code == 200
+            latencies.append(time.perf_counter() - start)
+        print(f"  {label:<20} {percentiles(latencies)}")
+
+    tickers = [f"T0000{i:02d}" for i in range(args.tickers)]
+    client.post("/sentiment-insights/batch", json={"tickers": tickers})
+    PriceStore.get_store().max_age = 0
+    LLMCache.get_cache().ttl = 0
+    fake_yf.outage = fake_co.outage = True
+    print("\nYahoo Finance and Cohere down, stale data available")
+    for i in range(args.outage_requests):
+        for endpoint in ("/market-data", "/sentiment-insights/batch"):
+            start = time.perf_counter()
+            data = client.post(endpoint, json={"tickers": tickers}).get_json()
+            served = sum("error" not in record for record in data.values())
+            print(f"  request {i + 1} {endpoint:<26} {(time.perf_counter() - start) * 1000:7.0f}ms, "
+                  f"{served}/{len(tickers)} served")
+
+    print()
+    for line in client.get("/metrics").data.decode().splitlines():
+        if line.startswith("markettrend_upstream") and ("yahoo" in line or "cohere" in line):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
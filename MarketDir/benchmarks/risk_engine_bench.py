@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from RiskEngine import compute_risk_metrics  # noqa: E402
+
+# ---- RISK ENGINE MICRO-BENCHMARK -----
+# Times the vectorized engine against the per-ticker np.std/np.percentile loop it replaced,
+# on one year of synthetic daily closes (with ~2% missing bars) for 10 to 5,000 tickers.
+#
+#   python benchmarks/risk_engine_bench.py [--repeat N]
+
+UNIVERSE_SIZES = [10, 100, 1000, 5000]
+TRADING_DAYS = 252
+
+
+def synthetic_closes(n_tickers, n_days=TRADING_DAYS, seed=0):
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0003, 0.02, size=(n_days, n_tickers))
+    closes = 100 * np.exp(np.cumsum(returns, axis=0))
+    closes[rng.random(closes.shape) < 0.02] = np.nan
+    dates = pd.bdate_range(end="2024-12-31", periods=n_days)
+    return pd.DataFrame(closes, index=dates, columns=[f"T{i:04d}" for i in range(n_tickers)])
+
+
+# The previous implementation: one Series and two NumPy reductions per ticker
+def per_ticker_loop(closes):
+    risk_data = {}
+    for ticker in closes.columns:
+        returns = closes[ticker].dropna().pct_change()
+        risk_data[ticker] = (np.std(returns) * np.sqrt(252), np.percentile(returns.dropna(), 5))
+    return risk_data
+
+
+def best_of(func, closes, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(closes)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    repeat = int(sys.argv[sys.argv.index("--repeat") + 1]) if "--repeat" in sys.argv else 3
+
+    print(f"{'tickers':>8} {'vectorized (ms)':>16} {'per-ticker (ms)':>16} {'speed-up':>9}")
+    for n_tickers in UNIVERSE_SIZES:
+        closes = synthetic_closes(n_tickers)
+        vectorized = best_of(compute_risk_metrics, closes, repeat)
+        looped = best_of(per_ticker_loop, closes, repeat)
+        print(f"{n_tickers:>8} {vectorized * 1000:>16.2f} {looped * 1000:>16.2f} {looped / vectorized:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+
+import numpy as np
+
+MARKET_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MARKET_DIR)
+
+# ---- OFFLINE BENCHMARK SUITE -----
+# Drives /market-data, /market-data/stream, /sentiment-insights/batch, /growth-forecast/batch,
+# /growth-forecast/quant and generate_growth_forecast() in-process (Flask test client) against deterministic local
+# fakes for Yahoo Finance and Cohere, at several watchlist sizes, and writes the results
+# to a JSON file so runs can be compared.
+#
+#   python benchmarks/run_benchmarks.py [--sizes 10 100 1000] [--iterations 5]
+#       [--yf-latency 0.05] [--llm-latency 0.02] [--llm-failure-rate 0.0]
+#       [--output results.json] [--compare previous.json]
+#
+# Latencies are wall-clock seconds per request (per batch of forecast calls for the
+# forecast scenario). Peak memory is the tracemalloc peak of Python allocations during
+# one extra, untimed run of the scenario. "cold" scenarios start from an empty price
+# store / generation cache.
+
+from fakes import install_fakes  # noqa: E402
+import LLMCache  # noqa: E402
+import LLMClient  # noqa: E402
+import PriceStore  # noqa: E402
+from Concurrency import TokenBucket  # noqa: E402
+from MarketAnalysis import app  # noqa: E402
+
+
+def summarize(latencies, n_tickers, peak_bytes, upstream_calls):
+    latencies = np.asarray(latencies)
+    return {
+        "p50_s": float(np.percentile(latencies, 50)),
+        "p95_s": float(np.percentile(latencies, 95)),
+        "p99_s": float(np.percentile(latencies, 99)),
+        "mean_s": float(latencies.mean()),
+        "requests_per_s": float(1 / latencies.mean()),
+        "tickers_per_s": float(n_tickers / latencies.mean()),
+        "peak_memory_mb": peak_bytes / 2 ** 20,
+        "upstream_calls_per_iteration": upstream_calls / len(latencies),
+    }
+
+
+# Runs `call` `iterations` times, calling `setup` (untimed) before each run, then once more
+# under tracemalloc for the memory peak (tracing slows allocations, so it is kept out of
+# the timed runs)
+def measure(iterations, setup, call, counters):
+    latencies, extras = [], []
+    calls_before = sum(counter.calls for counter in counters)
+    for _ in range(iterations):
+        setup()
+        start = time.perf_counter()
+        extra = call()
+        latencies.append(time.perf_counter() - start)
+        if extra is not None:
+            extras.append(extra)
+    calls = sum(counter.calls for counter in counters) - calls_before
+
+    setup()
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return latencies, extras, peak, calls
+
+
+def fresh_store():
+    PriceStore._default_store = PriceStore.PriceStore(tempfile.mkdtemp(prefix="bench_store_"))
+
+
+def fresh_cache():
+    LLMCache.configure_cache(path=None)
+
+
+def run_suite(args, fake_yf, fake_co):
+    client = app.test_client()
+    results = []
+
+    for n_tickers in args.sizes:
+        tickers = [f"SYM{i:05d}" for i in range(n_tickers)]
+
+        def post_market_data():
+            response = client.post("/market-data", json={"tickers": tickers})
+            assert response.status_code == 200, response.data
+
+        def stream_market_data():
+            start = time.perf_counter()
+            response = client.post("/market-data/stream", json={"tickers": tickers}, buffered=False)
+            first = None
+            for _ in response.response:
+                if first is None:
+                    first = time.perf_counter() - start
+            response.close()
+            return first
+
+        def post_sentiment_batch():
+            response = client.post("/sentiment-insights/batch", json={"tickers": tickers})
+            assert response.status_code == 200, response.data
+
+        def post_forecast_batch():
+            response = client.post("/growth-forecast/batch", json={"tickers": tickers})
+            assert response.status_code == 200, response.data
+
+        def post_quant_forecast():
+            response = client.post("/growth-forecast/quant", json={"tickers": tickers})
+            assert response.status_code == 200, response.data
+
+        def forecast_all():
+            for ticker in tickers:
+                LLMClient.generate_growth_forecast(ticker)
+
+        fresh_store()
+        post_market_data()  # warms the store for the warm scenario
+
+        scenarios = [
+            ("market_data_cold", fresh_store, post_market_data, [fake_yf]),
+            ("market_data_warm", lambda: None, post_market_data, [fake_yf]),
+            ("market_data_stream_cold", fresh_store, stream_market_data, [fake_yf]),
+            ("sentiment_batch_cold", fresh_cache, post_sentiment_batch, [fake_co]),
+            ("growth_forecast_cold", fresh_cache, forecast_all, [fake_co]),
+            ("growth_forecast_batch_cold", fresh_cache, post_forecast_batch, [fake_co]),
+            ("growth_forecast_quant_warm", lambda: None, post_quant_forecast, [fake_yf]),
+        ]
+        for name, setup, call, counters in scenarios:
+            latencies, extras, peak, calls = measure(args.iterations, setup, call, counters)
+            result = {"scenario": name, "tickers": n_tickers, **summarize(latencies, n_tickers, peak, calls)}
+            if extras:
+                result["time_to_first_record_p50_s"] = float(np.percentile(extras, 50))
+            results.append(result)
+            print(f"{name:<26} {n_tickers:>6} tickers  p50 {result['p50_s'] * 1000:9.1f}ms  "
+                  f"p95 {result['p95_s'] * 1000:9.1f}ms  p99 {result['p99_s'] * 1000:9.1f}ms  "
+                  f"{result['tickers_per_s']:10.1f} tickers/s  peak {result['peak_memory_mb']:7.1f}MB")
+
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=MARKET_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# p50 change per scenario against an earlier results file
+def compare(results, previous_path):
+    with open(previous_path) as f:
+        previous = {(r["scenario"], r["tickers"]): r for r in json.load(f)["results"]}
+
+    print(f"\nComparison with {previous_path} (p50, negative is faster):")
+    for result in results:
+        before = previous.get((result["scenario"], result["tickers"]))
+        if before:
+            change = (result["p50_s"] - before["p50_s"]) / before["p50_s"] * 100
+            print(f"{result['scenario']:<26} {result['tickers']:>6} tickers  {change:+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks with fake Yahoo Finance and Cohere")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--yf-latency", type=float, default=0.05, help="Seconds per fake Yahoo round-trip")
+    parser.add_argument("--llm-latency", type=float, default=0.02, help="Seconds per fake Cohere generation")
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    parser.add_argument("--llm-rate", type=float, default=1e9,
+                        help="Token-bucket rate for Cohere calls (default: effectively unlimited)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=os.path.join(MARKET_DIR, "benchmarks", "results",
+                                                         f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json"))
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    fake_yf, fake_co = install_fakes(args.yf_latency, args.llm_latency, args.llm_failure_rate, args.seed)
+    LLMClient.llm_rate_limiter = TokenBucket(args.llm_rate, max(1, int(min(args.llm_rate, 1e6))))
+
+    results = run_suite(args, fake_yf, fake_co)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "parameters": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+            "results": results,
+        }, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+
+MARKET_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MARKET_DIR)
+
+os.environ.setdefault("PRICE_STORE_DIR", tempfile.mkdtemp(prefix="bench_store_"))
+
+from fakes import install_fakes  # noqa: E402
+
+# ---- CONCURRENT SESSIONS BENCHMARK -----
+# Several sessions opening the same watchlist at the same moment, against the fake Yahoo
+# Finance and Cohere (fakes.py, with network-like latencies): each endpoint is requested by
+# all sessions at once, from a cold price store / generation cache. Reports the wall time and
+# the upstream calls made, which with request coalescing stay those of a single session.
+#
+#   python benchmarks/singleflight_bench.py [--sessions 8] [--tickers 10]
+
+ENDPOINTS = ["/market-data", "/sentiment-insights/batch", "/growth-forecast/batch"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upstream calls of concurrent identical requests")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--tickers", type=int, default=10)
+    parser.add_argument("--yf-latency", type=float, default=0.2)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    fake_yf, fake_co = install_fakes(args.yf_latency, args.llm_latency)
+    from MarketAnalysis import app
+
+    client = app.test_client()
+    tickers = [f"SYM{i:05d}" for i in range(args.tickers)]
+
+    print(f"{args.sessions} sessions, {len(tickers)} tickers")
+    print(f"{'endpoint':<28} {'wall (s)':>9} {'Yahoo calls':>12} {'Cohere calls':>13}")
+    for endpoint in ENDPOINTS:
+        statuses = []
+        sessions = [threading.Thread(target=lambda: statuses.append(
+            client.post(endpoint, json={"tickers": tickers}).status_code)) for _ in range(args.sessions)]
+        yf_calls, co_calls = fake_yf.calls, fake_co.calls
+        start = time.perf_counter()
+        for session in sessions:
+            session.start()
+        for session in sessions:
+            session.join()
+        elapsed = time.perf_counter() - start
+        assert statuses == [200] * args.sessions, statuses
+        print(f"{endpoint:<28} {elapsed:>9.2f} {fake_yf.calls - yf_calls:>12} {fake_co.calls - co_calls:>13}")
+
+    print()
+    for line in client.get("/metrics").data.decode().splitlines():
+        if line.startswith("markettrend_singleflight_calls_total"):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
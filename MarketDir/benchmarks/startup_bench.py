@@ -0,0 +1,97 @@
+import os
+import ast
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+# ---- DASHBOARD STARTUP BENCHMARK -----
+# Measures, each in a fresh interpreter so nothing is already imported:
+#   - import latency of the dashboard script's own top-level imports (read from the script)
+#   - first-render latency of MarketTrend_AI.py (Streamlit AppTest, no backend needed)
+#   - which heavy modules the first render pulled in; none of them should be needed. Modules
+#     that pandas or streamlit already import by themselves (pyarrow with pandas >= 3) are not
+#     counted against the dashboard.
+#
+#   python benchmarks/startup_bench.py [--runs 5] [--max-import 2.0] [--max-first-render 5.0]
+#
+# Exits non-zero when a budget is exceeded or a heavy module is imported, so it can gate CI.
+
+MARKET_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["cohere", "yfinance", "flask", "plotly.express", "pyarrow", "pyarrow.parquet", "PriceStore",
+                 "Screener"]
+
+IMPORT_SNIPPET = """
+import json, time
+start = time.perf_counter()
+%s
+print(json.dumps({"seconds": time.perf_counter() - start}))
+"""
+
+RENDER_SNIPPET = """
+import json, sys, time
+import pandas
+from streamlit.testing.v1 import AppTest
+baseline = set(sys.modules)
+app = AppTest.from_file(%r, default_timeout=60)
+start = time.perf_counter()
+app.run()
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "exceptions": [str(e.value) for e in app.exception],
+                  "heavy_modules": [m for m in %r if m in sys.modules and m not in baseline]}))
+"""
+
+
+# The top-level import statements of the dashboard script, one per line
+def script_imports(script):
+    with open(script) as f:
+        source = f.read()
+    return "\n".join(ast.get_source_segment(source, node) for node in ast.parse(source).body
+                     if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def run_snippet(snippet):
+    output = subprocess.run([sys.executable, "-c", snippet], cwd=MARKET_DIR, capture_output=True, text=True,
+                            check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dashboard import and first-render latency")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import", type=float, default=None, help="Budget for the median import time (s)")
+    parser.add_argument("--max-first-render", type=float, default=None,
+                        help="Budget for the median first-render time (s)")
+    args = parser.parse_args()
+
+    script = os.path.join(MARKET_DIR, "MarketTrend_AI.py")
+    imports = [run_snippet(IMPORT_SNIPPET % script_imports(script))["seconds"] for _ in range(args.runs)]
+    renders = [run_snippet(RENDER_SNIPPET % (script, HEAVY_MODULES)) for _ in range(args.runs)]
+
+    result = {
+        "import_seconds_median": statistics.median(imports),
+        "first_render_seconds_median": statistics.median(r["seconds"] for r in renders),
+        "heavy_modules_loaded": sorted({m for r in renders for m in r["heavy_modules"]}),
+        "exceptions": sorted({e for r in renders for e in r["exceptions"]}),
+    }
+    print(json.dumps(result, indent=2))
+
+    failures = []
+    if args.max_import is not None and result["import_seconds_median"] > args.max_import:
+        failures.append(f"import took {result['import_seconds_median']:.2f}s (budget {args.max_import}s)")
+    if args.max_first_render is not None and result["first_render_seconds_median"] > args.max_first_render:
+        failures.append(f"first render took {result['first_render_seconds_median']:.2f}s "
+                        f"(budget {args.max_first_render}s)")
+    if result["heavy_modules_loaded"]:
+        failures.append(f"heavy modules imported at startup: {', '.join(result['heavy_modules_loaded'])}")
+    if result["exceptions"]:
+        failures.append("the first render raised exceptions")
+
+    for failure in failures:
+        print(f"❌ {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import os
+import sys
+import time
+import tempfile
+
+MARKET_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MARKET_DIR)
+
+from fakes import install_fakes  # noqa: E402
+import PriceStore  # noqa: E402
+from BackendClient import ARROW_STREAM, decode_history  # noqa: E402
+from MarketAnalysis import app  # noqa: E402
+
+# ---- /history WIRE FORMAT BENCHMARK -----
+# Payload size, server time and client decode time of /history as JSON, Arrow (float64) and
+# Arrow (float32), for 18 months of daily closes from the fake Yahoo Finance in fakes.py.
+#
+#   python benchmarks/wire_format_bench.py [--repeat N]
+
+UNIVERSE_SIZES = [10, 100, 500]
+FORMATS = [("json", "application/json", False), ("arrow", ARROW_STREAM, False), ("arrow-f32", ARROW_STREAM, True)]
+
+
+def main():
+    repeat = int(sys.argv[sys.argv.index("--repeat") + 1]) if "--repeat" in sys.argv else 3
+    install_fakes()
+    PriceStore._default_store = PriceStore.PriceStore(tempfile.mkdtemp(prefix="bench_store_"))
+    client = app.test_client()
+
+    print(f"{'tickers':>8} {'format':>10} {'payload (KB)':>13} {'server (ms)':>12} {'decode (ms)':>12}")
+    for n_tickers in UNIVERSE_SIZES:
+        tickers = [f"SYM{i:05d}" for i in range(n_tickers)]
+        client.post("/history", json={"tickers": tickers, "period": "18mo"})  # warms the store
+
+        for name, accept, float32 in FORMATS:
+            server, decode = [], []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                response = client.post("/history", json={"tickers": tickers, "period": "18mo", "float32": float32},
+                                       headers={"Accept": accept})
+                server.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                decode_history(response.content_type, response.data, float32)
+                decode.append(time.perf_counter() - start)
+            print(f"{n_tickers:>8} {name:>10} {len(response.data) / 1024:>13.1f} {min(server) * 1000:>12.1f} "
+                  f"{min(decode) * 1000:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import time
+import threading
+
+import pytest
+
+from Concurrency import TokenBucket, fan_out
+
+
+def test_token_bucket_allows_a_burst_then_paces():
+    bucket = TokenBucket(rate=20, capacity=3)
+    start = time.monotonic()
+    for _ in range(3):
+        bucket.acquire()
+    assert time.monotonic() - start < 0.03
+
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.04  # the fourth token takes 1/rate = 50ms
+
+
+def test_token_bucket_times_out_when_no_token_comes_in_time():
+    bucket = TokenBucket(rate=1, capacity=1)
+    bucket.acquire()
+    with pytest.raises(TimeoutError):
+        bucket.acquire(timeout=0.1)
+
+
+def test_fan_out_collects_results_and_errors_per_item():
+    def square(item):
+        if item < 0:
+            raise ValueError(item)
+        return item * item
+
+    results, errors = fan_out(square, [1, 2, 2, -1], concurrency=2)
+    assert results == {1: 1, 2: 4}
+    assert list(errors) == [-1] and isinstance(errors[-1], ValueError)
+
+
+def test_fan_out_respects_concurrency_and_times_out_slow_items():
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def work(item):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.5 if item == "slow" else 0.1)
+        with lock:
+            running[0] -= 1
+        return item
+
+    results, errors = fan_out(work, ["a", "b", "c", "slow"], concurrency=2, timeout=0.18)
+    assert set(results) == {"a", "b", "c"}  # "c" finishes 0.2s in, but only ran for 0.1s
+    assert isinstance(errors["slow"], TimeoutError)
+    assert peak[0] <= 2
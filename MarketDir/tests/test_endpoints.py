@@ -0,0 +1,131 @@
+import os
+import time
+import threading
+
+import pandas as pd
+import pytest
+
+import MarketAnalysis
+import Screener
+from MarketAnalysis import app
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+@pytest.mark.parametrize("body", [{"tickers": [5]}, {"tickers": "AAPL"}, {"tickers": ["AAPL"], "timeout": "x"},
+                                  {"tickers": ["AAPL"], "concurrency": "many"}])
+def test_batch_sentiment_rejects_malformed_bodies(client, body):
+    response = client.post("/sentiment-insights/batch", json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_watchlist_rejects_a_string_of_tickers(client):
+    response = client.put("/watchlists/tech", json={"tickers": "AAPL"})
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+@pytest.mark.parametrize("body", [{"tickers": ["AAPL"], "top": "x"}, {"tickers": ["AAPL"], "top": None},
+                                  {"tickers": "AAPL"}, {"universe": 5}])
+def test_screener_rejects_malformed_bodies(client, body):
+    response = client.post("/screener", json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_screener_rejects_jobs_beyond_the_limit(client, monkeypatch):
+    monkeypatch.setattr(Screener, "_job_slots", threading.BoundedSemaphore(1))
+    monkeypatch.setattr(Screener, "run_job", lambda job_id, tickers, **options: release.wait(5))
+    release = threading.Event()
+    try:
+        assert client.post("/screener", json={"tickers": ["AAPL"]}).status_code == 202
+        assert client.post("/screener", json={"tickers": ["MSFT"]}).status_code == 429
+    finally:
+        release.set()
+
+
+def test_expire_jobs_removes_old_job_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(Screener, "JOB_DIR", str(tmp_path))
+    old, recent = tmp_path / "old.json", tmp_path / "recent.json"
+    old.write_text("{}")
+    recent.write_text("{}")
+    os.utime(old, (time.time() - 7200, time.time() - 7200))
+
+    Screener.expire_jobs(ttl=3600)
+
+    assert not old.exists() and recent.exists()
+
+
+@pytest.mark.parametrize("shrinkage", [5, -0.1, "oas", True, [0.5]])
+def test_portfolio_rejects_invalid_shrinkage(client, shrinkage):
+    response = client.post("/portfolio", json={"tickers": ["AAPL", "MSFT"], "shrinkage": shrinkage})
+    assert response.status_code == 400
+    assert "shrinkage" in response.get_json()["error"]
+
+
+@pytest.mark.parametrize("body", [{"tickers": "AAPL"}, {"tickers": [5]}, {"tickers": ["AAPL"], "simulations": "many"},
+                                  {"tickers": ["AAPL"], "method": "garch"}])
+def test_quant_forecast_rejects_malformed_bodies(client, body):
+    response = client.post("/growth-forecast/quant", json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+@pytest.mark.parametrize("body", [{"tickers": "AAPL"}, {"tickers": [5]}, ["AAPL"]])
+def test_batch_forecast_rejects_malformed_tickers(client, body):
+    response = client.post("/growth-forecast/batch", json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+@pytest.mark.parametrize("body", [{"tickers": "AAPL"}, {"tickers": [5]}, {"tickers": ["AAPL"], "concurrency": "x"},
+                                  {"tickers": ["AAPL"], "batch_size": None}])
+def test_market_data_stream_rejects_malformed_bodies(client, body):
+    response = client.post("/market-data/stream", json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+@pytest.mark.parametrize("body", [{"tickers": "AAPL"}, {"tickers": [5]}, {"tickers": ["AAPL"], "concurrency": "x"}])
+def test_market_data_rejects_malformed_bodies(client, body):
+    response = client.post("/market-data", json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+@pytest.mark.parametrize("body", [{"tickers": "AAPL"}, {"tickers": [5]}, {"tickers": ["AAPL"], "batch_size": "x"}])
+def test_live_market_data_rejects_malformed_bodies(client, body):
+    response = client.post("/market-data/live", json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+@pytest.mark.parametrize("body", [{"tickers": "AAPL"}, {"tickers": [5]}, {"tickers": ["AAPL"], "concurrency": "x"},
+                                  {"tickers": ["AAPL"], "period": 5}])
+def test_history_rejects_malformed_bodies(client, body):
+    response = client.post("/history", json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+@pytest.mark.parametrize("body", [{"tickers": "AAPL,MSFT"}, {"tickers": ["AAPL", 5]},
+                                  {"tickers": ["AAPL", "MSFT"], "concurrency": "x"}])
+def test_portfolio_rejects_malformed_bodies(client, body):
+    response = client.post("/portfolio", json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_history_json_keeps_float64_closes_when_float32_is_asked(client, monkeypatch):
+    class Store:
+        def get_histories(self, tickers, **kwargs):
+            index = pd.date_range("2024-01-02", periods=3, freq="B", name="Date")
+            return {ticker: pd.DataFrame({"Close": [123.45, 124.1, 122.3]}, index=index) for ticker in tickers}, {}
+
+    monkeypatch.setattr(MarketAnalysis, "get_store", lambda: Store())
+    response = client.post("/history", json={"tickers": ["AAPL"], "float32": True})
+    assert response.get_json()["closes"]["AAPL"] == [123.45, 124.1, 122.3]
@@ -0,0 +1,19 @@
+import pandas as pd
+
+from HistoryCache import HistoryCache
+
+
+def closes(values):
+    return pd.Series(values, index=pd.bdate_range("2026-01-05", periods=len(values)), dtype=float)
+
+
+def test_tickers_without_data_expire_after_the_short_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("HistoryCache.time.time", lambda: now[0])
+    cache = HistoryCache(ttl=300, empty_ttl=15)
+    cache.put("AAPL", "18mo", closes([1.0, 2.0]))
+    cache.put("MSFT", "18mo", None)
+
+    now[0] += 20
+    assert cache.get("AAPL", "18mo") is not None
+    assert cache.get("MSFT", "18mo") is None
@@ -0,0 +1,80 @@
+import time
+import types
+
+import pytest
+
+import LLMCache
+from LLMCache import GenerationCache, cache_key, cached_generate
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(LLMCache.time, "time", lambda: now[0])
+    return now
+
+
+# Cohere stand-in echoing the prompt, or failing while `down` is set
+class EchoCohere:
+
+    def __init__(self):
+        self.calls = 0
+        self.down = False
+
+    def generate(self, model, prompt, max_tokens, temperature, **kwargs):
+        self.calls += 1
+        if self.down:
+            raise ConnectionError("cohere is down")
+        return types.SimpleNamespace(generations=[types.SimpleNamespace(text=f" {prompt} ")])
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = GenerationCache(max_entries=2, path=None)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"
+    cache.put("c", "C")
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("A", "C")
+
+
+def test_expired_entries_are_misses_but_served_stale_until_stale_ttl(clock):
+    cache = GenerationCache(ttl=60, stale_ttl=600, path=None)
+    cache.put("key", "text")
+    assert cache.get("key") == "text"
+
+    clock[0] += 61
+    assert cache.get("key") is None
+    assert cache.get_stale("key") == "text"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    clock[0] += 600
+    assert cache.get_stale("key") is None
+
+
+def test_sqlite_file_is_shared_and_bounded(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    writer = GenerationCache(path=path, max_disk_entries=2)
+    for key in ("a", "b", "c"):
+        writer.put(key, key.upper())
+        time.sleep(0.01)
+
+    reader = GenerationCache(path=path)
+    assert reader.get("a") is None  # evicted from the file, least recently used
+    assert (reader.get("b"), reader.get("c")) == ("B", "C")
+
+
+def test_cached_generate_calls_cohere_once_and_falls_back_to_stale(clock):
+    client, cache = EchoCohere(), GenerationCache(ttl=60, path=None)
+    generate = lambda: cached_generate(client, "command", "prompt", 10, 0.0, cache=cache)  # noqa: E731
+
+    assert generate() == "prompt"
+    assert generate() == "prompt"
+    assert client.calls == 1
+
+    clock[0] += 61
+    client.down = True
+    assert generate() == "prompt"  # expired, but Cohere failed
+    assert client.calls > 1
+    assert cache_key("command", "prompt", 10, 0.0) != cache_key("command", "prompt", 10, 0.5)
@@ -0,0 +1,44 @@
+import json
+import types
+
+import pytest
+
+import LLMCache
+import LLMClient
+from LLMClient import generate_growth_forecasts, parse_growth_forecasts
+
+
+# Cohere stand-in replying to batch forecast prompts with upper-cased tickers
+class UpperCaseCohere:
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, model, prompt, max_tokens, temperature, **kwargs):
+        self.calls += 1
+        tickers = prompt.split("Tickers:", 1)[1].split("\n", 1)[0].split(",")
+        text = json.dumps({"forecasts": [{"ticker": ticker.strip().upper(), "growth_6m": 5, "growth_12m": 10}
+                                         for ticker in tickers]})
+        return types.SimpleNamespace(generations=[types.SimpleNamespace(text=text)])
+
+
+@pytest.fixture
+def cohere(monkeypatch):
+    client = UpperCaseCohere()
+    monkeypatch.setattr(LLMClient, "_client", client)
+    monkeypatch.setattr(LLMCache, "_default_cache", LLMCache.GenerationCache(path=None))
+    return client
+
+
+def test_parse_growth_forecasts_keeps_the_requested_casing():
+    reply = json.dumps({"forecasts": [{"ticker": "AAPL", "growth_6m": 4.5, "growth_12m": "9%"},
+                                      {"ticker": "msft", "growth_6m": 3, "growth_12m": 6}]})
+    assert parse_growth_forecasts(reply, ["aapl", "MSFT"]) == {"aapl": {"6M": 4.5, "12M": 9.0},
+                                                               "MSFT": {"6M": 3.0, "12M": 6.0}}
+
+
+def test_mixed_case_batch_is_answered_in_one_generation(cohere):
+    forecasts, errors = generate_growth_forecasts(["aapl", "MSFT", "Goog"])
+    assert errors == {}
+    assert set(forecasts) == {"aapl", "MSFT", "Goog"}
+    assert cohere.calls == 1
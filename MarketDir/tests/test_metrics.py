@@ -0,0 +1,28 @@
+import pytest
+
+from Metrics import Registry, STAGE_CANCELLED, STAGE_ERRORS, timed
+
+
+def test_closed_stream_counts_as_cancelled_not_error():
+    registry = Registry()
+
+    def stream():
+        with timed("stream", registry=registry):
+            yield 1
+            yield 2
+
+    records = stream()
+    next(records)
+    records.close()  # what the server does when the client disconnects
+
+    text = registry.render()
+    assert STAGE_CANCELLED in text
+    assert STAGE_ERRORS not in text
+
+
+def test_raising_stage_counts_as_error():
+    registry = Registry()
+    with pytest.raises(ValueError):
+        with timed("compute", registry=registry):
+            raise ValueError("boom")
+    assert STAGE_ERRORS in registry.render()
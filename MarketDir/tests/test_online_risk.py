@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from OnlineRisk import OnlineRiskBook, QUANTILE_BIN_WIDTH
+from RiskEngine import align_closes, compute_risk_metrics
+
+FIELDS = ["volatility", "VaR_95", "CVaR_95", "sharpe"]
+
+
+def synthetic_history(n_days, seed=0):
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, size=n_days)))
+    dates = pd.bdate_range(end="2024-12-31", periods=n_days, tz="America/New_York")
+    return pd.DataFrame({"Close": closes}, index=dates)
+
+
+def assert_matches_batch(online, hist):
+    batch = compute_risk_metrics(align_closes({"T": hist})).loc["T"]
+    assert online["volatility"] == pytest.approx(batch["volatility"], rel=1e-9)
+    assert online["sharpe"] == pytest.approx(batch["sharpe"], rel=1e-9)
+    assert online["VaR_95"] == pytest.approx(batch["VaR_95"], abs=QUANTILE_BIN_WIDTH)
+    assert online["CVaR_95"] == pytest.approx(batch["CVaR_95"], abs=5 * QUANTILE_BIN_WIDTH)
+
+
+def test_first_sync_uses_every_bar_of_the_slice():
+    hist = synthetic_history(260)  # more than 252 returns, as a 1y slice can have
+    online = OnlineRiskBook().update({"T": hist})["T"]
+    assert_matches_batch(online, hist)
+
+
+def test_sliding_slice_and_revised_last_bar_match_batch():
+    full = synthetic_history(300, seed=1)
+    book = OnlineRiskBook()
+    book.update({"T": full.iloc[:260]})
+    for end in range(261, 300, 3):
+        snapshot = full.iloc[end - 255:end].copy()  # the slice start moves on with the calendar
+        snapshot.iloc[-1, 0] *= 1.01  # today's close still moving
+        online = book.update({"T": snapshot})["T"]
+    assert_matches_batch(online, snapshot)
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Portfolio import estimate, get_model, normalize_weights, parse_shrinkage
+from RiskEngine import TRADING_DAYS, compute_returns
+
+
+def synthetic_closes(n_days=200, n_tickers=4, seed=0):
+    rng = np.random.default_rng(seed)
+    common = rng.normal(0, 0.01, size=(n_days, 1))
+    returns = common + rng.normal(0.0003, 0.015, size=(n_days, n_tickers))
+    closes = 100 * np.exp(np.cumsum(returns, axis=0))
+    return pd.DataFrame(closes, index=pd.bdate_range("2024-01-02", periods=n_days),
+                        columns=[f"T{i}" for i in range(n_tickers)])
+
+
+def test_unshrunk_covariance_is_the_population_covariance():
+    closes = synthetic_closes()
+    model = estimate(closes, shrinkage=None)
+    assert model.shrinkage == 0.0
+    assert model.covariance == pytest.approx(np.cov(compute_returns(closes), rowvar=False, ddof=0))
+
+
+def test_fixed_shrinkage_pulls_towards_the_average_variance():
+    closes = synthetic_closes()
+    sample = estimate(closes, shrinkage=None).covariance
+    shrunk = estimate(closes, shrinkage=0.5).covariance
+    target = np.mean(np.diag(sample))
+    assert shrunk[0, 1] == pytest.approx(sample[0, 1] / 2)
+    assert shrunk[2, 2] == pytest.approx(sample[2, 2] / 2 + target / 2)
+
+
+def test_ledoit_wolf_keeps_a_short_history_positive_definite():
+    closes = synthetic_closes(n_days=30, n_tickers=60)  # more tickers than returns
+    model = estimate(closes)
+    assert 0 < model.shrinkage <= 1
+    assert np.linalg.eigvalsh(model.covariance).min() > 0
+
+
+def test_missing_bars_are_handled_pairwise():
+    closes = synthetic_closes()
+    closes.iloc[:50, 1] = np.nan  # a recent listing
+    model = estimate(closes, shrinkage=None)
+    returns = compute_returns(closes)
+    both = ~np.isnan(returns[:, 1])
+    expected = np.mean((returns[both, 1] - returns[both, 1].mean()) * (returns[both, 0] - returns[:, 0].mean()))
+    assert model.covariance[0, 1] == pytest.approx(expected)
+
+
+def test_models_are_cached_on_the_data_and_shrinkage():
+    closes = synthetic_closes(seed=3)
+    model = get_model(closes)
+    assert get_model(closes.copy()) is model
+    assert get_model(closes, shrinkage=None) is not model
+
+
+def test_equal_weight_risk():
+    model = estimate(synthetic_closes(), shrinkage=None)
+    weights = normalize_weights(model.tickers)
+    risk = model.risk(weights)
+    assert risk["volatility"] == pytest.approx(np.sqrt(weights @ model.covariance @ weights * TRADING_DAYS))
+    assert risk["CVaR_95_historical"] <= risk["VaR_95_historical"] < 0
+    assert risk["CVaR_95_parametric"] < risk["VaR_95_parametric"] < 0
+
+
+def test_weights_are_normalized_and_checked():
+    assert normalize_weights(["A", "B"], {"A": 3, "B": 1}) == pytest.approx([0.75, 0.25])
+    assert normalize_weights(["A", "B"], [1, 1]) == pytest.approx([0.5, 0.5])
+    for weights in ({"C": 1}, [1], {"A": 1, "B": -1}):
+        with pytest.raises(ValueError):
+            normalize_weights(["A", "B"], weights)
+
+
+@pytest.mark.parametrize("value, expected", [(None, None), ("none", None), ("ledoit_wolf", "ledoit_wolf"),
+                                             (0, 0.0), (0.25, 0.25), (1, 1.0)])
+def test_parse_shrinkage(value, expected):
+    assert parse_shrinkage(value) == expected
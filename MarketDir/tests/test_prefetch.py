@@ -0,0 +1,52 @@
+import types
+
+import pytest
+
+import LLMCache
+import LLMClient
+import Prefetch
+from Concurrency import TokenBucket
+
+
+class CountingBucket(TokenBucket):
+
+    def __init__(self):
+        super().__init__(rate=1000, capacity=1000)
+        self.acquired = 0
+
+    def acquire(self, timeout=None):
+        self.acquired += 1
+        super().acquire(timeout)
+
+
+# Cohere stand-in whose forecast replies never parse
+class MalformedCohere:
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, model, prompt, max_tokens, temperature, **kwargs):
+        self.calls += 1
+        return types.SimpleNamespace(generations=[types.SimpleNamespace(text="no forecast today")])
+
+
+@pytest.mark.parametrize("tickers", ["AAPL", [5], {"AAPL": 1}, 5])
+def test_save_watchlist_requires_a_list_of_strings(tmp_path, tickers):
+    path = str(tmp_path / "watchlists.json")
+    with pytest.raises(ValueError):
+        Prefetch.save_watchlist("tech", tickers, path=path)
+    assert Prefetch.load_watchlists(path) == {}
+
+
+def test_forecast_budget_is_charged_per_cohere_call(tmp_path, monkeypatch):
+    client = MalformedCohere()
+    monkeypatch.setattr(LLMClient, "_client", client)
+    monkeypatch.setattr(LLMCache, "_default_cache", LLMCache.GenerationCache(path=None))
+    scheduler = Prefetch.PrefetchScheduler(None, watchlist_path=str(tmp_path / "watchlists.json"),
+                                           state_path=str(tmp_path / "state.json"))
+    scheduler.llm_budget = CountingBucket()
+
+    scheduler.refresh_forecasts(["AAPL", "MSFT"])
+
+    assert client.calls == LLMClient.FORECAST_MAX_ATTEMPTS
+    assert scheduler.llm_budget.acquired == client.calls
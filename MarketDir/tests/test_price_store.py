@@ -0,0 +1,65 @@
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+
+from PriceStore import PriceStore
+
+DAYS = pd.bdate_range(end=pd.Timestamp.now(tz="America/New_York").normalize(), periods=300,
+                      tz="America/New_York", name="Date")
+SPLIT_AT = len(DAYS) - 5  # a 2-for-1 split inside the incremental window
+
+
+# Yahoo as seen on day `today` (an index into DAYS): prices adjusted for the actions known by then
+class SplitYFinance(types.ModuleType):
+
+    def __init__(self):
+        super().__init__("yfinance")
+        self.today = SPLIT_AT - 1
+        close = np.linspace(100, 120, len(DAYS))
+        close[SPLIT_AT:] /= 2
+        self.raw = pd.DataFrame({"Close": close, "Dividends": 0.0, "Stock Splits": 0.0}, index=DAYS)
+        self.raw.iloc[SPLIT_AT, self.raw.columns.get_loc("Stock Splits")] = 2.0
+
+    def download(self, tickers, period=None, start=None, **kwargs):
+        from PriceStore import period_start
+
+        hist = self.raw.iloc[:self.today + 1].copy()
+        for date, ratio in hist["Stock Splits"][hist["Stock Splits"] > 0].items():
+            hist.loc[hist.index < date, "Close"] /= ratio
+        first = pd.Timestamp(start, tz=DAYS.tz) if start is not None else period_start(period, DAYS.tz)
+        hist = hist[hist.index >= first]
+        return pd.concat({ticker: hist for ticker in tickers}, axis=1)
+
+
+def test_split_in_incremental_window_rewrites_the_period(tmp_path, monkeypatch):
+    fake = SplitYFinance()
+    monkeypatch.setitem(sys.modules, "yfinance", fake)
+    store = PriceStore(root=str(tmp_path), max_age=0)
+
+    before = store.get_history("ACME", "1y")
+    assert before.index[-1] == DAYS[SPLIT_AT - 1]
+
+    fake.today = len(DAYS) - 1
+    after = store.get_history("ACME", "1y")
+
+    assert after.index[-1] == DAYS[-1]
+    assert after.index.is_unique
+    assert after["Close"].pct_change().abs().max() < 0.01
+    stored, _ = store.read("ACME")
+    assert stored["Close"].iloc[0] == fake.raw["Close"].loc[stored.index[0]] / 2
+
+
+def test_refresh_without_actions_only_appends(tmp_path, monkeypatch):
+    fake = SplitYFinance()
+    fake.raw["Stock Splits"] = 0.0
+    monkeypatch.setitem(sys.modules, "yfinance", fake)
+    store = PriceStore(root=str(tmp_path), max_age=0)
+
+    before = store.get_history("ACME", "1y")
+    fake.today = len(DAYS) - 1
+    after = store.get_history("ACME", "1y")
+
+    pd.testing.assert_series_equal(after["Close"].iloc[:len(before)], before["Close"], check_freq=False)
+    assert after.index[-1] == DAYS[-1]
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from QuantForecast import HORIZONS, forecast
+
+
+def closes_from_log_returns(log_returns):
+    prices = 100 * np.exp(np.vstack([np.zeros((1, log_returns.shape[1])), np.cumsum(log_returns, axis=0)]))
+    return pd.DataFrame(prices, index=pd.bdate_range("2023-01-02", periods=len(prices)),
+                        columns=[f"T{i}" for i in range(log_returns.shape[1])])
+
+
+@pytest.mark.parametrize("method", ["bootstrap", "gbm"])
+def test_constant_returns_give_a_point_forecast(method):
+    closes = closes_from_log_returns(np.full((100, 2), [0.001, -0.002]))
+    results = forecast(closes, method, simulations=200)
+    for label, horizon in HORIZONS.items():
+        expected = np.expm1(np.array([0.001, -0.002]) * horizon) * 100
+        for name in ("median", "low", "high"):
+            assert results[label][name] == pytest.approx(expected)
+
+
+def test_bootstrap_agrees_with_gbm_and_is_reproducible():
+    rng = np.random.default_rng(0)
+    closes = closes_from_log_returns(rng.normal(0.0004, 0.015, size=(500, 3)))
+    bootstrap = forecast(closes, "bootstrap", simulations=4000)
+    gbm = forecast(closes, "gbm")
+
+    for label in HORIZONS:
+        assert np.all(bootstrap[label]["low"] < bootstrap[label]["median"])
+        assert np.all(bootstrap[label]["median"] < bootstrap[label]["high"])
+        for name in ("low", "median", "high"):  # growth in %, a few points of sampling error
+            assert bootstrap[label][name] == pytest.approx(gbm[label][name], abs=3.0)
+    again = forecast(closes, "bootstrap", simulations=4000)
+    assert again["12M"]["median"] == pytest.approx(bootstrap["12M"]["median"])
+
+
+def test_short_history_and_unknown_method():
+    results = forecast(closes_from_log_returns(np.array([[0.01]])), "gbm")
+    assert np.isnan(results["6M"]["median"][0])
+    with pytest.raises(ValueError):
+        forecast(closes_from_log_returns(np.zeros((10, 1))), "garch")
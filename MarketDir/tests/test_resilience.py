@@ -0,0 +1,104 @@
+import time
+import threading
+
+import pytest
+
+import Resilience
+from Metrics import Registry
+from Resilience import Upstream
+
+
+@pytest.fixture
+def single_thread_pool(monkeypatch):
+    monkeypatch.setattr(Resilience, "UPSTREAM_THREADS", 1)
+
+
+def test_timeout_counts_from_when_the_attempt_starts_running(single_thread_pool):
+    upstream = Upstream("test-queued", timeout=0.2, attempts=1, registry=Registry())
+    busy = upstream._executor().submit(time.sleep, 0.4)  # another caller holding the only thread
+
+    assert upstream.call(lambda: "ok") == "ok"
+    assert busy.done()
+
+
+def test_deadline_still_counts_while_queued(single_thread_pool):
+    upstream = Upstream("test-deadline", timeout=1.0, attempts=1, registry=Registry())
+    upstream._executor().submit(time.sleep, 0.4)
+
+    with pytest.raises(TimeoutError):
+        upstream.call(lambda: "ok", deadline=time.monotonic() + 0.1)
+
+
+def test_queued_copies_are_cancelled_on_timeout(single_thread_pool):
+    calls = []
+    release = threading.Event()
+
+    def slow():
+        calls.append(1)
+        release.wait(1)
+
+    upstream = Upstream("test-cancel", timeout=0.2, hedge_after=0.05, attempts=1, registry=Registry())
+    with pytest.raises(TimeoutError):
+        upstream.call(slow)
+    release.set()
+    time.sleep(0.1)
+    assert len(calls) == 1  # the hedged copy never got a thread and was dropped
+
+
+def flaky(failures, result="ok"):
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise ConnectionError("flaky")
+        return result
+    return func, calls
+
+
+def test_retries_until_an_attempt_succeeds():
+    func, calls = flaky(2)
+    upstream = Upstream("test-retry", timeout=None, attempts=3, base_delay=0.01, registry=Registry())
+    assert upstream.call(func) == "ok"
+    assert len(calls) == 3
+
+
+def test_errors_retryable_rejects_are_not_retried():
+    func, calls = flaky(5)
+    upstream = Upstream("test-no-retry", timeout=None, attempts=3, base_delay=0.01,
+                        retryable=lambda error: not isinstance(error, ConnectionError), registry=Registry())
+    with pytest.raises(ConnectionError):
+        upstream.call(func)
+    assert len(calls) == 1
+
+
+def test_slow_attempt_is_hedged_and_the_first_answer_wins():
+    answers = iter([0.5, 0.0])
+
+    def func():
+        time.sleep(next(answers))
+        return "ok"
+
+    registry = Registry()
+    upstream = Upstream("test-hedge", timeout=2.0, hedge_after=0.05, attempts=1, registry=registry)
+    start = time.monotonic()
+    assert upstream.call(func) == "ok"
+    assert time.monotonic() - start < 0.3
+    assert "markettrend_upstream_hedges_total" in registry.render()
+
+
+def test_breaker_opens_after_failed_calls_and_a_probe_closes_it():
+    func, calls = flaky(2)
+    upstream = Upstream("test-breaker", timeout=None, attempts=1, failure_threshold=2, reset_timeout=0.1,
+                        registry=Registry())
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            upstream.call(func)
+    with pytest.raises(Resilience.CircuitOpenError):
+        upstream.call(func)
+    assert len(calls) == 2 and upstream.breaker.state == Resilience.OPEN
+
+    time.sleep(0.15)
+    assert upstream.breaker.state == Resilience.HALF_OPEN
+    assert upstream.call(func) == "ok"
+    assert upstream.breaker.state == Resilience.CLOSED
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from RiskEngine import TRADING_DAYS, align_closes, compute_growth, compute_risk_metrics, nan_quantile
+
+
+def history(dates, closes, tz=None):
+    return pd.DataFrame({"Close": closes}, index=pd.DatetimeIndex(pd.to_datetime(dates)).tz_localize(tz))
+
+
+def test_metrics_match_the_per_ticker_numpy_formulas():
+    rng = np.random.default_rng(0)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, size=120)))
+    dates = pd.bdate_range("2024-01-02", periods=120)
+    metrics = compute_risk_metrics(align_closes({"T": history(dates, closes)})).loc["T"]
+
+    returns = closes[1:] / closes[:-1] - 1
+    var = np.percentile(returns, 5)
+    assert metrics["current_price"] == closes[-1]
+    assert metrics["volatility"] == pytest.approx(np.std(returns) * np.sqrt(TRADING_DAYS))
+    assert metrics["VaR_95"] == pytest.approx(var)
+    assert metrics["CVaR_95"] == pytest.approx(returns[returns <= var].mean())
+    assert metrics["max_drawdown"] == pytest.approx(np.min(closes / np.maximum.accumulate(closes) - 1))
+    assert metrics["sharpe"] == pytest.approx(returns.mean() * TRADING_DAYS / (np.std(returns) * np.sqrt(TRADING_DAYS)))
+
+
+def test_missing_dates_contribute_no_observation():
+    a = history(["2024-01-02", "2024-01-03", "2024-01-04"], [100.0, 110.0, 121.0], tz="America/New_York")
+    b = history(["2024-01-02", "2024-01-04"], [50.0, 55.0], tz="Europe/London")
+    closes = align_closes({"A": a, "B": b})
+
+    assert list(closes.index.strftime("%Y-%m-%d")) == ["2024-01-02", "2024-01-03", "2024-01-04"]
+    assert np.isnan(closes.at[pd.Timestamp("2024-01-03"), "B"])
+    metrics = compute_risk_metrics(closes)
+    assert metrics.at["B", "current_price"] == 55.0
+    assert metrics.at["B", "volatility"] == 0.0  # a single return of 10%, against its last traded price
+    assert compute_growth(closes)["B"] == pytest.approx(10.0)
+
+
+def test_single_bar_gives_nan_metrics():
+    metrics = compute_risk_metrics(align_closes({"T": history(["2024-01-02"], [100.0])}))
+    assert metrics.at["T", "current_price"] == 100.0
+    assert np.isnan(metrics.at["T", "volatility"]) and np.isnan(metrics.at["T", "VaR_95"])
+
+
+def test_nan_quantile_matches_nanpercentile():
+    values = np.random.default_rng(1).normal(size=(50, 4))
+    values[::7, 1] = np.nan
+    values[:, 3] = np.nan
+    expected = np.nanpercentile(values[:, :3], 5, axis=0)
+    result = nan_quantile(values, 0.05)
+    assert result[:3] == pytest.approx(expected)
+    assert np.isnan(result[3])
@@ -0,0 +1,100 @@
+import time
+import threading
+
+import pytest
+
+from Metrics import Registry
+from SingleFlight import SingleFlight
+
+
+def run_concurrently(n, target):
+    results, threads = [None] * n, []
+    for i in range(n):
+        threads.append(threading.Thread(target=lambda i=i: results.__setitem__(i, target())))
+        threads[-1].start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_concurrent_callers_share_one_call():
+    flight, calls = SingleFlight("test", registry=Registry()), []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return "data"
+
+    assert run_concurrently(5, lambda: flight.do("AAPL", fetch)) == ["data"] * 5
+    assert len(calls) == 1
+    assert flight.in_flight() == 0
+
+
+def test_errors_reach_every_waiter_and_are_not_kept():
+    flight, calls = SingleFlight("test", registry=Registry()), []
+
+    def failing():
+        calls.append(1)
+        time.sleep(0.2)
+        raise ConnectionError("down")
+
+    def call():
+        try:
+            return flight.do("AAPL", failing)
+        except ConnectionError as e:
+            return e
+
+    assert all(isinstance(result, ConnectionError) for result in run_concurrently(3, call))
+    assert len(calls) == 1
+    assert flight.do("AAPL", lambda: "back") == "back"
+
+
+def test_waiters_of_an_interrupted_leader_start_a_new_call():
+    flight, started = SingleFlight("test", registry=Registry()), threading.Event()
+
+    def interrupted():
+        started.set()
+        time.sleep(0.2)
+        raise KeyboardInterrupt
+
+    def lead():
+        try:
+            flight.do("AAPL", interrupted)
+        except KeyboardInterrupt:
+            pass
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    started.wait(1)
+    assert flight.do("AAPL", lambda: "fresh") == "fresh"
+    leader.join()
+
+
+def test_a_waiter_timing_out_does_not_cancel_the_call():
+    flight, release = SingleFlight("test", registry=Registry()), threading.Event()
+    leader = threading.Thread(target=lambda: flight.do("AAPL", lambda: release.wait(2) and "data"))
+    leader.start()
+    time.sleep(0.05)
+    with pytest.raises(TimeoutError):
+        flight.do("AAPL", lambda: "other", timeout=0.05)
+    assert flight.in_flight() == 1
+    release.set()
+    leader.join()
+
+
+def test_do_many_joins_keys_in_flight_and_claims_the_rest():
+    flight, release, batches = SingleFlight("test", registry=Registry()), threading.Event(), []
+    leader = threading.Thread(target=lambda: flight.do("AAPL", lambda: release.wait(2) and "aapl"))
+    leader.start()
+    time.sleep(0.05)
+
+    def fetch(keys):
+        batches.append(keys)
+        release.set()
+        return {key: key.lower() for key in keys if key != "BAD"}, {}
+
+    results, errors = flight.do_many(["AAPL", "MSFT", "BAD"], fetch)
+    leader.join()
+    assert batches == [["MSFT", "BAD"]]
+    assert results == {"AAPL": "aapl", "MSFT": "msft"}
+    assert isinstance(errors["BAD"], KeyError)
@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+
+from Universe import parse_universe
+
+
+def test_parse_text_universe_drops_comments_blanks_and_duplicates():
+    lines = ["aapl  # Apple", "", "MSFT", "# a comment", "AAPL"]
+    assert parse_universe(lines) == ["AAPL", "MSFT"]
+
+
+def test_parse_csv_universe_uses_the_ticker_column():
+    lines = ["name,Symbol", "Apple,aapl", "Microsoft,MSFT", ""]
+    assert parse_universe(lines, is_csv=True) == ["AAPL", "MSFT"]
+
+
+def test_universe_module_does_not_import_the_price_store():
+    code = "import sys, Universe; print(any(m in sys.modules for m in ('PriceStore', 'pandas', 'pyarrow')))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.stdout.strip() == "False"